@@ -1,6 +1,11 @@
 from __future__ import annotations
 
-from server import global_app
+import argparse
+import os
+
+import uvicorn
+
+from server import Supervisor, global_app
 
 
 __all__ = ("app",)
@@ -8,3 +13,29 @@ __all__ = ("app",)
 
 # Expose application to uvicorn
 app = global_app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve the application with preloaded worker processes")
+    parser.add_argument("--host", type=str, default="0.0.0.0", help="Host to listen on")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", 8000)), help="Port to listen on")
+    parser.add_argument("--workers", type=int, default=12, help="Number of worker processes")
+    parser.add_argument("--log-level", type=str, default="warning", help="Log level of uvicorn")
+    args = parser.parse_args()
+
+    if hasattr(os, "fork"):
+        Supervisor(app, workers=args.workers, host=args.host, port=args.port, log_level=args.log_level).run()
+    else:  # Windows
+        uvicorn.run(
+            "main:app",
+            host=args.host,
+            port=args.port,
+            log_level=args.log_level,
+            workers=args.workers,
+            # Event streams only end when the server stops waiting for them, see server/push.py
+            timeout_graceful_shutdown=Supervisor.GRACEFUL_TIMEOUT,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Benchmark IPN ingestion under a burst of concurrent callbacks.
+
+Run `python scripts/benchmark_ipn.py [--callbacks N]`.
+
+Each mode processes `--callbacks` distinct transactions at once, spread over the existing rooms
+and a set of benchmark fees:
+- `direct`: every callback runs its own `CreatePayment` transaction, as `/ipn` did before the outbox.
+- `outbox`: every callback is acknowledged once durably queued by `IPNStore`, and the queued
+  transactions are applied by `CreatePayments` in batches.
+
+The throughput of acknowledgements and the time until every payment is committed are printed. The
+benchmark fees, their payments and their recorded outcomes are deleted at the end.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, List
+
+
+root = Path(__file__).parent.parent.resolve()
+sys.path.append(str(root))
+
+
+from server import Database, IPNStore, Payment  # noqa
+
+
+async def create_fees(count: int) -> List[int]:
+    fees: List[int] = []
+    async with Database.instance.pool.acquire() as connection:
+        async with connection.cursor() as cursor:
+            for index in range(count):
+                await cursor.execute(
+                    """
+                        EXECUTE CreateFee
+                            @Name = ?,
+                            @Lower = 0,
+                            @Upper = 100000000,
+                            @PerArea = 0,
+                            @PerMotorbike = 0,
+                            @PerCar = 0,
+                            @Deadline = '2100-01-01',
+                            @Description = N'',
+                            @Flags = 0
+                    """,
+                    f"__benchmark__ {index}",
+                )
+                row = await cursor.fetchone()
+                fees.append(row.id)
+
+    return fees
+
+
+async def cleanup() -> None:
+    async with Database.instance.pool.acquire() as connection:
+        async with connection.cursor() as cursor:
+            await cursor.execute(
+                """
+                    DELETE FROM ipn_outcomes WHERE txn_ref LIKE N'[_][_]benchmark[_][_]%'
+                    DELETE FROM payments WHERE fee_id IN (SELECT id FROM fees WHERE name LIKE N'[_][_]benchmark[_][_] %')
+                    DELETE FROM fees WHERE name LIKE N'[_][_]benchmark[_][_] %'
+                """
+            )
+
+
+async def run(name: str, callbacks: int, rooms: List[int], process: Callable[[str, int, int], Awaitable[Any]]) -> None:
+    fees = await create_fees((callbacks + len(rooms) - 1) // len(rooms))
+    latencies: List[float] = []
+
+    async def callback(index: int) -> None:
+        start = time.perf_counter()
+        await process(f"__benchmark__-{name}-{index}", rooms[index % len(rooms)], fees[index // len(rooms)])
+        latencies.append(1000 * (time.perf_counter() - start))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(callback(index) for index in range(callbacks)))
+    acknowledged = time.perf_counter() - start
+
+    # Wait until every queued transaction is committed
+    outbox = IPNStore.instance.outbox
+    while outbox.started and outbox.statistics["applied"] < outbox.statistics["appended"]:
+        await asyncio.sleep(0.01)
+
+    committed = time.perf_counter() - start
+
+    latencies.sort()
+    p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+    print(
+        f"{name:<10}{callbacks / acknowledged:>12.0f}{statistics.median(latencies):>10.2f}{p95:>10.2f}"
+        f"{latencies[-1]:>10.2f}{committed:>12.2f}"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark IPN ingestion under a burst of concurrent callbacks")
+    parser.add_argument("--callbacks", type=int, default=5000, help="Number of concurrent callbacks per mode")
+    args = parser.parse_args()
+
+    await Database.instance.prepare()
+    async with Database.instance.pool.acquire() as connection:
+        async with connection.cursor() as cursor:
+            await cursor.execute("SELECT room FROM rooms ORDER BY room")
+            rooms = [row.room for row in await cursor.fetchall()]
+
+    if len(rooms) == 0:
+        raise RuntimeError("No rooms to pay for, run scripts/sample.py first")
+
+    async def direct(txn_ref: str, room: int, fee_id: int) -> Any:
+        return await Payment.create(room=room, amount=1000, fee_id=fee_id, txn_ref=txn_ref)
+
+    async def outbox(txn_ref: str, room: int, fee_id: int) -> Any:
+        return await IPNStore.instance.process(txn_ref, room=room, amount=1000, fee_id=fee_id)
+
+    await IPNStore.instance.outbox.start()
+    try:
+        print(f"{'mode':<10}{'ack/s':>12}{'median':>10}{'p95':>10}{'max':>10}{'commit (s)':>12}  (ms, {args.callbacks} callbacks)")
+        await run("direct", args.callbacks, rooms, direct)
+        await run("outbox", args.callbacks, rooms, outbox)
+
+    finally:
+        await IPNStore.instance.outbox.stop()
+        await cleanup()
+        await Database.instance.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
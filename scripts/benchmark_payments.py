@@ -0,0 +1,126 @@
+"""Benchmark the full payment flow, from /residents/pay to the committed payment, against a mock gateway.
+
+Run `python scripts/benchmark_payments.py [--payments N] [--concurrency N]` while the API server and
+`scripts/mock_vnpay.py` are running (see the documentation of the latter).
+
+Each payment follows the redirects of a resident: `/residents/pay`, the payment page of the gateway
+and `/residents/vnpay-return`. The gateway then notifies `/ipn`. The latency of the redirect chain,
+the throughput of payments and the time until every notification is acknowledged and every payment
+is committed are printed. The benchmark fees and their payments are deleted at the end.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from yarl import URL
+
+
+root = Path(__file__).parent.parent.resolve()
+sys.path.append(str(root))
+
+
+from benchmark_ipn import cleanup, create_fees  # noqa
+from mock_vnpay import fetch  # noqa
+from server import Database  # noqa
+
+
+async def count_payments(fees: List[int]) -> int:
+    placeholders = ", ".join("?" for _ in fees)
+    async with Database.instance.pool.acquire() as connection:
+        async with connection.cursor() as cursor:
+            await cursor.execute(f"SELECT COUNT(1) AS count FROM payments WHERE fee_id IN ({placeholders})", *fees)
+            row = await cursor.fetchone()
+            return row.count
+
+
+async def gateway_statistics(gateway: URL) -> Dict[str, Any]:
+    _, _, body = await fetch(gateway.with_path("/stats"))
+    return json.loads(body)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the full payment flow against a mock gateway")
+    parser.add_argument("--server", type=str, default="http://localhost:8000", help="Base URL of the API server")
+    parser.add_argument("--gateway", type=str, default="http://localhost:8001", help="Base URL of the mock gateway")
+    parser.add_argument("--payments", type=int, default=2000, help="Number of payments")
+    parser.add_argument("--concurrency", type=int, default=200, help="Number of concurrent residents")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Maximum time to wait for the payments to be committed")
+    args = parser.parse_args()
+
+    server = URL(args.server)
+    gateway = URL(args.gateway)
+
+    await Database.instance.prepare()
+    try:
+        async with Database.instance.pool.acquire() as connection:
+            async with connection.cursor() as cursor:
+                await cursor.execute("SELECT room FROM rooms ORDER BY room")
+                rooms = [row.room for row in await cursor.fetchall()]
+
+        if len(rooms) == 0:
+            raise RuntimeError("No rooms to pay for, run scripts/sample.py first")
+
+        fees = await create_fees((args.payments + len(rooms) - 1) // len(rooms))
+        before = await gateway_statistics(gateway)
+
+        latencies: List[float] = []
+        failures = 0
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def pay(index: int) -> None:
+            nonlocal failures
+            url = server.with_path("/api/v1/residents/pay").with_query(
+                room=rooms[index % len(rooms)],
+                fee_id=fees[index // len(rooms)],
+                amount=1000,
+            )
+            async with semaphore:
+                start = time.perf_counter()
+                for _ in range(3):  # /residents/pay, the gateway, /residents/vnpay-return
+                    status, headers, _ = await fetch(url)
+                    if status not in {302, 307} or "location" not in headers:
+                        failures += 1
+                        return
+
+                    url = server.join(URL(headers["location"]))
+
+                latencies.append(1000 * (time.perf_counter() - start))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(pay(index) for index in range(args.payments)))
+        redirected = time.perf_counter() - start
+
+        expected = len(latencies)
+        committed = await count_payments(fees)
+        while committed < expected and time.perf_counter() - start < args.timeout:
+            await asyncio.sleep(0.1)
+            committed = await count_payments(fees)
+
+        elapsed = time.perf_counter() - start
+        after = await gateway_statistics(gateway)
+
+        latencies.sort()
+        p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))] if expected > 0 else 0.0
+        print(f"Redirect chains: {expected} completed, {failures} failed in {redirected:.2f}s ({expected / redirected:.0f}/s)")
+        if expected > 0:
+            print(f"Redirect chain latency: median {statistics.median(latencies):.2f}ms, p95 {p95:.2f}ms, max {latencies[-1]:.2f}ms")
+
+        print(f"Committed {committed}/{expected} payments in {elapsed:.2f}s ({committed / elapsed:.0f}/s)")
+        print(f"Notifications sent: {after['notifications'] - before['notifications']}, errors: {after['errors'] - before['errors']}")
+        print(f"Gateway: {after}")
+
+    finally:
+        await cleanup()
+        await Database.instance.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
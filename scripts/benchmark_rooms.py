@@ -0,0 +1,141 @@
+"""Benchmark room listing against a large number of residents.
+
+Run `python scripts/benchmark_rooms.py [--residents N] [--rooms N] [--repeat N]`.
+
+The residents are inserted inside a transaction that is rolled back at the end, so the
+database is left untouched. Each case is executed `--repeat` times and the latency
+percentiles are printed. The `legacy.*` cases aggregate accounts on the fly the way
+QueryRooms did before per-room counts were maintained by the `room_residents` view.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, List, Tuple
+
+
+root = Path(__file__).parent.parent.resolve()
+sys.path.append(str(root))
+
+
+from server import Database  # noqa
+
+
+LEGACY_QUERY_ROOMS = """
+    SELECT
+        IIF(filtered_rooms.room IS NULL, approved_residents.room, filtered_rooms.room) AS room,
+        area,
+        motorbike,
+        car,
+        IIF(residents IS NULL, 0, residents) AS residents
+    FROM (
+        SELECT room, area, motorbike, car FROM rooms
+    ) AS filtered_rooms
+    FULL OUTER JOIN (
+        SELECT room, COUNT(1) AS residents
+        FROM accounts
+        WHERE approved = 1
+        GROUP BY room
+    ) AS approved_residents ON filtered_rooms.room = approved_residents.room
+    ORDER BY room
+    OFFSET 0 ROWS
+    FETCH NEXT 50 ROWS ONLY
+"""
+
+
+def cases(first_floor: int) -> List[Tuple[str, str, Tuple[Any, ...]]]:
+    return [
+        ("QueryRooms", "EXECUTE QueryRooms @Room = NULL, @Floor = NULL, @Offset = 0, @FetchNext = 50", ()),
+        ("QueryRooms.floor", "EXECUTE QueryRooms @Room = NULL, @Floor = ?, @Offset = 0, @FetchNext = 50", (first_floor,)),
+        ("CountRooms", "EXECUTE CountRooms @Room = NULL, @Floor = NULL", ()),
+        ("QueryFloors", "EXECUTE QueryFloors", ()),
+        ("legacy.QueryRooms", LEGACY_QUERY_ROOMS, ()),
+    ]
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark room listing against a large number of residents")
+    parser.add_argument("--residents", type=int, default=100000, help="Number of approved residents to insert")
+    parser.add_argument("--rooms", type=int, default=1000, help="Number of rooms to spread the residents over")
+    parser.add_argument("--repeat", type=int, default=50, help="Number of executions of each case")
+    args = parser.parse_args()
+
+    await Database.instance.prepare()
+    async with Database.instance.pool.acquire() as connection:
+        async with connection.cursor() as cursor:
+            await cursor.execute("BEGIN TRANSACTION")
+            try:
+                start = time.perf_counter()
+                await cursor.execute(
+                    """
+                        SET NOCOUNT ON
+
+                        DECLARE @Base BIGINT = (SELECT ISNULL(MAX(id), 0) FROM accounts);
+
+                        WITH numbers (n) AS (
+                            SELECT TOP (?) ROW_NUMBER() OVER (ORDER BY (SELECT NULL))
+                            FROM sys.all_objects a CROSS JOIN sys.all_objects b CROSS JOIN sys.all_objects c
+                        )
+                        INSERT INTO accounts (id, name, room, birthday, phone, email, username, hashed_password, approved)
+                        SELECT
+                            @Base + n,
+                            CONCAT(N'Benchmark ', n),
+                            100 + n % ?,
+                            NULL,
+                            N'0999999999',
+                            NULL,
+                            CONCAT(N'__benchmark__', n),
+                            N'',
+                            1
+                        FROM numbers
+                    """,
+                    args.residents,
+                    args.rooms,
+                )
+                print(f"Inserted {args.residents} residents into {args.rooms} rooms in {time.perf_counter() - start:.2f}s")
+
+                # Cost of maintaining the counts on the write path: move a resident to another room and back
+                await cursor.execute("SELECT TOP 1 id, room FROM accounts WHERE username = N'__benchmark__1'")
+                resident = await cursor.fetchone()
+                write_cases = [
+                    (
+                        "UpdateResident.move",
+                        """
+                            EXECUTE UpdateResident @Id = ?, @Name = N'Benchmark', @Room = ?, @Birthday = NULL, @Phone = N'0999999999', @Email = NULL
+                            EXECUTE UpdateResident @Id = ?, @Name = N'Benchmark', @Room = ?, @Birthday = NULL, @Phone = N'0999999999', @Email = NULL
+                        """,
+                        (resident.id, resident.room + 1, resident.id, resident.room),
+                    ),
+                ]
+
+                print(f"{'case':<24}{'median':>10}{'p95':>10}{'max':>10}  (ms, {args.repeat} runs)")
+                for name, sql, params in cases(1) + write_cases:
+                    durations: List[float] = []
+                    for _ in range(args.repeat):
+                        start = time.perf_counter()
+                        await cursor.execute(sql, *params)
+                        while True:
+                            if cursor.description is not None:
+                                await cursor.fetchall()
+
+                            if not await cursor.nextset():
+                                break
+
+                        durations.append(1000 * (time.perf_counter() - start))
+
+                    durations.sort()
+                    p95 = durations[min(len(durations) - 1, int(0.95 * len(durations)))]
+                    print(f"{name:<24}{statistics.median(durations):>10.2f}{p95:>10.2f}{durations[-1]:>10.2f}")
+
+            finally:
+                await cursor.execute("ROLLBACK TRANSACTION")
+
+    await Database.instance.close()
+
+
+asyncio.run(main())
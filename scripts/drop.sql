@@ -1,15 +1,60 @@
+DROP VIEW IF EXISTS room_payment_history_buckets
+GO
+
+DROP VIEW IF EXISTS fee_history_buckets
+GO
+
+DROP TABLE IF EXISTS payments_history
+GO
+
+DROP TABLE IF EXISTS fees_history
+GO
+
+DROP VIEW IF EXISTS room_payment_buckets
+GO
+
+DROP VIEW IF EXISTS fee_payment_totals
+GO
+
 DROP TABLE IF EXISTS payments
 GO
 
+DROP VIEW IF EXISTS fee_buckets
+GO
+
 DROP TABLE IF EXISTS fees
 GO
 
+DROP VIEW IF EXISTS room_residents
+GO
+
 DROP TABLE IF EXISTS accounts
 GO
 
+DROP TABLE IF EXISTS registration_requests
+GO
+
 DROP TABLE IF EXISTS rooms
 GO
 
+DROP TABLE IF EXISTS ipn_outcomes
+GO
+
+DROP TABLE IF EXISTS push_events
+GO
+
+DROP TABLE IF EXISTS account_changes
+GO
+
+DROP TABLE IF EXISTS bills
+GO
+
+DROP TABLE IF EXISTS change_versions
+GO
+
+DROP TABLE IF EXISTS scheduler_jobs
+GO
+
 DROP TABLE IF EXISTS config_datetime2
 GO
 
@@ -19,5 +64,17 @@ GO
 DROP TABLE IF EXISTS config
 GO
 
+DROP PROCEDURE IF EXISTS CreatePayments
+GO
+
+DROP PROCEDURE IF EXISTS CreateOfflinePayments
+GO
+
+DROP TYPE IF EXISTS OFFLINEPAYMENTARRAY
+GO
+
+DROP TYPE IF EXISTS PAYMENTARRAY
+GO
+
 DROP TYPE IF EXISTS BIGINTARRAY
 GO
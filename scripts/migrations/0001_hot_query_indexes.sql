@@ -0,0 +1,13 @@
+-- Supporting indexes for the hot query patterns:
+-- - Every accounts query filters on approved, optionally ranging over the snowflake ID
+-- - QueryRooms and CountRooms group/union approved accounts by room
+-- - CountPaymentStatus counts payments by fee_id range (UQ_payments_room_fee_id leads with room)
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_accounts_approved_id' AND object_id = OBJECT_ID('accounts'))
+    CREATE INDEX IX_accounts_approved_id ON accounts (approved, id)
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_accounts_approved_room' AND object_id = OBJECT_ID('accounts'))
+    CREATE INDEX IX_accounts_approved_room ON accounts (approved, room)
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_payments_fee_id' AND object_id = OBJECT_ID('payments'))
+    CREATE INDEX IX_payments_fee_id ON payments (fee_id) INCLUDE (room)
@@ -0,0 +1,15 @@
+-- Supporting indexes for the sortable columns of QueryFees. The clustered key (id) is implicitly
+-- part of each index, which matches the "ORDER BY <column>, id" tie-breaker, and name is included
+-- so that the name filter can be evaluated without a lookup.
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_fees_name' AND object_id = OBJECT_ID('fees'))
+    CREATE INDEX IX_fees_name ON fees (name)
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_fees_deadline' AND object_id = OBJECT_ID('fees'))
+    CREATE INDEX IX_fees_deadline ON fees (deadline) INCLUDE (name)
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_fees_lower' AND object_id = OBJECT_ID('fees'))
+    CREATE INDEX IX_fees_lower ON fees (lower) INCLUDE (name)
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_fees_upper' AND object_id = OBJECT_ID('fees'))
+    CREATE INDEX IX_fees_upper ON fees (upper) INCLUDE (name)
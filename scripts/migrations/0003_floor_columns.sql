@@ -0,0 +1,18 @@
+-- Persisted floor column so that floor aggregates can seek an index instead of evaluating
+-- room / 100 for every row. Statements referencing the new column are executed dynamically
+-- because this file is compiled as a single batch.
+
+IF COL_LENGTH('rooms', 'floor') IS NULL
+    ALTER TABLE rooms ADD floor AS CAST(room / 100 AS SMALLINT) PERSISTED
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_rooms_floor' AND object_id = OBJECT_ID('rooms'))
+    EXECUTE sp_executesql N'CREATE INDEX IX_rooms_floor ON rooms (floor) INCLUDE (area, motorbike, car)'
+
+-- Residents per floor are read from the room_residents view (see migration 0004): drop the column
+-- and index of accounts created by an earlier version of this migration, which every write to
+-- accounts had to maintain
+IF EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_accounts_approved_floor' AND object_id = OBJECT_ID('accounts'))
+    DROP INDEX IX_accounts_approved_floor ON accounts
+
+IF COL_LENGTH('accounts', 'floor') IS NOT NULL
+    ALTER TABLE accounts DROP COLUMN floor
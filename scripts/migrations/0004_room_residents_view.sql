@@ -0,0 +1,19 @@
+-- Per-room counts of approved residents, maintained by SQL Server on every write to accounts
+-- (approval, deletion, room change) instead of being aggregated on every room query.
+-- CREATE VIEW must be the only statement in its batch, hence the dynamic SQL. Readers should use
+-- WITH (NOEXPAND) so that the clustered index is read even on editions without automatic matching.
+
+SET ANSI_NULLS, ANSI_PADDING, ANSI_WARNINGS, ARITHABORT, CONCAT_NULL_YIELDS_NULL, QUOTED_IDENTIFIER ON
+SET NUMERIC_ROUNDABORT OFF
+
+IF OBJECT_ID('room_residents', 'V') IS NULL
+    EXECUTE sp_executesql N'
+        CREATE VIEW room_residents WITH SCHEMABINDING AS
+        SELECT room, COUNT_BIG(*) AS residents
+        FROM dbo.accounts
+        WHERE approved = 1
+        GROUP BY room
+    '
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_room_residents' AND object_id = OBJECT_ID('room_residents'))
+    EXECUTE sp_executesql N'CREATE UNIQUE CLUSTERED INDEX IX_room_residents ON room_residents (room)'
@@ -0,0 +1,33 @@
+-- Fee and payment counters bucketed by the day a fee was created, so that time-windowed payment
+-- status counts sum a few buckets instead of probing payments for every fee in the window.
+-- A bucket is `id / 5662310400000`, i.e. (id >> 16) / 86400000: the whole days elapsed since the
+-- snowflake epoch when the fee was created. Both views are maintained by SQL Server on every write
+-- to fees and payments (CreateFee, CreatePayment).
+
+SET ANSI_NULLS, ANSI_PADDING, ANSI_WARNINGS, ARITHABORT, CONCAT_NULL_YIELDS_NULL, QUOTED_IDENTIFIER ON
+SET NUMERIC_ROUNDABORT OFF
+
+IF OBJECT_ID('fee_buckets', 'V') IS NULL
+    EXECUTE sp_executesql N'
+        CREATE VIEW fee_buckets WITH SCHEMABINDING AS
+        SELECT id / 5662310400000 AS bucket, COUNT_BIG(*) AS fees
+        FROM dbo.fees
+        GROUP BY id / 5662310400000
+    '
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_fee_buckets' AND object_id = OBJECT_ID('fee_buckets'))
+    EXECUTE sp_executesql N'CREATE UNIQUE CLUSTERED INDEX IX_fee_buckets ON fee_buckets (bucket)'
+
+IF OBJECT_ID('room_payment_buckets', 'V') IS NULL
+    EXECUTE sp_executesql N'
+        CREATE VIEW room_payment_buckets WITH SCHEMABINDING AS
+        SELECT room, fee_id / 5662310400000 AS bucket, COUNT_BIG(*) AS paid
+        FROM dbo.payments
+        GROUP BY room, fee_id / 5662310400000
+    '
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_room_payment_buckets' AND object_id = OBJECT_ID('room_payment_buckets'))
+    EXECUTE sp_executesql N'CREATE UNIQUE CLUSTERED INDEX IX_room_payment_buckets ON room_payment_buckets (room, bucket)'
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_room_payment_buckets_bucket' AND object_id = OBJECT_ID('room_payment_buckets'))
+    EXECUTE sp_executesql N'CREATE INDEX IX_room_payment_buckets_bucket ON room_payment_buckets (bucket) INCLUDE (paid)'
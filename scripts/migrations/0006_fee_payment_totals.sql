@@ -0,0 +1,16 @@
+-- Number of paying rooms and collected amount per fee, maintained by SQL Server on every write to
+-- payments so that the admin dashboard does not aggregate the payments table.
+
+SET ANSI_NULLS, ANSI_PADDING, ANSI_WARNINGS, ARITHABORT, CONCAT_NULL_YIELDS_NULL, QUOTED_IDENTIFIER ON
+SET NUMERIC_ROUNDABORT OFF
+
+IF OBJECT_ID('fee_payment_totals', 'V') IS NULL
+    EXECUTE sp_executesql N'
+        CREATE VIEW fee_payment_totals WITH SCHEMABINDING AS
+        SELECT fee_id, COUNT_BIG(*) AS paid, SUM(amount) AS collected
+        FROM dbo.payments
+        GROUP BY fee_id
+    '
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_fee_payment_totals' AND object_id = OBJECT_ID('fee_payment_totals'))
+    EXECUTE sp_executesql N'CREATE UNIQUE CLUSTERED INDEX IX_fee_payment_totals ON fee_payment_totals (fee_id)'
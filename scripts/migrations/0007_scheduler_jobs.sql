@@ -0,0 +1,14 @@
+-- Run statistics of the periodic jobs executed by the scheduler leader, accumulated across leaders
+
+IF NOT EXISTS (SELECT 1 FROM sys.objects WHERE name = 'scheduler_jobs' AND type = 'U')
+    CREATE TABLE scheduler_jobs (
+        name NVARCHAR(255) PRIMARY KEY,
+        leader NVARCHAR(255) NOT NULL, -- host:pid of the worker that ran the job last
+        runs BIGINT NOT NULL,
+        failures BIGINT NOT NULL,
+        overruns BIGINT NOT NULL, -- scheduled times skipped because the previous run was still in progress
+        last_started DATETIME2 NOT NULL,
+        last_duration FLOAT NOT NULL, -- in seconds
+        last_success DATETIME2,
+        last_error NVARCHAR(max)
+    )
@@ -0,0 +1,14 @@
+-- A version per table, incremented by the worker modifying the table and polled by every worker
+-- in order to invalidate their in-process caches (see server/bus.py)
+
+IF NOT EXISTS (SELECT 1 FROM sys.objects WHERE name = 'change_versions' AND type = 'U')
+    CREATE TABLE change_versions (
+        name NVARCHAR(64) PRIMARY KEY,
+        version BIGINT NOT NULL,
+        changed DATETIME2 NOT NULL
+    )
+
+INSERT INTO change_versions (name, version, changed)
+SELECT name, 0, SYSUTCDATETIME()
+FROM (VALUES ('accounts'), ('fees'), ('payments'), ('rooms')) AS tables (name)
+WHERE name NOT IN (SELECT name FROM change_versions)
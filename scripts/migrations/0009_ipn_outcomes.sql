@@ -0,0 +1,16 @@
+-- Outcomes of processed VNPay IPN callbacks, so that retried callbacks replay the recorded response
+-- instead of processing the payment again
+
+IF NOT EXISTS (SELECT 1 FROM sys.objects WHERE name = 'ipn_outcomes' AND type = 'U')
+    CREATE TABLE ipn_outcomes (
+        txn_ref NVARCHAR(64) PRIMARY KEY,
+        code CHAR(2) NOT NULL,
+        message NVARCHAR(64) NOT NULL,
+        processed DATETIME2 NOT NULL
+    )
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_ipn_outcomes_processed' AND object_id = OBJECT_ID('ipn_outcomes'))
+    CREATE INDEX IX_ipn_outcomes_processed ON ipn_outcomes (processed) INCLUDE (code, message)
+
+IF NOT EXISTS (SELECT 1 FROM change_versions WHERE name = 'ipn_outcomes')
+    INSERT INTO change_versions (name, version, changed) VALUES ('ipn_outcomes', 0, SYSUTCDATETIME())
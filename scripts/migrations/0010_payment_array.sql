@@ -0,0 +1,9 @@
+-- Table-valued parameter of CreatePayments, used by the batched payment writer
+
+IF NOT EXISTS (SELECT 1 FROM sys.types WHERE name = 'PAYMENTARRAY')
+    CREATE TYPE PAYMENTARRAY AS TABLE (
+        txn_ref NVARCHAR(64) NOT NULL PRIMARY KEY,
+        room SMALLINT NOT NULL,
+        amount INT NOT NULL,
+        fee_id BIGINT NOT NULL
+    )
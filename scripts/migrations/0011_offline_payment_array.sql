@@ -0,0 +1,9 @@
+-- Table-valued parameter of CreateOfflinePayments, used to record payments collected by administrators
+
+IF NOT EXISTS (SELECT 1 FROM sys.types WHERE name = 'OFFLINEPAYMENTARRAY')
+    CREATE TYPE OFFLINEPAYMENTARRAY AS TABLE (
+        position INT NOT NULL PRIMARY KEY, -- Index in the request
+        room SMALLINT NOT NULL,
+        amount BIGINT NOT NULL,
+        fee_id BIGINT NOT NULL
+    )
@@ -0,0 +1,12 @@
+-- Monthly utility bills:
+-- - Imports merge a month of readings at a time, and monthly listings scan a month: cluster on (month, room, type)
+-- - Per-room statements seek by room over a range of months
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'CX_bills_month_room_type' AND object_id = OBJECT_ID('bills'))
+    CREATE UNIQUE CLUSTERED INDEX CX_bills_month_room_type ON bills (month, room, type)
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_bills_room_month' AND object_id = OBJECT_ID('bills'))
+    CREATE INDEX IX_bills_room_month ON bills (room, month) INCLUDE (type, amount)
+
+IF NOT EXISTS (SELECT 1 FROM change_versions WHERE name = 'bills')
+    INSERT INTO change_versions (name, version, changed) VALUES ('bills', 0, SYSUTCDATETIME())
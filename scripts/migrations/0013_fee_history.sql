@@ -0,0 +1,66 @@
+-- History tables for the fees of closed years and their payments, filled by ArchiveFees (see the
+-- archive_fees job in server/jobs.py). Rows are moved by snowflake ID: every fee with an ID below
+-- config_bigint.archive_boundary may live in fees_history, together with its payments. Procedures
+-- reading a window of fees only touch the history tables when the window starts below the
+-- boundary. Archived rows are never modified again, hence the page compression.
+
+SET ANSI_NULLS, ANSI_PADDING, ANSI_WARNINGS, ARITHABORT, CONCAT_NULL_YIELDS_NULL, QUOTED_IDENTIFIER ON
+SET NUMERIC_ROUNDABORT OFF
+
+IF NOT EXISTS (SELECT 1 FROM config_bigint WHERE name = 'archive_boundary')
+    INSERT INTO config_bigint VALUES ('archive_boundary', 0)
+
+IF NOT EXISTS (SELECT 1 FROM sys.objects WHERE name = 'fees_history' AND type = 'U')
+    CREATE TABLE fees_history (
+        id BIGINT PRIMARY KEY,
+        name NVARCHAR(255) COLLATE Vietnamese_100_CS_AS_KS_WS NOT NULL,
+        lower BIGINT NOT NULL,
+        upper BIGINT NOT NULL,
+        per_area INT NOT NULL,
+        per_motorbike INT NOT NULL,
+        per_car INT NOT NULL,
+        deadline DATE NOT NULL,
+        description NVARCHAR(max) COLLATE Vietnamese_100_CS_AS_KS_WS,
+        flags TINYINT NOT NULL
+    )
+    WITH (DATA_COMPRESSION = PAGE)
+
+IF NOT EXISTS (SELECT 1 FROM sys.objects WHERE name = 'payments_history' AND type = 'U')
+    CREATE TABLE payments_history (
+        id BIGINT PRIMARY KEY,
+        room SMALLINT NOT NULL,
+        amount BIGINT NOT NULL,
+        fee_id BIGINT NOT NULL,
+        CONSTRAINT FK_payments_history_rooms FOREIGN KEY (room) REFERENCES rooms(room),
+        CONSTRAINT UQ_payments_history_room_fee_id UNIQUE (room, fee_id) WITH (DATA_COMPRESSION = PAGE)
+    )
+    WITH (DATA_COMPRESSION = PAGE)
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_payments_history_fee_id' AND object_id = OBJECT_ID('payments_history'))
+    CREATE INDEX IX_payments_history_fee_id ON payments_history (fee_id) INCLUDE (room) WITH (DATA_COMPRESSION = PAGE)
+
+-- Same buckets as fee_buckets and room_payment_buckets (see migration 0005)
+IF OBJECT_ID('fee_history_buckets', 'V') IS NULL
+    EXECUTE sp_executesql N'
+        CREATE VIEW fee_history_buckets WITH SCHEMABINDING AS
+        SELECT id / 5662310400000 AS bucket, COUNT_BIG(*) AS fees
+        FROM dbo.fees_history
+        GROUP BY id / 5662310400000
+    '
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_fee_history_buckets' AND object_id = OBJECT_ID('fee_history_buckets'))
+    EXECUTE sp_executesql N'CREATE UNIQUE CLUSTERED INDEX IX_fee_history_buckets ON fee_history_buckets (bucket)'
+
+IF OBJECT_ID('room_payment_history_buckets', 'V') IS NULL
+    EXECUTE sp_executesql N'
+        CREATE VIEW room_payment_history_buckets WITH SCHEMABINDING AS
+        SELECT room, fee_id / 5662310400000 AS bucket, COUNT_BIG(*) AS paid
+        FROM dbo.payments_history
+        GROUP BY room, fee_id / 5662310400000
+    '
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_room_payment_history_buckets' AND object_id = OBJECT_ID('room_payment_history_buckets'))
+    EXECUTE sp_executesql N'CREATE UNIQUE CLUSTERED INDEX IX_room_payment_history_buckets ON room_payment_history_buckets (room, bucket)'
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_room_payment_history_buckets_bucket' AND object_id = OBJECT_ID('room_payment_history_buckets'))
+    EXECUTE sp_executesql N'CREATE INDEX IX_room_payment_history_buckets_bucket ON room_payment_history_buckets (bucket) INCLUDE (paid)'
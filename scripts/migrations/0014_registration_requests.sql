@@ -0,0 +1,36 @@
+-- Pending registration requests live in their own table instead of as unapproved accounts, so that
+-- spam registrations never bloat the accounts indexes scanned by resident queries. Requests expire
+-- (see the purge_registration_requests job in server/jobs.py) and approval moves them to accounts.
+-- accounts.approved is kept for the room_residents view and its indexes, it is now always 1.
+
+IF NOT EXISTS (SELECT 1 FROM sys.objects WHERE name = 'registration_requests' AND type = 'U')
+    CREATE TABLE registration_requests (
+        id BIGINT PRIMARY KEY,
+        name NVARCHAR(255) COLLATE Vietnamese_100_CS_AS_KS_WS NOT NULL,
+        room SMALLINT NOT NULL,
+        birthday DATE,
+        phone NVARCHAR(15) NOT NULL,
+        email NVARCHAR(255),
+        username NVARCHAR(255) NOT NULL,
+        hashed_password NVARCHAR(255) NOT NULL,
+        CONSTRAINT UQ_registration_requests_username UNIQUE (username)
+    )
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_registration_requests_room' AND object_id = OBJECT_ID('registration_requests'))
+    CREATE INDEX IX_registration_requests_room ON registration_requests (room)
+
+IF EXISTS (SELECT 1 FROM accounts WHERE approved = 0)
+BEGIN
+    BEGIN TRANSACTION
+        INSERT INTO registration_requests (id, name, room, birthday, phone, email, username, hashed_password)
+        SELECT id, name, room, birthday, phone, email, username, hashed_password
+        FROM accounts WITH (TABLOCKX)
+        WHERE approved = 0
+
+        DELETE FROM accounts WHERE approved = 0
+
+    COMMIT TRANSACTION
+END
+
+IF NOT EXISTS (SELECT 1 FROM change_versions WHERE name = 'registration_requests')
+    INSERT INTO change_versions (name, version, changed) VALUES ('registration_requests', 0, SYSUTCDATETIME())
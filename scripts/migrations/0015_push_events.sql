@@ -0,0 +1,20 @@
+-- Events pushed to connected clients (see PushHub in server/push.py). Each worker inserts the events
+-- of its model-layer writes and reads the events of the other workers after their change_versions
+-- increment. Ids are assigned and committed in order (inserts take an exclusive table lock), so that
+-- readers never skip an event, and clients resume from the last id they received. Rows are deleted
+-- after a day, see the purge_push_events job in server/jobs.py.
+
+IF NOT EXISTS (SELECT 1 FROM sys.objects WHERE name = 'push_events' AND type = 'U')
+    CREATE TABLE push_events (
+        id BIGINT IDENTITY(1, 1) PRIMARY KEY,
+        event NVARCHAR(64) NOT NULL,
+        room SMALLINT,
+        data NVARCHAR(MAX) NOT NULL,
+        created DATETIME2 NOT NULL
+    )
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_push_events_created' AND object_id = OBJECT_ID('push_events'))
+    CREATE INDEX IX_push_events_created ON push_events (created)
+
+IF NOT EXISTS (SELECT 1 FROM change_versions WHERE name = 'push_events')
+    INSERT INTO change_versions (name, version, changed) VALUES ('push_events', 0, SYSUTCDATETIME())
@@ -0,0 +1,18 @@
+-- Ids of the accounts changed by each worker (see ResidentIndex in server/v1/models/resident_index.py).
+-- The other workers read the new rows after the change_versions increment of 'account_changes' and
+-- fetch only these accounts, instead of reloading every resident. Ids are assigned and committed in
+-- order (inserts take an exclusive table lock), so that readers never skip a change. Rows are deleted
+-- after a day, see the purge_account_changes job in server/jobs.py.
+
+IF NOT EXISTS (SELECT 1 FROM sys.objects WHERE name = 'account_changes' AND type = 'U')
+    CREATE TABLE account_changes (
+        id BIGINT IDENTITY(1, 1) PRIMARY KEY,
+        account BIGINT NOT NULL,
+        created DATETIME2 NOT NULL
+    )
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_account_changes_created' AND object_id = OBJECT_ID('account_changes'))
+    CREATE INDEX IX_account_changes_created ON account_changes (created)
+
+IF NOT EXISTS (SELECT 1 FROM change_versions WHERE name = 'account_changes')
+    INSERT INTO change_versions (name, version, changed) VALUES ('account_changes', 0, SYSUTCDATETIME())
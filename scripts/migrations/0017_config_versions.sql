@@ -0,0 +1,19 @@
+-- Changes of the config table (e.g. an operator rotating session_secret_key) increment its version,
+-- so that the workers caching config values reload them (see server/bus.py). Config is modified
+-- outside of the application, hence the trigger instead of an InvalidationBus event.
+
+IF NOT EXISTS (SELECT 1 FROM change_versions WHERE name = 'config')
+    INSERT INTO change_versions (name, version, changed) VALUES ('config', 0, SYSUTCDATETIME())
+
+-- CREATE TRIGGER must be the first statement of its batch
+EXECUTE('
+    CREATE OR ALTER TRIGGER TR_config_version ON config
+    AFTER INSERT, UPDATE, DELETE
+    AS
+    BEGIN
+        SET NOCOUNT ON
+        UPDATE change_versions
+        SET version = version + 1, changed = SYSUTCDATETIME()
+        WHERE name = ''config''
+    END
+')
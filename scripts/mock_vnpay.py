@@ -0,0 +1,171 @@
+"""A local mock of the VNPay payment gateway, to load-test the payment flow offline.
+
+Run `python scripts/mock_vnpay.py [--port N] [--ipn-url URL] [--latency S] [--duplicates P] [--failure-rate P]`,
+then start the API server with `VNPAY_BASE_URL=http://localhost:<port>/paymentv2/vpcpay.html` and
+`SERVER_BASE_URL` pointing to itself.
+
+The payment page verifies the signature of the request, immediately redirects the client to
+`vnp_ReturnUrl` with the signed result, and sends the same result to `--ipn-url` after `--latency`
+seconds (with up to 50% jitter). Like VNPay, it retries the notification up to `--retries` times
+while the response code is neither `00` nor `02`. With probability `--duplicates`, the notification
+is delivered once more; with probability `--failure-rate`, the payment is reported as cancelled by
+the customer (response code `24`).
+
+`GET /stats` returns the counters of the gateway.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Set, Tuple
+
+
+root = Path(__file__).parent.parent.resolve()
+sys.path.append(str(root))
+
+
+import uvicorn  # noqa
+from fastapi import FastAPI, Request  # noqa
+from fastapi.responses import PlainTextResponse, RedirectResponse, Response  # noqa
+from yarl import URL  # noqa
+
+from server import InvalidSignature, VNPayGateway  # noqa
+
+
+async def fetch(url: URL, *, timeout: float = 30.0) -> Tuple[int, Dict[str, str], bytes]:
+    """Send a GET request with a new connection, and return the status code, headers and body."""
+    reader, writer = await asyncio.open_connection(url.host, url.port)
+    try:
+        writer.write(f"GET {url.raw_path_qs} HTTP/1.1\r\nHost: {url.raw_authority}\r\nConnection: close\r\n\r\n".encode("ascii"))
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), timeout)
+    finally:
+        writer.close()
+
+    head, _, body = response.partition(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    headers = {key.strip().lower(): value.strip() for key, _, value in (line.partition(":") for line in lines[1:])}
+    return int(lines[0].split(" ", 2)[1]), headers, body
+
+
+class MockGateway:
+
+    __slots__ = ("args", "statistics", "tasks")
+
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.args = args
+        self.statistics: Dict[str, Any] = {
+            "payments": 0,
+            "cancelled": 0,
+            "notifications": 0,
+            "responses": {},
+            "errors": 0,
+            "latency": {"count": 0, "mean": 0.0, "max": 0.0},  # From the payment to its first acknowledgement
+        }
+        self.tasks: Set[asyncio.Task[None]] = set()
+
+    def result(self, params: Dict[str, str]) -> Dict[str, Any]:
+        now = datetime.now(timezone(timedelta(hours=7)))
+        code = "24" if random.random() < self.args.failure_rate else "00"
+        result: Dict[str, Any] = {
+            "vnp_Amount": params["vnp_Amount"],
+            "vnp_BankCode": "NCB",
+            "vnp_BankTranNo": f"VNP{random.randrange(10 ** 8):08}",
+            "vnp_CardType": "ATM",
+            "vnp_OrderInfo": params.get("vnp_OrderInfo", ""),
+            "vnp_PayDate": now.strftime("%Y%m%d%H%M%S"),
+            "vnp_ResponseCode": code,
+            "vnp_TmnCode": params["vnp_TmnCode"],
+            "vnp_TransactionNo": random.randrange(10 ** 8),
+            "vnp_TransactionStatus": code,
+            "vnp_TxnRef": params["vnp_TxnRef"],
+        }
+        result["vnp_SecureHash"] = VNPayGateway.instance.sign(result)
+        return result
+
+    def record(self, started: float) -> None:
+        latency = self.statistics["latency"]
+        elapsed = time.perf_counter() - started
+        latency["mean"] = (latency["mean"] * latency["count"] + elapsed) / (latency["count"] + 1)
+        latency["max"] = max(latency["max"], elapsed)
+        latency["count"] += 1
+
+    async def notify(self, result: Dict[str, Any], started: float) -> None:
+        await asyncio.sleep(self.args.latency * random.uniform(0.5, 1.5))
+        deliveries = 2 if random.random() < self.args.duplicates else 1
+        acknowledged = False
+        for _ in range(deliveries):
+            for attempt in range(self.args.retries + 1):
+                if attempt > 0:
+                    await asyncio.sleep(self.args.retry_delay)
+
+                self.statistics["notifications"] += 1
+                try:
+                    status, _, body = await fetch(URL(self.args.ipn_url).update_query(result))
+                    code = json.loads(body)["RspCode"] if status == 200 else str(status)
+                except Exception:
+                    self.statistics["errors"] += 1
+                    continue
+
+                responses = self.statistics["responses"]
+                responses[code] = responses.get(code, 0) + 1
+                if code in {"00", "02"}:
+                    if not acknowledged:
+                        acknowledged = True
+                        self.record(started)
+
+                    break
+
+    def create_app(self) -> FastAPI:
+        app = FastAPI(title="Mock VNPay gateway")
+
+        @app.get("/paymentv2/vpcpay.html")
+        async def pay(request: Request) -> Response:
+            started = time.perf_counter()
+            try:
+                params = VNPayGateway.instance.verify(request.query_params)
+            except (KeyError, InvalidSignature):
+                return PlainTextResponse("Invalid signature", status_code=400)
+
+            self.statistics["payments"] += 1
+            result = self.result(params)
+            if result["vnp_ResponseCode"] != "00":
+                self.statistics["cancelled"] += 1
+
+            task = asyncio.create_task(self.notify(result, started))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+            return RedirectResponse(str(URL(params["vnp_ReturnUrl"]).update_query(result)), status_code=302)
+
+        @app.get("/stats")
+        async def stats() -> Dict[str, Any]:
+            return {**self.statistics, "pending": len(self.tasks)}
+
+        return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run a local mock of the VNPay payment gateway")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Host to listen on")
+    parser.add_argument("--port", type=int, default=8001, help="Port to listen on")
+    parser.add_argument("--ipn-url", type=str, default="http://localhost:8000/ipn", help="URL of the IPN endpoint")
+    parser.add_argument("--latency", type=float, default=0.1, help="Mean delay before sending a notification, in seconds")
+    parser.add_argument("--duplicates", type=float, default=0.0, help="Probability of delivering a notification twice")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Probability of a payment being cancelled")
+    parser.add_argument("--retries", type=int, default=3, help="Maximum number of retries of an unacknowledged notification")
+    parser.add_argument("--retry-delay", type=float, default=1.0, help="Delay between retries, in seconds")
+    args = parser.parse_args()
+
+    uvicorn.run(MockGateway(args).create_app(), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
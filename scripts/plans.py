@@ -0,0 +1,177 @@
+"""Capture the actual execution plans of every stored procedure.
+
+Populate the database at benchmark scale first (`python scripts/sample.py`), then run
+`python scripts/plans.py [--output DIR] [--baseline FILE]`.
+
+For each case below, the procedure is executed inside a rolled back transaction with
+`SET STATISTICS XML ON`. The raw plans are saved as `<case>.sqlplan` files (these can be
+opened with SSMS or Azure Data Studio), and a condensed summary of the physical operators is
+written to `summary.txt`. Passing the summary of a previous run as `--baseline` prints a diff,
+so that a scan replacing a seek is easy to spot.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import difflib
+import sys
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+
+root = Path(__file__).parent.parent.resolve()
+sys.path.append(str(root))
+
+
+from server import Database, EPOCH  # noqa
+
+
+SHOWPLAN_COLUMN = "Microsoft SQL Server 2005 XML Showplan"
+NAMESPACE = {"sp": "http://schemas.microsoft.com/sqlserver/2004/07/showplan"}
+
+
+def cases(samples: Dict[str, Any]) -> List[Tuple[str, str, Tuple[Any, ...]]]:
+    now = datetime.now(timezone.utc)
+    month_ago = now - timedelta(days=30)
+    room = samples["room"]
+    fee_id = samples["fee_id"]
+    resident_id = samples["resident_id"]
+    request_id = samples["request_id"]
+
+    return [
+        ("ApproveRegistrationRequests", "DECLARE @Id BIGINTARRAY INSERT INTO @Id VALUES (?) EXECUTE ApproveRegistrationRequests @Id = @Id", (request_id,)),
+        ("ArchiveFees", "EXECUTE ArchiveFees @Before = ?, @BatchSize = 4096", (now,)),
+        ("CountAccounts", "EXECUTE CountAccounts @CreatedAfter = ?, @CreatedBefore = ?, @Name = NULL, @Room = NULL, @Username = NULL, @Approved = 1", (EPOCH, now)),
+        ("CountAccounts.room", "EXECUTE CountAccounts @CreatedAfter = ?, @CreatedBefore = ?, @Name = NULL, @Room = ?, @Username = NULL, @Approved = 1", (EPOCH, now, room)),
+        ("CountAccounts.pending", "EXECUTE CountAccounts @CreatedAfter = ?, @CreatedBefore = ?, @Name = NULL, @Room = NULL, @Username = NULL, @Approved = 0", (EPOCH, now)),
+        ("CountBills", "EXECUTE CountBills @Room = NULL, @From = ?, @To = ?", (EPOCH.date(), now.date())),
+        ("CountFees", "EXECUTE CountFees @CreatedAfter = ?, @CreatedBefore = ?, @Name = NULL", (month_ago, now)),
+        ("CountPaymentStatus", "EXECUTE CountPaymentStatus @Room = NULL, @Paid = 1, @CreatedAfter = ?, @CreatedBefore = ?", (EPOCH, now)),
+        ("CountPaymentStatus.room", "EXECUTE CountPaymentStatus @Room = ?, @Paid = 0, @CreatedAfter = ?, @CreatedBefore = ?", (room, EPOCH, now)),
+        ("CountRooms", "EXECUTE CountRooms @Room = NULL, @Floor = NULL", ()),
+        ("CountRooms.floor", "EXECUTE CountRooms @Room = NULL, @Floor = ?", (room // 100,)),
+        ("CreateFee", "EXECUTE CreateFee @Name = N'Plan', @Lower = 0, @Upper = 100, @PerArea = 0, @PerMotorbike = 0, @PerCar = 0, @Deadline = ?, @Description = N'', @Flags = 0", (now.date(),)),
+        ("CreateOfflinePayments", "DECLARE @Payments OFFLINEPAYMENTARRAY INSERT INTO @Payments VALUES (0, ?, 0, ?) EXECUTE CreateOfflinePayments @Payments = @Payments", (room, fee_id)),
+        ("CreatePayment", "EXECUTE CreatePayment @Room = ?, @Amount = 0, @FeeId = ?", (room, fee_id)),
+        ("CreatePayment.ipn", "EXECUTE CreatePayment @Room = ?, @Amount = 0, @FeeId = ?, @TxnRef = N'plan'", (room, fee_id)),
+        ("DeleteResidents", "DECLARE @Id BIGINTARRAY INSERT INTO @Id VALUES (?) EXECUTE DeleteResidents @Id = @Id", (resident_id,)),
+        ("DeleteRoom", "DECLARE @Rooms BIGINTARRAY INSERT INTO @Rooms VALUES (?) EXECUTE DeleteRoom @Rooms = @Rooms", (room,)),
+        ("GenerateId", "DECLARE @Id BIGINT EXECUTE GenerateId @Id = @Id OUTPUT", ()),
+        ("PurgeRegistrationRequests", "EXECUTE PurgeRegistrationRequests @Before = ?, @BatchSize = 4096", (month_ago,)),
+        ("QueryAdminInfo", "EXECUTE QueryAdminInfo", ()),
+        ("QueryBills", "EXECUTE QueryBills @Room = NULL, @From = ?, @To = ?, @Offset = 0, @FetchNext = 50", (EPOCH.date(), now.date())),
+        ("QueryBills.room", "EXECUTE QueryBills @Room = ?, @From = ?, @To = ?, @Offset = 0, @FetchNext = 50", (room, EPOCH.date(), now.date())),
+        ("QueryDashboard", "EXECUTE QueryDashboard @FetchFees = 50", ()),
+        ("QueryFees", "EXECUTE QueryFees @CreatedAfter = ?, @CreatedBefore = ?, @Name = NULL, @OrderBy = -1, @Offset = 0, @FetchNext = 50", (EPOCH, now)),
+        ("QueryFees.name", "EXECUTE QueryFees @CreatedAfter = ?, @CreatedBefore = ?, @Name = NULL, @OrderBy = 2, @Offset = 0, @FetchNext = 50", (EPOCH, now)),
+        ("QueryFees.deadline", "EXECUTE QueryFees @CreatedAfter = ?, @CreatedBefore = ?, @Name = NULL, @OrderBy = 8, @Offset = 0, @FetchNext = 50", (EPOCH, now)),
+        ("QueryFloors", "EXECUTE QueryFloors", ()),
+        ("QueryPaymentStatus", "EXECUTE QueryPaymentStatus @Room = NULL, @Paid = NULL, @CreatedAfter = ?, @CreatedBefore = ?, @Offset = 0, @FetchNext = 50", (EPOCH, now)),
+        ("QueryPaymentStatus.room", "EXECUTE QueryPaymentStatus @Room = ?, @Paid = 0, @CreatedAfter = ?, @CreatedBefore = ?, @Offset = 0, @FetchNext = 50", (room, EPOCH, now)),
+        ("QueryRoomFeeStatus", "EXECUTE QueryRoomFeeStatus @Room = ?, @FeeId = ?", (room, fee_id)),
+        ("QueryRooms", "EXECUTE QueryRooms @Room = NULL, @Floor = NULL, @Offset = 0, @FetchNext = 50", ()),
+        ("QueryRooms.floor", "EXECUTE QueryRooms @Room = NULL, @Floor = ?, @Offset = 0, @FetchNext = 50", (room // 100,)),
+        ("Register", "EXECUTE Register @Name = N'Plan', @Room = ?, @Birthday = NULL, @Phone = N'0999999999', @Email = NULL, @Username = N'__plan__', @HashedPassword = N''", (room,)),
+        ("RejectRegistrationRequests", "DECLARE @Id BIGINTARRAY INSERT INTO @Id VALUES (?) EXECUTE RejectRegistrationRequests @Id = @Id", (request_id,)),
+        ("UpdateResident", "EXECUTE UpdateResident @Id = ?, @Name = N'Plan', @Room = ?, @Birthday = NULL, @Phone = N'0999999999', @Email = NULL", (resident_id, room)),
+        ("UpdateResidentAuthorization", "EXECUTE UpdateResidentAuthorization @Id = ?, @Username = N'__plan__', @HashedPassword = N''", (resident_id,)),
+    ]
+
+
+def summarize(plan: str) -> List[str]:
+    lines: List[str] = []
+    tree = ET.fromstring(plan)
+    for statement in tree.iterfind(".//sp:StmtSimple", NAMESPACE):
+        text = " ".join(statement.get("StatementText", "").split())
+        lines.append(f"  {text[:120]}")
+
+        for relop in statement.iterfind(".//sp:RelOp", NAMESPACE):
+            operator = relop.get("PhysicalOp", "?")
+            obj = relop.find("./*/sp:Object", NAMESPACE)
+            target = ""
+            if obj is not None:
+                target = ".".join(part.strip("[]") for part in (obj.get("Table", ""), obj.get("Index", "")) if part)
+
+            actual_rows = sum(int(counter.get("ActualRows", 0)) for counter in relop.iterfind("./sp:RunTimeInformation/sp:RunTimeCountersPerThread", NAMESPACE))
+            lines.append(f"    {operator} {target} rows={actual_rows}".rstrip())
+
+    return lines
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Capture the actual execution plans of every stored procedure")
+    parser.add_argument("--output", type=Path, default=root / "plans", help="Directory to save the plans to")
+    parser.add_argument("--baseline", type=Path, help="A summary.txt of a previous run to compare with")
+    args = parser.parse_args()
+
+    output: Path = args.output
+    output.mkdir(parents=True, exist_ok=True)
+
+    await Database.instance.prepare()
+    async with Database.instance.pool.acquire() as connection:
+        async with connection.cursor() as cursor:
+            samples: Dict[str, Any] = {}
+            for key, query in (
+                ("room", "SELECT TOP 1 room FROM rooms ORDER BY room"),
+                ("fee_id", "SELECT MAX(id) FROM fees"),
+                ("resident_id", "SELECT MAX(id) FROM accounts WHERE approved = 1"),
+                ("request_id", "SELECT MAX(id) FROM registration_requests"),
+            ):
+                await cursor.execute(query)
+                samples[key] = await cursor.fetchval() or 0
+
+            await cursor.execute("SELECT name FROM sys.procedures")
+            uncovered = {row[0] for row in await cursor.fetchall()}
+
+            summary: List[str] = []
+            for name, sql, params in cases(samples):
+                uncovered.discard(name.split(".")[0])
+                await cursor.execute(
+                    f"""
+                        SET NOCOUNT ON
+                        BEGIN TRANSACTION
+                        SET STATISTICS XML ON
+                        {sql}
+                        SET STATISTICS XML OFF
+                        ROLLBACK TRANSACTION
+                    """,
+                    *params,
+                )
+
+                plans: List[str] = []
+                while True:
+                    if cursor.description is not None and cursor.description[0][0] == SHOWPLAN_COLUMN:
+                        plans.extend(row[0] for row in await cursor.fetchall())
+
+                    if not await cursor.nextset():
+                        break
+
+                summary.append(name)
+                for index, plan in enumerate(plans):
+                    output.joinpath(f"{name}.{index}.sqlplan").write_text(plan, encoding="utf-8")
+                    summary.extend(summarize(plan))
+
+            for name in sorted(uncovered):
+                summary.append(f"{name}\n  (no case defined)")
+
+    await Database.instance.close()
+
+    text = "\n".join(summary) + "\n"
+    output.joinpath("summary.txt").write_text(text, encoding="utf-8")
+    print(text)
+
+    if args.baseline is not None:
+        baseline = args.baseline.read_text(encoding="utf-8")
+        diff = difflib.unified_diff(
+            baseline.splitlines(keepends=True),
+            text.splitlines(keepends=True),
+            fromfile=str(args.baseline),
+            tofile="current",
+        )
+        sys.stdout.writelines(diff)
+
+
+asyncio.run(main())
@@ -2,11 +2,40 @@ CREATE OR ALTER PROCEDURE ApproveRegistrationRequests
     @Id BIGINTARRAY READONLY
 AS
 BEGIN
+    -- Move the requests to accounts as a single set: every request is either approved or left pending
     SET NOCOUNT ON
 
-    UPDATE accounts
-    SET approved = 1
-    WHERE id IN (
-        SELECT value FROM @Id
-    ) AND approved = 0
+    DECLARE @Approved TABLE (
+        id BIGINT PRIMARY KEY,
+        name NVARCHAR(255) COLLATE Vietnamese_100_CS_AS_KS_WS NOT NULL,
+        room SMALLINT NOT NULL,
+        birthday DATE,
+        phone NVARCHAR(15) NOT NULL,
+        email NVARCHAR(255),
+        username NVARCHAR(255) NOT NULL,
+        hashed_password NVARCHAR(255) NOT NULL
+    )
+
+    BEGIN TRANSACTION
+        DELETE FROM registration_requests
+        OUTPUT
+            DELETED.id,
+            DELETED.name,
+            DELETED.room,
+            DELETED.birthday,
+            DELETED.phone,
+            DELETED.email,
+            DELETED.username,
+            DELETED.hashed_password
+        INTO @Approved
+        WHERE id IN (
+            SELECT value FROM @Id
+        )
+
+        INSERT INTO accounts (id, name, room, birthday, phone, email, username, hashed_password, approved)
+        OUTPUT INSERTED.*
+        SELECT id, name, room, birthday, phone, email, username, hashed_password, 1
+        FROM @Approved
+
+    COMMIT TRANSACTION
 END
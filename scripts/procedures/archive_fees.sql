@@ -0,0 +1,101 @@
+CREATE OR ALTER PROCEDURE ArchiveFees
+    @Before DATETIME2,
+    @BatchSize INT
+AS
+BEGIN
+    -- Move one batch of the fees created before @Before, or of their payments, to the history tables
+    -- and return the number of moved rows: 0 once everything is archived. Each batch is a short
+    -- transaction locking at most @BatchSize rows, below the lock escalation threshold (5000), so
+    -- that writers to the recent fees and payments are never blocked.
+    SET NOCOUNT ON
+
+    DECLARE @Epoch DATETIME2
+    SELECT @Epoch = value FROM config_datetime2 WHERE name = 'epoch'
+
+    DECLARE @Boundary BIGINT = DATEDIFF_BIG(MILLISECOND, @Epoch, @Before) << 16
+    IF @Boundary <= 0
+    BEGIN
+        SELECT 0
+        RETURN
+    END
+
+    -- Raise the boundary before moving anything: readers include the history tables as soon as their
+    -- window starts below it
+    UPDATE config_bigint SET value = @Boundary WHERE name = 'archive_boundary' AND value < @Boundary
+
+    DECLARE @Payments TABLE (id BIGINT PRIMARY KEY, room SMALLINT NOT NULL, amount BIGINT NOT NULL, fee_id BIGINT NOT NULL)
+    DECLARE @Moved INT
+
+    -- Payments first, since they reference the fees
+    BEGIN TRANSACTION
+        DELETE TOP (@BatchSize) FROM payments
+        OUTPUT deleted.id, deleted.room, deleted.amount, deleted.fee_id INTO @Payments
+        WHERE fee_id < @Boundary
+
+        SET @Moved = @@ROWCOUNT
+
+        INSERT INTO payments_history (id, room, amount, fee_id)
+        SELECT id, room, amount, fee_id FROM @Payments
+
+    COMMIT TRANSACTION
+
+    IF @Moved > 0
+    BEGIN
+        SELECT @Moved
+        RETURN
+    END
+
+    DECLARE @Fees TABLE (
+        id BIGINT PRIMARY KEY,
+        name NVARCHAR(255) COLLATE Vietnamese_100_CS_AS_KS_WS NOT NULL,
+        lower BIGINT NOT NULL,
+        upper BIGINT NOT NULL,
+        per_area INT NOT NULL,
+        per_motorbike INT NOT NULL,
+        per_car INT NOT NULL,
+        deadline DATE NOT NULL,
+        description NVARCHAR(max) COLLATE Vietnamese_100_CS_AS_KS_WS,
+        flags TINYINT NOT NULL
+    )
+
+    BEGIN TRANSACTION
+        -- Exclusive locks on the batch prevent new payments for these fees until they are moved
+        DECLARE @FeeIds TABLE (id BIGINT PRIMARY KEY)
+        INSERT INTO @FeeIds (id)
+        SELECT TOP (@BatchSize) id
+        FROM fees WITH (XLOCK, ROWLOCK)
+        WHERE id < @Boundary
+        ORDER BY id
+
+        -- Payments created since the previous batches
+        DELETE FROM payments
+        OUTPUT deleted.id, deleted.room, deleted.amount, deleted.fee_id INTO @Payments
+        WHERE fee_id IN (SELECT id FROM @FeeIds)
+
+        INSERT INTO payments_history (id, room, amount, fee_id)
+        SELECT id, room, amount, fee_id FROM @Payments
+
+        DELETE FROM fees
+        OUTPUT
+            deleted.id,
+            deleted.name,
+            deleted.lower,
+            deleted.upper,
+            deleted.per_area,
+            deleted.per_motorbike,
+            deleted.per_car,
+            deleted.deadline,
+            deleted.description,
+            deleted.flags
+        INTO @Fees
+        WHERE id IN (SELECT id FROM @FeeIds)
+
+        SET @Moved = @@ROWCOUNT
+
+        INSERT INTO fees_history (id, name, lower, upper, per_area, per_motorbike, per_car, deadline, description, flags)
+        SELECT id, name, lower, upper, per_area, per_motorbike, per_car, deadline, description, flags FROM @Fees
+
+    COMMIT TRANSACTION
+
+    SELECT @Moved
+END
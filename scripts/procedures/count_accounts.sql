@@ -15,15 +15,30 @@ BEGIN
     DECLARE @FromId BIGINT = DATEDIFF_BIG(MILLISECOND, @Epoch, @CreatedAfter) << 16
     DECLARE @ToId BIGINT = (DATEDIFF_BIG(MILLISECOND, @Epoch, @CreatedBefore) << 16) | 0xFFFF
 
-    SELECT COUNT(1) FROM accounts
-    WHERE id >= @FromId AND id <= @ToId AND (
-        @Name IS NULL
-        OR CHARINDEX(@Name, name) > 0
-    ) AND (
-        @Room IS NULL
-        OR room = @Room
-    ) AND (
-        @Username IS NULL
-        OR CHARINDEX(@Username, username) > 0
-    ) AND approved = @Approved
+    -- Pending accounts are registration requests, see migration 0014
+    IF @Approved = 0
+        SELECT COUNT(1) FROM registration_requests
+        WHERE id >= @FromId AND id <= @ToId AND (
+            @Name IS NULL
+            OR CHARINDEX(@Name, name) > 0
+        ) AND (
+            @Room IS NULL
+            OR room = @Room
+        ) AND (
+            @Username IS NULL
+            OR CHARINDEX(@Username, username) > 0
+        )
+
+    ELSE
+        SELECT COUNT(1) FROM accounts
+        WHERE id >= @FromId AND id <= @ToId AND (
+            @Name IS NULL
+            OR CHARINDEX(@Name, name) > 0
+        ) AND (
+            @Room IS NULL
+            OR room = @Room
+        ) AND (
+            @Username IS NULL
+            OR CHARINDEX(@Username, username) > 0
+        )
 END
@@ -0,0 +1,13 @@
+CREATE OR ALTER PROCEDURE CountBills
+    @Room SMALLINT,
+    @From DATE,
+    @To DATE
+AS
+BEGIN
+    SET NOCOUNT ON
+
+    SELECT COUNT(1)
+    FROM bills
+    WHERE month BETWEEN @From AND @To AND (@Room IS NULL OR room = @Room)
+    OPTION (RECOMPILE)
+END
@@ -12,9 +12,21 @@ BEGIN
     DECLARE @FromId BIGINT = DATEDIFF_BIG(MILLISECOND, @Epoch, @CreatedAfter) << 16
     DECLARE @ToId BIGINT = (DATEDIFF_BIG(MILLISECOND, @Epoch, @CreatedBefore) << 16) | 0xFFFF
 
-    SELECT COUNT(1) FROM fees
-    WHERE id >= @FromId AND id <= @ToId AND (
-        @Name IS NULL
-        OR CHARINDEX(@Name, name) > 0
+    DECLARE @Archived BIGINT
+    SELECT @Archived = value FROM config_bigint WHERE name = 'archive_boundary'
+
+    -- fees_history is only read when the window starts below the archive boundary (see migration 0013)
+    SELECT (
+        SELECT COUNT(1) FROM fees
+        WHERE id >= @FromId AND id <= @ToId AND (
+            @Name IS NULL
+            OR CHARINDEX(@Name, name) > 0
+        )
+    ) + (
+        SELECT COUNT(1) FROM fees_history
+        WHERE @FromId < @Archived AND id >= @FromId AND id <= @ToId AND (
+            @Name IS NULL
+            OR CHARINDEX(@Name, name) > 0
+        )
     )
 END
@@ -12,40 +12,93 @@ BEGIN
 
     DECLARE @FromId BIGINT = DATEDIFF_BIG(MILLISECOND, @Epoch, @CreatedAfter) << 16
     DECLARE @ToId BIGINT = (DATEDIFF_BIG(MILLISECOND, @Epoch, @CreatedBefore) << 16) | 0xFFFF
+    IF @FromId < 0
+        SET @FromId = 0
 
-    IF @Room IS NULL
-    BEGIN
-        DECLARE @PaidPaymentStatus BIGINT = 0
-        IF @Paid IS NOT NULL
-            SET @PaidPaymentStatus = (
-                SELECT COUNT(1)
-                FROM payments
-                WHERE fee_id >= @FromId AND fee_id <= @ToId
-            )
-
-        IF @Paid IS NULL OR @Paid = 0
-            BEGIN
-                DECLARE @RoomCount BIGINT = (SELECT COUNT(1) FROM rooms)
-                DECLARE @FeeCount BIGINT = (SELECT COUNT(1) FROM fees WHERE fees.id >= @FromId AND fees.id <= @ToId)
-                DECLARE @Result BIGINT = @RoomCount * @FeeCount
-
-                IF @Paid IS NULL
-                    SELECT @Result
-
-                ELSE
-                    SELECT @Result - @PaidPaymentStatus
-            END
-
-        ELSE
-            SELECT @PaidPaymentStatus
-
-    END
-    ELSE
-        SELECT COUNT(1)
+    -- Whole days of fee creation within the window are summed from the bucket views (see migration
+    -- 0005), only the partial days at both ends are counted from fees and payments.
+    DECLARE @BucketSize BIGINT = 5662310400000 -- 86400000 << 16
+    DECLARE @FirstBucket BIGINT = (@FromId + @BucketSize - 1) / @BucketSize
+    DECLARE @LastBucket BIGINT = (@ToId + 1) / @BucketSize - 1
+    DECLARE @HeadTo BIGINT = @ToId, @TailFrom BIGINT = @ToId + 1
+    IF @FirstBucket <= @LastBucket
+        SELECT @HeadTo = @FirstBucket * @BucketSize - 1, @TailFrom = (@LastBucket + 1) * @BucketSize
+
+    DECLARE @FeeCount BIGINT
+    SELECT @FeeCount = ISNULL(
+        (
+            SELECT SUM(fees)
+            FROM fee_buckets WITH (NOEXPAND)
+            WHERE bucket BETWEEN @FirstBucket AND @LastBucket
+        ),
+        0
+    ) + (
+        SELECT COUNT_BIG(*)
         FROM fees
-        WHERE fees.id >= @FromId AND fees.id <= @ToId AND (
-            @Paid IS NULL
-            OR (@Paid = 0 AND NOT EXISTS (SELECT 1 FROM payments WHERE fee_id = fees.id AND room = @Room))
-            OR (@Paid = 1 AND EXISTS (SELECT 1 FROM payments WHERE fee_id = fees.id AND room = @Room))
+        WHERE id BETWEEN @FromId AND @HeadTo OR id BETWEEN @TailFrom AND @ToId
+    )
+    OPTION (RECOMPILE)
+
+    -- Same counts over the history tables when the window starts below the archive boundary
+    -- (see migration 0013)
+    DECLARE @Archived BIGINT
+    SELECT @Archived = value FROM config_bigint WHERE name = 'archive_boundary'
+
+    IF @FromId < @Archived
+        SELECT @FeeCount = @FeeCount + ISNULL(
+            (
+                SELECT SUM(fees)
+                FROM fee_history_buckets WITH (NOEXPAND)
+                WHERE bucket BETWEEN @FirstBucket AND @LastBucket
+            ),
+            0
+        ) + (
+            SELECT COUNT_BIG(*)
+            FROM fees_history
+            WHERE id BETWEEN @FromId AND @HeadTo OR id BETWEEN @TailFrom AND @ToId
+        )
+        OPTION (RECOMPILE)
+
+    DECLARE @PaidCount BIGINT = 0
+    IF @Paid IS NOT NULL
+        SELECT @PaidCount = ISNULL(
+            (
+                SELECT SUM(paid)
+                FROM room_payment_buckets WITH (NOEXPAND)
+                WHERE (@Room IS NULL OR room = @Room) AND bucket BETWEEN @FirstBucket AND @LastBucket
+            ),
+            0
+        ) + (
+            SELECT COUNT_BIG(*)
+            FROM payments
+            WHERE (@Room IS NULL OR room = @Room) AND (fee_id BETWEEN @FromId AND @HeadTo OR fee_id BETWEEN @TailFrom AND @ToId)
         )
+        OPTION (RECOMPILE)
+
+    IF @Paid IS NOT NULL AND @FromId < @Archived
+        SELECT @PaidCount = @PaidCount + ISNULL(
+            (
+                SELECT SUM(paid)
+                FROM room_payment_history_buckets WITH (NOEXPAND)
+                WHERE (@Room IS NULL OR room = @Room) AND bucket BETWEEN @FirstBucket AND @LastBucket
+            ),
+            0
+        ) + (
+            SELECT COUNT_BIG(*)
+            FROM payments_history
+            WHERE (@Room IS NULL OR room = @Room) AND (fee_id BETWEEN @FromId AND @HeadTo OR fee_id BETWEEN @TailFrom AND @ToId)
+        )
+        OPTION (RECOMPILE)
+
+    IF @Room IS NULL
+        SET @FeeCount = @FeeCount * (SELECT COUNT(1) FROM rooms)
+
+    IF @Paid IS NULL
+        SELECT @FeeCount
+
+    ELSE IF @Paid = 1
+        SELECT @PaidCount
+
+    ELSE
+        SELECT @FeeCount - @PaidCount
 END
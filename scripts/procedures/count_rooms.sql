@@ -3,13 +3,19 @@ CREATE OR ALTER PROCEDURE CountRooms
     @Floor SMALLINT
 AS
 BEGIN
-    SET NOCOUNT ON;
+    SET NOCOUNT ON
+
+    DECLARE
+        @From INT = ISNULL(@Floor * 100, -32768),
+        @To INT = ISNULL(@Floor * 100 + 99, 32767);
 
 	WITH all_rooms (room) AS (
 		SELECT room FROM rooms
+        WHERE room BETWEEN @From AND @To AND (@Room IS NULL OR room = @Room)
         UNION
-        SELECT room FROM accounts WHERE approved = 1
+        SELECT room FROM room_residents WITH (NOEXPAND)
+        WHERE room BETWEEN @From AND @To AND (@Room IS NULL OR room = @Room)
 	)
 	SELECT COUNT(1) FROM all_rooms
-	WHERE (@Room IS NULL OR @Room = room) AND (@Floor IS NULL OR @Floor = room / 100)
+    OPTION (RECOMPILE)
 END
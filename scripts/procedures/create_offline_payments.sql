@@ -0,0 +1,67 @@
+CREATE OR ALTER PROCEDURE CreateOfflinePayments
+    @Payments OFFLINEPAYMENTARRAY READONLY
+AS
+BEGIN
+    -- Record a batch of payments collected by administrators, and return the outcome of each row:
+    -- 0 (created), 701 (invalid room), 702 (invalid fee), 703 (amount out of bounds), 704 (already paid)
+    SET NOCOUNT ON
+
+    DECLARE @Outcomes TABLE (
+        position INT PRIMARY KEY,
+        room SMALLINT NOT NULL,
+        amount BIGINT NOT NULL,
+        fee_id BIGINT NOT NULL,
+        code INT NOT NULL,
+        id BIGINT NULL
+    )
+
+    BEGIN TRANSACTION
+        INSERT INTO @Outcomes (position, room, amount, fee_id, code)
+        SELECT
+            p.position,
+            p.room,
+            p.amount,
+            p.fee_id,
+            CASE
+                WHEN rooms.room IS NULL THEN 701
+                WHEN fees.id IS NULL THEN 702
+                WHEN p.amount < fees.lower + rooms.area / 100 * fees.per_area + fees.per_motorbike * rooms.motorbike + fees.per_car * rooms.car
+                    OR p.amount > fees.upper + rooms.area / 100 * fees.per_area + fees.per_motorbike * rooms.motorbike + fees.per_car * rooms.car THEN 703
+                WHEN EXISTS (SELECT 1 FROM payments WITH (UPDLOCK, HOLDLOCK) WHERE room = p.room AND fee_id = p.fee_id) THEN 704
+                ELSE 0
+            END
+        FROM @Payments p
+        LEFT JOIN rooms ON rooms.room = p.room
+        LEFT JOIN fees ON fees.id = p.fee_id;
+
+        -- Within the batch, only the first valid row for a room and a fee is recorded
+        WITH duplicates AS (
+            SELECT code, ROW_NUMBER() OVER (PARTITION BY room, fee_id ORDER BY position) AS n
+            FROM @Outcomes
+            WHERE code = 0
+        )
+        UPDATE duplicates SET code = 704 WHERE n > 1
+
+        DECLARE @Count INT = (SELECT COUNT(1) FROM @Outcomes WHERE code = 0)
+        IF @Count > 0
+        BEGIN
+            DECLARE @Id BIGINT
+            EXECUTE GenerateIds @Count = @Count, @Id = @Id OUTPUT;
+
+            WITH created AS (
+                SELECT id, ROW_NUMBER() OVER (ORDER BY position) AS n
+                FROM @Outcomes
+                WHERE code = 0
+            )
+            UPDATE created SET id = (@Id - (@Id & 0xFFFF)) | ((@Id + n - 1) & 0xFFFF)
+
+            INSERT INTO payments (id, room, amount, fee_id)
+            SELECT id, room, amount, fee_id
+            FROM @Outcomes
+            WHERE code = 0
+        END
+
+    COMMIT TRANSACTION
+
+    SELECT position, code, id, room, amount, fee_id FROM @Outcomes ORDER BY position
+END
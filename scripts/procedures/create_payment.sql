@@ -1,30 +1,53 @@
 CREATE OR ALTER PROCEDURE CreatePayment
     @Room SMALLINT,
     @Amount INT,
-    @FeeId BIGINT
+    @FeeId BIGINT,
+    @TxnRef NVARCHAR(64) = NULL -- The VNPay transaction reference, if any
 AS
 BEGIN
     SET NOCOUNT ON
     DECLARE @Id BIGINT
     EXECUTE GenerateId @Id = @Id OUTPUT
 
+    DECLARE @Code CHAR(2), @Message NVARCHAR(64)
+
     BEGIN TRANSACTION
+        -- Replay the outcome of an already processed transaction. The locks serialize concurrent
+        -- deliveries of the same transaction and of payments for the same room and fee.
+        IF @TxnRef IS NOT NULL
+            SELECT @Code = code, @Message = message
+            FROM ipn_outcomes WITH (UPDLOCK, HOLDLOCK)
+            WHERE txn_ref = @TxnRef
+
+        IF @Code IS NOT NULL
+        BEGIN
+            COMMIT TRANSACTION
+            SELECT @Code AS code, @Message AS message, CAST(1 AS BIT) AS replayed
+            RETURN
+        END
+
         IF NOT EXISTS (SELECT 1 FROM rooms WHERE room = @Room)
-            SELECT '01' AS code, 'Invalid room number' AS message
+            SELECT @Code = '01', @Message = 'Invalid room number'
 
         ELSE IF NOT EXISTS (SELECT 1 FROM fees WHERE id = @FeeId)
-            SELECT '01' AS code, 'Invalid fee ID' AS message
+            SELECT @Code = '01', @Message = 'Invalid fee ID'
 
-        ELSE IF EXISTS (SELECT 1 FROM payments WHERE room = @Room AND fee_id = @FeeId)
-            SELECT '02' AS code, 'Payment has already been updated' AS message
+        ELSE IF EXISTS (SELECT 1 FROM payments WITH (UPDLOCK, HOLDLOCK) WHERE room = @Room AND fee_id = @FeeId)
+            SELECT @Code = '02', @Message = 'Payment has already been updated'
 
         ELSE
         BEGIN
             INSERT INTO payments (id, room, amount, fee_id)
             VALUES (@Id, @Room, @Amount, @FeeId)
 
-            SELECT '00' AS code, 'Payment was updated successfully' AS message
+            SELECT @Code = '00', @Message = 'Payment was updated successfully'
         END
 
+        IF @TxnRef IS NOT NULL
+            INSERT INTO ipn_outcomes (txn_ref, code, message, processed)
+            VALUES (@TxnRef, @Code, @Message, SYSUTCDATETIME())
+
     COMMIT TRANSACTION
+
+    SELECT @Code AS code, @Message AS message, CAST(0 AS BIT) AS replayed
 END
@@ -0,0 +1,91 @@
+CREATE OR ALTER PROCEDURE CreatePayments
+    @Payments PAYMENTARRAY READONLY,
+    @Acknowledged BIT = 0 -- Whether VNPay was already answered '00' for these transactions
+AS
+BEGIN
+    -- Set-based CreatePayment for a batch of VNPay transactions: returns the outcome of each one
+    SET NOCOUNT ON
+
+    DECLARE @Outcomes TABLE (
+        txn_ref NVARCHAR(64) PRIMARY KEY,
+        room SMALLINT NOT NULL,
+        amount INT NOT NULL,
+        fee_id BIGINT NOT NULL,
+        status TINYINT NOT NULL, -- 0: created, 1: invalid room, 2: invalid fee, 3: already paid
+        code CHAR(2) NULL,
+        message NVARCHAR(64) NULL,
+        replayed BIT NOT NULL
+    )
+
+    BEGIN TRANSACTION
+        -- Replay the outcomes of already processed transactions
+        INSERT INTO @Outcomes (txn_ref, room, amount, fee_id, status, code, message, replayed)
+        SELECT p.txn_ref, p.room, p.amount, p.fee_id, 0, o.code, o.message, 1
+        FROM @Payments p
+        INNER JOIN ipn_outcomes o WITH (UPDLOCK, HOLDLOCK) ON o.txn_ref = p.txn_ref
+
+        -- Within the batch, only the first transaction for a room and a fee is accepted
+        INSERT INTO @Outcomes (txn_ref, room, amount, fee_id, status, replayed)
+        SELECT
+            p.txn_ref,
+            p.room,
+            p.amount,
+            p.fee_id,
+            CASE
+                WHEN NOT EXISTS (SELECT 1 FROM rooms WHERE room = p.room) THEN 1
+                WHEN NOT EXISTS (SELECT 1 FROM fees WHERE id = p.fee_id) THEN 2
+                WHEN EXISTS (SELECT 1 FROM payments WITH (UPDLOCK, HOLDLOCK) WHERE room = p.room AND fee_id = p.fee_id) THEN 3
+                WHEN ROW_NUMBER() OVER (PARTITION BY p.room, p.fee_id ORDER BY p.txn_ref) > 1 THEN 3
+                ELSE 0
+            END,
+            0
+        FROM @Payments p
+        WHERE NOT EXISTS (SELECT 1 FROM @Outcomes o WHERE o.txn_ref = p.txn_ref)
+
+        -- An acknowledged transaction keeps its '00' response code, a conflict (e.g. a room deleted or
+        -- a fee paid since it was queued) is only reported by its message for reconciliation
+        UPDATE @Outcomes
+        SET
+            code = CASE WHEN status = 0 OR @Acknowledged = 1 THEN '00' WHEN status = 3 THEN '02' ELSE '01' END,
+            message = CASE status
+                WHEN 0 THEN 'Payment was updated successfully'
+                WHEN 1 THEN 'Invalid room number'
+                WHEN 2 THEN 'Invalid fee ID'
+                ELSE 'Payment has already been updated'
+            END
+        WHERE replayed = 0
+
+        DECLARE @Count INT = (SELECT COUNT(1) FROM @Outcomes WHERE replayed = 0 AND status = 0)
+        IF @Count > 0
+        BEGIN
+            DECLARE @Id BIGINT
+            EXECUTE GenerateIds @Count = @Count, @Id = @Id OUTPUT
+
+            INSERT INTO payments (id, room, amount, fee_id)
+            SELECT
+                (@Id - (@Id & 0xFFFF)) | ((@Id + ROW_NUMBER() OVER (ORDER BY txn_ref) - 1) & 0xFFFF),
+                room,
+                amount,
+                fee_id
+            FROM @Outcomes
+            WHERE replayed = 0 AND status = 0
+        END
+
+        INSERT INTO ipn_outcomes (txn_ref, code, message, processed)
+        SELECT txn_ref, code, message, SYSUTCDATETIME()
+        FROM @Outcomes
+        WHERE replayed = 0
+
+    COMMIT TRANSACTION
+
+    SELECT
+        txn_ref,
+        room,
+        amount,
+        fee_id,
+        code,
+        message,
+        replayed,
+        CAST(CASE WHEN replayed = 0 AND status = 0 THEN 1 ELSE 0 END AS BIT) AS created
+    FROM @Outcomes
+END
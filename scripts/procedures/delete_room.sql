@@ -4,6 +4,11 @@ AS
 BEGIN
     SET NOCOUNT ON
 
+    DELETE FROM bills
+    WHERE room IN (
+        SELECT value FROM @Rooms
+    )
+
     DELETE FROM rooms
     WHERE room IN (
         SELECT value FROM @Rooms
@@ -0,0 +1,23 @@
+CREATE OR ALTER PROCEDURE GenerateIds
+    @Count INT,
+    @Id BIGINT OUTPUT
+AS
+BEGIN
+    -- Reserve @Count IDs at once. The N-th ID (from 1) is (@Id - (@Id & 0xFFFF)) | ((@Id + N - 1) & 0xFFFF)
+    SET NOCOUNT ON
+
+    DECLARE @Epoch DATETIME2
+    SELECT @Epoch = value FROM config_datetime2 WHERE name = 'epoch'
+
+    DECLARE @Now DATETIME2 = SYSUTCDATETIME()
+    DECLARE @TimestampMs BIGINT = DATEDIFF_BIG(MILLISECOND, @Epoch, @Now)
+    DECLARE @TailTable TABLE (value BIGINT)
+
+    UPDATE config_bigint
+    SET value = (value + @Count) & 0xFFFF
+    OUTPUT DELETED.value INTO @TailTable
+    WHERE name = 'id_counter'
+
+    DECLARE @Tail BIGINT = (SELECT value FROM @TailTable)
+    SET @Id = (@TimestampMs << 16) | @Tail
+END
@@ -0,0 +1,34 @@
+CREATE OR ALTER PROCEDURE ImportBills
+AS
+BEGIN
+    -- Merge the meter readings staged by the caller in #bills (line, room, month, type, amount) into bills.
+    -- The last reading of a room, month and type wins. Readings of unknown rooms are skipped.
+    SET NOCOUNT ON
+
+    DECLARE @Changes TABLE (action NVARCHAR(10))
+
+    BEGIN TRANSACTION;
+        WITH latest AS (
+            SELECT room, month, type, amount, ROW_NUMBER() OVER (PARTITION BY month, room, type ORDER BY line DESC) AS n
+            FROM #bills
+        )
+        MERGE bills WITH (HOLDLOCK) AS target
+        USING (
+            SELECT latest.room, latest.month, latest.type, latest.amount
+            FROM latest
+            INNER JOIN rooms ON rooms.room = latest.room
+            WHERE latest.n = 1
+        ) AS source
+        ON target.month = source.month AND target.room = source.room AND target.type = source.type
+        WHEN MATCHED AND target.amount <> source.amount THEN
+            UPDATE SET amount = source.amount
+        WHEN NOT MATCHED THEN
+            INSERT (room, month, amount, type) VALUES (source.room, source.month, source.amount, source.type)
+        OUTPUT $action INTO @Changes;
+    COMMIT TRANSACTION
+
+    SELECT
+        (SELECT COUNT(1) FROM @Changes WHERE action = 'INSERT') AS inserted,
+        (SELECT COUNT(1) FROM @Changes WHERE action = 'UPDATE') AS updated,
+        (SELECT COUNT(1) FROM #bills WHERE NOT EXISTS (SELECT 1 FROM rooms WHERE rooms.room = #bills.room)) AS unknown_rooms
+END
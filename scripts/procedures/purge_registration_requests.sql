@@ -0,0 +1,19 @@
+CREATE OR ALTER PROCEDURE PurgeRegistrationRequests
+    @Before DATETIME2,
+    @BatchSize INT
+AS
+BEGIN
+    -- Delete one batch of the requests created before @Before and return the number of deleted rows.
+    -- Batches stay below the lock escalation threshold (5000) so that registrations are not blocked.
+    SET NOCOUNT ON
+
+    DECLARE @Epoch DATETIME2
+    SELECT @Epoch = value FROM config_datetime2 WHERE name = 'epoch'
+
+    DECLARE @ToId BIGINT = DATEDIFF_BIG(MILLISECOND, @Epoch, @Before) << 16
+
+    DELETE TOP (@BatchSize) FROM registration_requests
+    WHERE id < @ToId
+
+    SELECT @@ROWCOUNT
+END
@@ -0,0 +1,19 @@
+CREATE OR ALTER PROCEDURE QueryBills
+    @Room SMALLINT,
+    @From DATE,
+    @To DATE,
+    @Offset INT,
+    @FetchNext INT
+AS
+BEGIN
+    SET NOCOUNT ON
+
+    -- A seek on IX_bills_room_month for a room, on the clustered index for a range of months otherwise
+    SELECT room, month, type, amount
+    FROM bills
+    WHERE month BETWEEN @From AND @To AND (@Room IS NULL OR room = @Room)
+    ORDER BY month DESC, room, type
+    OFFSET @Offset ROWS
+    FETCH NEXT @FetchNext ROWS ONLY
+    OPTION (RECOMPILE)
+END
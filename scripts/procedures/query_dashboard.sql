@@ -0,0 +1,35 @@
+CREATE OR ALTER PROCEDURE QueryDashboard
+    @FetchFees INT
+AS
+BEGIN
+    SET NOCOUNT ON
+
+    DECLARE @RoomCount BIGINT = (SELECT COUNT(1) FROM rooms)
+
+    -- Result set 1: residents and occupancy
+    SELECT
+        (SELECT ISNULL(SUM(residents), 0) FROM room_residents WITH (NOEXPAND)) AS residents,
+        (SELECT COUNT_BIG(*) FROM registration_requests) AS pending,
+        @RoomCount AS rooms,
+        (
+            SELECT COUNT_BIG(*)
+            FROM rooms
+            INNER JOIN room_residents WITH (NOEXPAND) ON room_residents.room = rooms.room
+        ) AS occupied
+
+    -- Result set 2: collection status of the most recent fees
+    SELECT
+        fees.id AS fee_id,
+        fees.name AS fee_name,
+        fees.deadline AS fee_deadline,
+        ISNULL(fee_payment_totals.collected, 0) AS collected,
+        ISNULL(fee_payment_totals.paid, 0) AS paid,
+        @RoomCount - ISNULL(fee_payment_totals.paid, 0) AS unpaid
+    FROM (
+        SELECT TOP (@FetchFees) id, name, deadline
+        FROM fees
+        ORDER BY id DESC
+    ) AS fees
+    LEFT JOIN fee_payment_totals WITH (NOEXPAND) ON fee_payment_totals.fee_id = fees.id
+    ORDER BY fees.id DESC
+END
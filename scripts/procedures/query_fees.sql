@@ -15,60 +15,51 @@ BEGIN
     DECLARE @FromId BIGINT = DATEDIFF_BIG(MILLISECOND, @Epoch, @CreatedAfter) << 16
     DECLARE @ToId BIGINT = (DATEDIFF_BIG(MILLISECOND, @Epoch, @CreatedBefore) << 16) | 0xFFFF
 
-    SELECT * FROM fees
-    WHERE id >= @FromId AND id <= @ToId AND (
-        @Name IS NULL
-        OR CHARINDEX(@Name, name) > 0
-    )
-    ORDER BY
-        CASE
-            WHEN @OrderBy = 1 THEN id
-        END ASC,
-        CASE
-            WHEN @OrderBy = 2 THEN name
-        END ASC,
-        CASE
-            WHEN @OrderBy = 3 THEN lower
-        END ASC,
-        CASE
-            WHEN @OrderBy = 4 THEN upper
-        END ASC,
-        CASE
-            WHEN @OrderBy = 5 THEN per_area
-        END ASC,
-        CASE
-            WHEN @OrderBy = 6 THEN per_motorbike
-        END ASC,
-        CASE
-            WHEN @OrderBy = 7 THEN per_car
-        END ASC,
-        CASE
-            WHEN @OrderBy = 8 THEN deadline
-        END ASC,
-        CASE
-            WHEN @OrderBy = -1 THEN id
-        END DESC,
-        CASE
-            WHEN @OrderBy = -2 THEN name
-        END DESC,
-        CASE
-            WHEN @OrderBy = -3 THEN lower
-        END DESC,
-        CASE
-            WHEN @OrderBy = -4 THEN upper
-        END DESC,
-        CASE
-            WHEN @OrderBy = -5 THEN per_area
-        END DESC,
-        CASE
-            WHEN @OrderBy = -6 THEN per_motorbike
-        END DESC,
-        CASE
-            WHEN @OrderBy = -7 THEN per_car
-        END DESC,
-        CASE
-            WHEN @OrderBy = -8 THEN deadline
-        END DESC
+    -- Each ordering is a separate parameterized statement with its own cached plan, so that the
+    -- optimizer can walk a supporting index in order instead of sorting the whole filtered set.
+    -- The column name comes from this fixed list only, never from user input.
+    DECLARE @Column NVARCHAR(16) = CASE ABS(@OrderBy)
+        WHEN 2 THEN N'name'
+        WHEN 3 THEN N'lower'
+        WHEN 4 THEN N'upper'
+        WHEN 5 THEN N'per_area'
+        WHEN 6 THEN N'per_motorbike'
+        WHEN 7 THEN N'per_car'
+        WHEN 8 THEN N'deadline'
+        ELSE N'id'
+    END
+    DECLARE @Direction NVARCHAR(4) = IIF(@OrderBy > 0, N'ASC', N'DESC')
+
+    -- Break ties by ID so that pagination is stable
+    DECLARE @OrderByClause NVARCHAR(64) = @Column + N' ' + @Direction
+    IF @Column <> N'id'
+        SET @OrderByClause = @OrderByClause + N', id ' + @Direction
+
+    -- Windows starting below the archive boundary also read fees_history (see migration 0013), with
+    -- a separate statement so that the plans of the recent windows are unchanged
+    DECLARE @Archived BIGINT
+    SELECT @Archived = value FROM config_bigint WHERE name = 'archive_boundary'
+
+    DECLARE @Source NVARCHAR(max) = N'fees'
+    IF @FromId < @Archived
+        SET @Source = N'(SELECT * FROM fees UNION ALL SELECT * FROM fees_history) AS fees'
+
+    DECLARE @Sql NVARCHAR(max) = N'
+        SELECT * FROM ' + @Source + N'
+        WHERE id >= @FromId AND id <= @ToId AND (
+            @Name IS NULL
+            OR CHARINDEX(@Name, name) > 0
+        )
+        ORDER BY ' + @OrderByClause + N'
         OFFSET @Offset ROWS
-        FETCH NEXT @FetchNext ROWS ONLY
+        FETCH NEXT @FetchNext ROWS ONLY'
+
+    EXECUTE sp_executesql
+        @Sql,
+        N'@FromId BIGINT, @ToId BIGINT, @Name NVARCHAR(255), @Offset INT, @FetchNext INT',
+        @FromId = @FromId,
+        @ToId = @ToId,
+        @Name = @Name,
+        @Offset = @Offset,
+        @FetchNext = @FetchNext
 END
@@ -0,0 +1,46 @@
+CREATE OR ALTER PROCEDURE QueryFloors
+AS
+BEGIN
+    SET NOCOUNT ON
+
+    -- Archived fees and payments are counted from the bucket views of the history tables (see migration 0013)
+    DECLARE @FeeCount BIGINT = (SELECT COUNT(1) FROM fees) + (SELECT ISNULL(SUM(fees), 0) FROM fee_history_buckets WITH (NOEXPAND))
+
+    SELECT
+        ISNULL(room_stats.floor, resident_stats.floor) AS floor,
+        ISNULL(room_stats.rooms, 0) AS rooms,
+        ISNULL(room_stats.area, 0) AS area,
+        ISNULL(room_stats.motorbike, 0) AS motorbike,
+        ISNULL(room_stats.car, 0) AS car,
+        ISNULL(resident_stats.residents, 0) AS residents,
+        ISNULL(room_stats.rooms, 0) * @FeeCount - ISNULL(payment_stats.paid, 0) AS unpaid
+    FROM (
+        SELECT
+            floor,
+            COUNT(1) AS rooms,
+            SUM(CAST(area AS BIGINT)) AS area,
+            SUM(CAST(motorbike AS INT)) AS motorbike,
+            SUM(CAST(car AS INT)) AS car
+        FROM rooms
+        GROUP BY floor
+    ) AS room_stats
+    FULL OUTER JOIN (
+        SELECT CAST(room / 100 AS SMALLINT) AS floor, SUM(residents) AS residents
+        FROM room_residents WITH (NOEXPAND)
+        GROUP BY CAST(room / 100 AS SMALLINT)
+    ) AS resident_stats ON room_stats.floor = resident_stats.floor
+    LEFT JOIN (
+        SELECT rooms.floor, SUM(paid) AS paid
+        FROM (
+            SELECT room, COUNT_BIG(*) AS paid
+            FROM payments
+            GROUP BY room
+            UNION ALL
+            SELECT room, paid
+            FROM room_payment_history_buckets WITH (NOEXPAND)
+        ) AS paid
+        INNER JOIN rooms ON rooms.room = paid.room
+        GROUP BY rooms.floor
+    ) AS payment_stats ON payment_stats.floor = room_stats.floor
+    ORDER BY floor
+END
@@ -15,33 +15,70 @@ BEGIN
     DECLARE @FromId BIGINT = DATEDIFF_BIG(MILLISECOND, @Epoch, @CreatedAfter) << 16
     DECLARE @ToId BIGINT = (DATEDIFF_BIG(MILLISECOND, @Epoch, @CreatedBefore) << 16) | 0xFFFF
 
-    SELECT
-        fees.id AS fee_id,
-        fees.name AS fee_name,
-        fees.lower AS fee_lower,
-        fees.upper AS fee_upper,
-        fees.per_area AS fee_per_area,
-        fees.per_motorbike AS fee_per_motorbike,
-        fees.per_car AS fee_per_car,
-        fees.deadline AS fee_deadline,
-        fees.description AS fee_description,
-        fees.flags AS fee_flags,
-        fees.lower + rooms.area / 100 * fees.per_area + fees.per_motorbike * rooms.motorbike + fees.per_car * rooms.car AS lower_bound,
-        fees.upper + rooms.area / 100 * fees.per_area + fees.per_motorbike * rooms.motorbike + fees.per_car * rooms.car AS upper_bound,
-        payments.id AS payment_id,
-        payments.room AS payment_room,
-        payments.amount AS payment_amount,
-        payments.fee_id AS payment_fee_id,
-        rooms.room AS room
-    FROM fees
-    INNER JOIN rooms ON (@Room IS NULL OR @Room = rooms.room)
-    LEFT JOIN payments ON payments.fee_id = fees.id AND payments.room = rooms.room
-    WHERE fees.id >= @FromId AND fees.id <= @ToId AND (
-        @Paid IS NULL
-        OR (@Paid = 0 AND payments.id IS NULL)
-        OR (@Paid = 1 AND payments.id IS NOT NULL)
-    )
-    ORDER BY fees.id DESC
-    OFFSET @Offset ROWS
-    FETCH NEXT @FetchNext ROWS ONLY
+    -- Windows starting below the archive boundary also read the history tables (see migration 0013).
+    -- The payments of a fee being archived may already be in payments_history.
+    DECLARE @Archived BIGINT
+    SELECT @Archived = value FROM config_bigint WHERE name = 'archive_boundary'
+
+    IF @FromId < @Archived
+        SELECT
+            fees.id AS fee_id,
+            fees.name AS fee_name,
+            fees.lower AS fee_lower,
+            fees.upper AS fee_upper,
+            fees.per_area AS fee_per_area,
+            fees.per_motorbike AS fee_per_motorbike,
+            fees.per_car AS fee_per_car,
+            fees.deadline AS fee_deadline,
+            fees.description AS fee_description,
+            fees.flags AS fee_flags,
+            fees.lower + rooms.area / 100 * fees.per_area + fees.per_motorbike * rooms.motorbike + fees.per_car * rooms.car AS lower_bound,
+            fees.upper + rooms.area / 100 * fees.per_area + fees.per_motorbike * rooms.motorbike + fees.per_car * rooms.car AS upper_bound,
+            payments.id AS payment_id,
+            payments.room AS payment_room,
+            payments.amount AS payment_amount,
+            payments.fee_id AS payment_fee_id,
+            rooms.room AS room
+        FROM (SELECT * FROM fees UNION ALL SELECT * FROM fees_history) AS fees
+        INNER JOIN rooms ON (@Room IS NULL OR @Room = rooms.room)
+        LEFT JOIN (SELECT * FROM payments UNION ALL SELECT * FROM payments_history) AS payments ON payments.fee_id = fees.id AND payments.room = rooms.room
+        WHERE fees.id >= @FromId AND fees.id <= @ToId AND (
+            @Paid IS NULL
+            OR (@Paid = 0 AND payments.id IS NULL)
+            OR (@Paid = 1 AND payments.id IS NOT NULL)
+        )
+        ORDER BY fees.id DESC
+        OFFSET @Offset ROWS
+        FETCH NEXT @FetchNext ROWS ONLY
+
+    ELSE
+        SELECT
+            fees.id AS fee_id,
+            fees.name AS fee_name,
+            fees.lower AS fee_lower,
+            fees.upper AS fee_upper,
+            fees.per_area AS fee_per_area,
+            fees.per_motorbike AS fee_per_motorbike,
+            fees.per_car AS fee_per_car,
+            fees.deadline AS fee_deadline,
+            fees.description AS fee_description,
+            fees.flags AS fee_flags,
+            fees.lower + rooms.area / 100 * fees.per_area + fees.per_motorbike * rooms.motorbike + fees.per_car * rooms.car AS lower_bound,
+            fees.upper + rooms.area / 100 * fees.per_area + fees.per_motorbike * rooms.motorbike + fees.per_car * rooms.car AS upper_bound,
+            payments.id AS payment_id,
+            payments.room AS payment_room,
+            payments.amount AS payment_amount,
+            payments.fee_id AS payment_fee_id,
+            rooms.room AS room
+        FROM fees
+        INNER JOIN rooms ON (@Room IS NULL OR @Room = rooms.room)
+        LEFT JOIN payments ON payments.fee_id = fees.id AND payments.room = rooms.room
+        WHERE fees.id >= @FromId AND fees.id <= @ToId AND (
+            @Paid IS NULL
+            OR (@Paid = 0 AND payments.id IS NULL)
+            OR (@Paid = 1 AND payments.id IS NOT NULL)
+        )
+        ORDER BY fees.id DESC
+        OFFSET @Offset ROWS
+        FETCH NEXT @FetchNext ROWS ONLY
 END
@@ -0,0 +1,32 @@
+CREATE OR ALTER PROCEDURE QueryRoomFeeStatus
+    @Room SMALLINT,
+    @FeeId BIGINT
+AS
+BEGIN
+    -- QueryPaymentStatus for an exact (room, fee) pair: one seek on each primary or unique key
+    -- Archived fees (see migration 0013) are not payable, hence not looked up in the history tables
+    SET NOCOUNT ON
+
+    SELECT
+        fees.id AS fee_id,
+        fees.name AS fee_name,
+        fees.lower AS fee_lower,
+        fees.upper AS fee_upper,
+        fees.per_area AS fee_per_area,
+        fees.per_motorbike AS fee_per_motorbike,
+        fees.per_car AS fee_per_car,
+        fees.deadline AS fee_deadline,
+        fees.description AS fee_description,
+        fees.flags AS fee_flags,
+        fees.lower + rooms.area / 100 * fees.per_area + fees.per_motorbike * rooms.motorbike + fees.per_car * rooms.car AS lower_bound,
+        fees.upper + rooms.area / 100 * fees.per_area + fees.per_motorbike * rooms.motorbike + fees.per_car * rooms.car AS upper_bound,
+        payments.id AS payment_id,
+        payments.room AS payment_room,
+        payments.amount AS payment_amount,
+        payments.fee_id AS payment_fee_id,
+        rooms.room AS room
+    FROM fees
+    INNER JOIN rooms ON rooms.room = @Room
+    LEFT JOIN payments ON payments.room = @Room AND payments.fee_id = @FeeId
+    WHERE fees.id = @FeeId
+END
@@ -5,26 +5,31 @@ CREATE OR ALTER PROCEDURE QueryRooms
     @FetchNext INT
 AS
 BEGIN
-    SET NOCOUNT ON;
+    SET NOCOUNT ON
 
-	WITH all_rooms (room, area, motorbike, car, residents) AS (
-		SELECT
-			IIF(rooms.room IS NULL, approved_residents.room, rooms.room),
-			area,
-			motorbike,
-			car,
-			IIF(residents IS NULL, 0, residents)
-		FROM rooms
-		FULL OUTER JOIN (
-			SELECT room, COUNT(1) AS residents
-			FROM accounts
-			WHERE approved = 1
-			GROUP BY room
-		) AS approved_residents ON rooms.room = approved_residents.room
-	)
-	SELECT * FROM all_rooms
-	WHERE (@Room IS NULL OR @Room = room) AND (@Floor IS NULL OR @Floor = room / 100)
+    -- Both inputs are range scans of clustered indexes on room, merged in order
+    DECLARE
+        @From INT = ISNULL(@Floor * 100, -32768),
+        @To INT = ISNULL(@Floor * 100 + 99, 32767)
+
+    SELECT
+        ISNULL(filtered_rooms.room, approved_residents.room) AS room,
+        area,
+        motorbike,
+        car,
+        CAST(ISNULL(approved_residents.residents, 0) AS INT) AS residents
+    FROM (
+        SELECT room, area, motorbike, car
+        FROM rooms
+        WHERE room BETWEEN @From AND @To AND (@Room IS NULL OR room = @Room)
+    ) AS filtered_rooms
+    FULL OUTER JOIN (
+        SELECT room, residents
+        FROM room_residents WITH (NOEXPAND)
+        WHERE room BETWEEN @From AND @To AND (@Room IS NULL OR room = @Room)
+    ) AS approved_residents ON filtered_rooms.room = approved_residents.room
     ORDER BY room
     OFFSET @Offset ROWS
     FETCH NEXT @FetchNext ROWS ONLY
+    OPTION (RECOMPILE)
 END
@@ -0,0 +1,31 @@
+CREATE OR ALTER PROCEDURE RecordSchedulerJob
+    @Name NVARCHAR(255),
+    @Leader NVARCHAR(255),
+    @Succeeded BIT,
+    @Overruns INT,
+    @Started DATETIME2,
+    @Duration FLOAT,
+    @Error NVARCHAR(max)
+AS
+BEGIN
+    SET NOCOUNT ON
+
+    -- Milliseconds: a count of microseconds overflows INT after about 36 minutes
+    DECLARE @Success DATETIME2 = IIF(@Succeeded = 1, DATEADD(MILLISECOND, CAST(@Duration * 1000 AS BIGINT), @Started), NULL)
+
+    UPDATE scheduler_jobs
+    SET
+        leader = @Leader,
+        runs = runs + 1,
+        failures = failures + IIF(@Succeeded = 1, 0, 1),
+        overruns = overruns + @Overruns,
+        last_started = @Started,
+        last_duration = @Duration,
+        last_success = ISNULL(@Success, last_success),
+        last_error = @Error
+    WHERE name = @Name
+
+    IF @@ROWCOUNT = 0
+        INSERT INTO scheduler_jobs (name, leader, runs, failures, overruns, last_started, last_duration, last_success, last_error)
+        VALUES (@Name, @Leader, 1, IIF(@Succeeded = 1, 0, 1), @Overruns, @Started, @Duration, @Success, @Error)
+END
@@ -14,13 +14,16 @@ BEGIN
     EXECUTE GenerateId @Id = @Id OUTPUT
 
     BEGIN TRANSACTION
-        IF EXISTS (SELECT 1 FROM accounts WHERE username = @Username)
-            SELECT * FROM accounts WHERE 1 = 0
+        -- Usernames are unique across residents and pending requests, the range locks prevent a
+        -- concurrent registration or username change from taking the same one
+        IF EXISTS (SELECT 1 FROM accounts WITH (UPDLOCK, HOLDLOCK) WHERE username = @Username)
+            OR EXISTS (SELECT 1 FROM registration_requests WITH (UPDLOCK, HOLDLOCK) WHERE username = @Username)
+            SELECT * FROM registration_requests WHERE 1 = 0
 
         ELSE
-            INSERT INTO accounts (id, name, room, birthday, phone, email, username, hashed_password, approved)
+            INSERT INTO registration_requests (id, name, room, birthday, phone, email, username, hashed_password)
             OUTPUT INSERTED.*
-            VALUES (@Id, @Name, @Room, @Birthday, @Phone, @Email, @Username, @HashedPassword, 0)
+            VALUES (@Id, @Name, @Room, @Birthday, @Phone, @Email, @Username, @HashedPassword)
 
     COMMIT TRANSACTION
 END
@@ -4,8 +4,8 @@ AS
 BEGIN
     SET NOCOUNT ON
 
-    DELETE FROM accounts
+    DELETE FROM registration_requests
     WHERE id IN (
         SELECT value FROM @Id
-    ) AND approved = 0
+    )
 END
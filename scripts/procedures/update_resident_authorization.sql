@@ -7,7 +7,8 @@ BEGIN
     SET NOCOUNT ON
     BEGIN TRANSACTION
 
-        IF EXISTS (SELECT 1 FROM accounts WHERE id != @Id AND username = @Username)
+        IF EXISTS (SELECT 1 FROM accounts WITH (UPDLOCK, HOLDLOCK) WHERE id != @Id AND username = @Username)
+            OR EXISTS (SELECT 1 FROM registration_requests WITH (UPDLOCK, HOLDLOCK) WHERE username = @Username)
             SELECT * FROM accounts WHERE 1 = 0
 
         ELSE
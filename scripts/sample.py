@@ -85,6 +85,7 @@ async def main() -> None:
     async with Database.instance.pool.acquire() as connection:
         await connection.execute("DELETE FROM payments")
         await connection.execute("DELETE FROM accounts")
+        await connection.execute("DELETE FROM registration_requests")
         await connection.execute("DELETE FROM rooms")
         await connection.execute("DELETE FROM fees")
 
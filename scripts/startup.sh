@@ -4,4 +4,5 @@ ROOT_DIR=$(realpath $SCRIPT_DIR/..)
 
 cd $ROOT_DIR
 pip install -r requirements.txt
-uvicorn main:app --host 0.0.0.0 --port $PORT --log-level warning --workers 12
+# Preloads the application once and forks the workers, see server/supervisor.py
+exec python main.py --host 0.0.0.0 --port $PORT --log-level warning --workers 12
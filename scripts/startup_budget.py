@@ -0,0 +1,137 @@
+"""Check the cold start of the API server against a time budget.
+
+Run `python scripts/startup_budget.py [--import-budget S] [--ready-budget S] [--runs N] [--port N]`.
+
+Two measurements, each the median of `--runs` fresh processes:
+- import: the cumulative time of `import main` reported by `python -X importtime`. The modules
+  with the largest self time are printed to find regressions.
+- ready: the time from starting `python main.py --workers 1` until `GET /` is answered, i.e. the
+  import, the preloading and the application lifespan (database connection, catalogs, indexes).
+
+The script exits with status 1 if a median exceeds its budget. Worker recycling and autoscaling
+rely on both staying low, see server/supervisor.py.
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+
+root = Path(__file__).parent.parent.resolve()
+IMPORTTIME = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s+)(\S+)$")
+
+
+def measure_import() -> Tuple[float, Dict[str, int]]:
+    """Return the cumulative import time of `main` in seconds, and the self time of each module in microseconds."""
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=root,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    total = 0.0
+    modules: Dict[str, int] = {}
+    for line in process.stderr.splitlines():
+        match = IMPORTTIME.match(line)
+        if match is not None:
+            modules[match.group(4)] = int(match.group(1))
+            if match.group(4) == "main":
+                total = int(match.group(2)) / 1e6
+
+    return total, modules
+
+
+def measure_ready(port: int, timeout: float) -> float:
+    """Return the time until the first response of a fresh server in seconds, or infinity on timeout."""
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "main.py", "--host", "127.0.0.1", "--port", str(port), "--workers", "1"],
+        cwd=root,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with socket.create_connection(("127.0.0.1", port), timeout=1.0) as connection:
+                    connection.sendall(b"GET / HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n")
+                    if connection.recv(16).startswith(b"HTTP/1.1"):
+                        return time.perf_counter() - start
+
+            except OSError:
+                pass
+
+            if process.poll() is not None:
+                raise RuntimeError(f"Server exited with status {process.returncode}")
+
+            time.sleep(0.02)
+
+        return float("inf")
+
+    finally:
+        process.terminate()
+        try:
+            process.wait(10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+def format_seconds(value: float) -> str:
+    return "timeout" if math.isinf(value) else f"{value:.3f}s"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Check the cold start of the API server against a time budget")
+    parser.add_argument("--import-budget", type=float, default=1.5, help="Maximum median import time of main.py, in seconds")
+    parser.add_argument("--ready-budget", type=float, default=10.0, help="Maximum median time to the first response, in seconds")
+    parser.add_argument("--runs", type=int, default=5, help="Number of processes measured")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", 8000)) + 100, help="Port of the measured server")
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest modules to print")
+    args = parser.parse_args()
+
+    # The first import writes the bytecode caches
+    measure_import()
+
+    imports: List[float] = []
+    modules: Dict[str, List[int]] = {}
+    for _ in range(args.runs):
+        total, selves = measure_import()
+        imports.append(total)
+        for module, duration in selves.items():
+            modules.setdefault(module, []).append(duration)
+
+    readies = [measure_ready(args.port, 2 * args.ready_budget) for _ in range(args.runs)]
+
+    print(f"{'module':<56}{'self (ms)':>12}")
+    slowest = sorted(modules.items(), key=lambda item: statistics.median(item[1]), reverse=True)
+    for module, durations in slowest[:args.top]:
+        print(f"{module:<56}{statistics.median(durations) / 1000:>12.2f}")
+
+    print()
+    failed = False
+    for name, values, budget in (("import", imports, args.import_budget), ("ready", readies, args.ready_budget)):
+        median = statistics.median(values)
+        verdict = "OK" if median <= budget else "OVER BUDGET"
+        failed = failed or median > budget
+        print(f"{name:<8} median {format_seconds(median)}, max {format_seconds(max(values))}, budget {budget:.3f}s: {verdict}")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,18 @@
+from .admission import *
+from .bus import *
+from .cache import *
+from .catalog import *
 from .config import *
 from .database import *
+from .events import *
 from .globals import *
+from .jobs import *
+from .openapi import *
+from .outbox import *
+from .push import *
+from .ratelimit import *
+from .scheduler import *
+from .supervisor import *
 from .utils import *
+from .vnpay import *
 from .v1 import *
@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import asyncio
+import math
+from collections import deque
+from typing import Any, ClassVar, Deque, Dict, List, Tuple, TYPE_CHECKING
+
+from fastapi import Request, status
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from .config import ADMISSION_EXEMPT, ADMISSION_LIMITS, ADMISSION_QUEUE_TIMEOUT
+from .database import CircuitOpen, Database
+
+
+__all__ = ("AdmissionControl",)
+
+
+class _Limiter:
+    """A concurrency limit with a bounded FIFO queue of waiting requests."""
+
+    __slots__ = (
+        "__capacity",
+        "__queue",
+        "__running",
+        "__statistics",
+        "__waiters",
+    )
+    if TYPE_CHECKING:
+        __capacity: int
+        __queue: int
+        __running: int
+        __statistics: Dict[str, int]
+        __waiters: Deque[asyncio.Future[None]]
+
+    def __init__(self, capacity: int, queue: int) -> None:
+        self.__capacity = capacity
+        self.__queue = queue
+        self.__running = 0
+        self.__statistics = {"admitted": 0, "queued": 0, "rejected": 0, "timeouts": 0}
+        self.__waiters = deque()
+
+    @property
+    def statistics(self) -> Dict[str, int]:
+        return {"running": self.__running, "waiting": len(self.__waiters), **self.__statistics}
+
+    async def acquire(self) -> bool:
+        """This function is a coroutine.
+
+        Take a slot, waiting at most `ADMISSION_QUEUE_TIMEOUT` seconds. Return whether a slot was taken.
+        """
+        if self.__running < self.__capacity and len(self.__waiters) == 0:
+            self.__running += 1
+            self.__statistics["admitted"] += 1
+            return True
+
+        if len(self.__waiters) >= self.__queue:
+            self.__statistics["rejected"] += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self.__waiters.append(waiter)
+        self.__statistics["queued"] += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), ADMISSION_QUEUE_TIMEOUT)
+
+        except asyncio.TimeoutError:
+            if not self.__abandon(waiter):
+                self.__statistics["timeouts"] += 1
+                return False
+
+        except asyncio.CancelledError:
+            if self.__abandon(waiter):
+                self.release()
+
+            raise
+
+        self.__statistics["admitted"] += 1
+        return True
+
+    def __abandon(self, waiter: asyncio.Future[None]) -> bool:
+        # A slot may have been handed over concurrently with the timeout or the cancellation
+        if waiter.done():
+            return True
+
+        waiter.cancel()
+        self.__waiters.remove(waiter)
+        return False
+
+    def release(self) -> None:
+        # Hand the slot over to the first waiter instead of freeing it, so that it cannot be taken
+        # by a newer request
+        while len(self.__waiters) > 0:
+            waiter = self.__waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+
+        self.__running -= 1
+
+
+class AdmissionControl:
+    """A per-process singleton shedding the load that this worker cannot serve in time.
+
+    A worker admits at most a number of concurrent requests, globally and per path prefix (see
+    `ADMISSION_LIMITS`, the empty prefix is the global limit). A request exceeding a limit waits in a
+    short queue for at most `ADMISSION_QUEUE_TIMEOUT` seconds. When the queue is full or the wait
+    times out, the request is rejected immediately with `503 Service Unavailable` and a `Retry-After`
+    header, instead of piling up on the connection pool and slowing down every other request.
+
+    Requests reaching the database while its circuit breaker is open are rejected in the same way,
+    see `.circuit_open()`. Long-lived event streams (`ADMISSION_EXEMPT`) are not admitted through the
+    limits.
+    """
+
+    RETRY_AFTER: ClassVar[int] = 1
+
+    instance: ClassVar[AdmissionControl]
+    __slots__ = ("__limiters",)
+    if TYPE_CHECKING:
+        __limiters: List[Tuple[str, _Limiter]]
+
+    def __init__(self) -> None:
+        # Longest prefixes first
+        self.__limiters = sorted(
+            ((prefix, _Limiter(capacity, queue)) for prefix, (capacity, queue) in ADMISSION_LIMITS.items()),
+            key=lambda item: len(item[0]),
+            reverse=True,
+        )
+
+    @property
+    def statistics(self) -> Dict[str, Any]:
+        """The state of each limit of this worker, and of the database circuit breaker."""
+        return {
+            "limits": {prefix: limiter.statistics for prefix, limiter in self.__limiters},
+            "database": Database.instance.breaker.statistics,
+        }
+
+    @staticmethod
+    async def circuit_open(request: Request, error: Exception) -> JSONResponse:
+        """Exception handler for `CircuitOpen`, to be registered on every application."""
+        assert isinstance(error, CircuitOpen)
+        return JSONResponse(
+            {"detail": "Database is unavailable"},
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers={"Retry-After": str(math.ceil(error.retry_after))},
+        )
+
+    def middleware(self, app: ASGIApp) -> ASGIApp:
+        """Wrap an ASGI application, for `app.add_middleware()`."""
+        async def admitted(scope: Scope, receive: Receive, send: Send) -> None:
+            if scope["type"] != "http" or scope["path"].startswith(ADMISSION_EXEMPT):
+                await app(scope, receive, send)
+                return
+
+            # The global limit and the longest matching route limit
+            path: str = scope["path"]
+            limiters: List[_Limiter] = []
+            for prefix, limiter in self.__limiters:
+                if prefix == "" or (len(limiters) == 0 and path.startswith(prefix)):
+                    limiters.append(limiter)
+
+            acquired: List[_Limiter] = []
+            try:
+                for limiter in limiters:
+                    if not await limiter.acquire():
+                        response = JSONResponse(
+                            {"detail": "Server is overloaded"},
+                            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            headers={"Retry-After": str(self.RETRY_AFTER)},
+                        )
+                        await response(scope, receive, send)
+                        return
+
+                    acquired.append(limiter)
+
+                await app(scope, receive, send)
+
+            finally:
+                for limiter in acquired:
+                    limiter.release()
+
+        return admitted
+
+
+AdmissionControl.instance = AdmissionControl()
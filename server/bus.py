@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Callable, ClassVar, Dict, List, Optional, Set, Tuple, TYPE_CHECKING
+
+from .database import Database
+from .events import EventDispatcher
+
+
+__all__ = ("InvalidationBus",)
+logger = logging.getLogger("uvicorn")
+
+
+class InvalidationBus:
+    """A per-process singleton propagating table changes to the caches of every worker.
+
+    The model-layer write events dispatched through `EventDispatcher` are mapped to the tables they
+    modify (see `EVENT_TABLES`). A local change notifies the subscribers of these tables immediately
+    and increments the version of each table in the `change_versions` table. Every worker polls
+    `change_versions` every `POLL_INTERVAL` seconds and notifies its own subscribers of the tables
+    changed by other workers, or other nodes.
+
+    The propagation latency of remote changes (from the version increment to its observation, both
+    measured on the database clock) is recorded in `.latency`, and a warning is logged whenever it
+    exceeds `LATENCY_WARNING`.
+    """
+
+    EVENT_TABLES: ClassVar[Dict[str, Tuple[str, ...]]] = {
+        "bills_import": ("bills",),
+        "fee_create": ("fees",),
+        "ipn_process": ("ipn_outcomes",),
+        "payment_create": ("payments",),
+        "reg_request_create": ("registration_requests",),
+        "reg_requests_purge": ("registration_requests",),
+        "reg_requests_reject": ("registration_requests",),
+        "resident_update": ("accounts",),
+        "residents_approve": ("accounts", "registration_requests"),
+        "residents_delete": ("accounts",),
+        "rooms_delete": ("bills", "rooms"),
+        "rooms_update": ("rooms",),
+    }
+    POLL_INTERVAL: ClassVar[float] = 0.5
+    LATENCY_WARNING: ClassVar[float] = 2.0
+
+    instance: ClassVar[InvalidationBus]
+    __slots__ = (
+        "__latencies",
+        "__listeners",
+        "__pending",
+        "__publisher",
+        "__poller",
+        "__versions",
+    )
+    if TYPE_CHECKING:
+        __latencies: List[float]
+        __listeners: Dict[str, List[Tuple[Callable[[str], Any], bool]]]
+        __pending: Set[str]
+        __publisher: Optional[asyncio.Task[None]]
+        __poller: Optional[asyncio.Task[None]]
+        __versions: Dict[str, int]
+
+    def __init__(self) -> None:
+        self.__latencies = [0, 0.0, 0.0]  # count, total, max
+        self.__listeners = {}
+        self.__pending = set()
+        self.__publisher = None
+        self.__poller = None
+        self.__versions = {}
+
+        for event, tables in self.EVENT_TABLES.items():
+            EventDispatcher.instance.add_listener(event, self.__event_listener(tables))
+
+    def __event_listener(self, tables: Tuple[str, ...]) -> Callable[..., None]:
+        def listener(*_: Any) -> None:
+            self.publish(*tables)
+
+        return listener
+
+    @property
+    def latency(self) -> Dict[str, float]:
+        """Statistics of the propagation latency of remote changes observed by this worker, in seconds."""
+        count, total, maximum = self.__latencies
+        return {
+            "count": count,
+            "mean": total / count if count > 0 else 0.0,
+            "max": maximum,
+        }
+
+    def subscribe(self, table: str, callback: Callable[[str], Any], *, local: bool = True) -> None:
+        """Register `callback` to be called with the table name whenever `table` is changed by any worker.
+
+        With `local=False`, only changes made by other workers are notified, e.g. for subscribers
+        already kept up to date by the `EventDispatcher` events of this worker.
+        """
+        self.__listeners.setdefault(table, []).append((callback, local))
+
+    def unsubscribe(self, table: str, callback: Callable[[str], Any]) -> None:
+        """Unregister a callback previously added with `.subscribe()`. Unknown callbacks are ignored."""
+        listeners = self.__listeners.get(table, [])
+        listeners[:] = [listener for listener in listeners if listener[0] != callback]
+
+    def __notify(self, table: str, *, remote: bool) -> None:
+        for callback, local in tuple(self.__listeners.get(table, ())):
+            if remote or local:
+                try:
+                    callback(table)
+                except Exception:
+                    logger.exception(f"Exception in subscriber {callback!r} of table {table!r}")
+
+    def publish(self, *tables: str) -> None:
+        """Notify the local subscribers of `tables` now, and the other workers at their next poll."""
+        for table in tables:
+            self.__notify(table, remote=False)
+
+        self.__pending.update(tables)
+        if self.__poller is not None and self.__publisher is None:
+            self.__publisher = asyncio.create_task(self.__publish())
+
+    async def __publish(self) -> None:
+        try:
+            while len(self.__pending) > 0:
+                tables = sorted(self.__pending)
+                self.__pending.clear()
+
+                placeholders = ", ".join("?" for _ in tables)
+                async with Database.instance.pool.acquire() as connection:
+                    async with connection.cursor() as cursor:
+                        await cursor.execute(
+                            f"""
+                                UPDATE change_versions
+                                SET version = version + 1, changed = SYSUTCDATETIME()
+                                OUTPUT INSERTED.name, INSERTED.version
+                                WHERE name IN ({placeholders})
+                            """,
+                            *tables,
+                        )
+                        rows = await cursor.fetchall()
+
+                # Skip our own increment at the next poll, unless another worker incremented in between
+                for row in rows:
+                    if self.__versions.get(row.name) == row.version - 1:
+                        self.__versions[row.name] = row.version
+
+        except Exception:
+            logger.exception("Unable to publish table changes to other workers")
+
+        finally:
+            self.__publisher = None
+
+    async def __poll(self) -> None:
+        async with Database.instance.pool.acquire() as connection:
+            async with connection.cursor() as cursor:
+                await cursor.execute("SELECT name, version, changed, SYSUTCDATETIME() AS now FROM change_versions")
+                rows = await cursor.fetchall()
+
+        for row in rows:
+            known = self.__versions.get(row.name)
+            if known is not None and known >= row.version:
+                continue
+
+            self.__versions[row.name] = row.version
+            if known is None:
+                continue
+
+            latency = (row.now - row.changed).total_seconds()
+            self.__record(latency)
+            if latency > self.LATENCY_WARNING:
+                logger.warning(f"Change of table {row.name!r} took {latency:.3f}s to propagate")
+
+            self.__notify(row.name, remote=True)
+
+    def __record(self, latency: float) -> None:
+        self.__latencies[0] += 1
+        self.__latencies[1] += latency
+        self.__latencies[2] = max(self.__latencies[2], latency)
+
+    async def __run(self) -> None:
+        while True:
+            try:
+                await self.__poll()
+            except Exception:
+                logger.exception("Unable to poll table changes")
+
+            await asyncio.sleep(self.POLL_INTERVAL)
+
+    async def start(self) -> None:
+        """This function is a coroutine.
+
+        Load the current table versions and start polling for remote changes.
+        If the bus is already started, this function does nothing.
+        """
+        if self.__poller is not None:
+            return
+
+        await self.__poll()
+        self.__poller = asyncio.create_task(self.__run())
+
+    async def stop(self) -> None:
+        """This function is a coroutine.
+
+        Stop polling and wait for pending changes to be published.
+        """
+        poller, self.__poller = self.__poller, None
+        if poller is not None:
+            poller.cancel()
+            try:
+                await poller
+            except asyncio.CancelledError:
+                pass
+
+        if self.__publisher is not None:
+            await self.__publisher
+
+        self.__versions.clear()
+        logger.info(f"Table change propagation latency: {self.latency}")
+
+
+InvalidationBus.instance = InvalidationBus()
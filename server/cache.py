@@ -0,0 +1,408 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import inspect
+import logging
+import time
+from collections import OrderedDict
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    ClassVar,
+    Dict,
+    FrozenSet,
+    Generic,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    OrderedDict as OrderedDictType,
+    ParamSpec,
+    Tuple,
+    TypeVar,
+    TYPE_CHECKING,
+)
+
+import pydantic
+from fastapi import Response
+
+from .bus import InvalidationBus
+from .config import RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_TTL
+
+
+__all__ = ("CachedQuery", "ResponseCache", "SingleFlight", "single_flight")
+P = ParamSpec("P")
+T = TypeVar("T")
+logger = logging.getLogger("uvicorn")
+
+
+def _freeze(value: Any) -> Hashable:
+    """A hashable key comparing containers by value.
+
+    Raises `TypeError` for unhashable values.
+    """
+    if isinstance(value, (list, tuple)):
+        return (tuple, tuple(_freeze(item) for item in value))
+
+    if isinstance(value, dict):
+        return (dict, tuple(sorted((key, _freeze(item)) for key, item in value.items())))
+
+    if isinstance(value, (set, frozenset)):
+        return (frozenset, frozenset(_freeze(item) for item in value))
+
+    hash(value)
+    return value
+
+
+class CachedQuery(Generic[T]):
+    """A per-worker cache of the result of a parameterless coroutine function.
+
+    Concurrent callers share a single in-flight query. The result is kept for `ttl` seconds, or until
+    one of the given tables is changed by any worker (see `InvalidationBus`). A query started before
+    an invalidation still answers its callers, but its result is not cached.
+
+    With `stale=True`, an expired (but not invalidated) result keeps being returned while a single
+    background query refreshes it, so callers only wait when there is no result at all.
+    """
+
+    __slots__ = (
+        "__expires",
+        "__generation",
+        "__query",
+        "__running",
+        "__stale",
+        "__ttl",
+        "__value",
+    )
+    if TYPE_CHECKING:
+        __expires: float
+        __generation: int
+        __query: Callable[[], Awaitable[T]]
+        __running: Optional[asyncio.Task[T]]
+        __stale: bool
+        __ttl: float
+        __value: Optional[T]
+
+    def __init__(
+        self,
+        query: Callable[[], Awaitable[T]],
+        *,
+        ttl: float,
+        tables: Iterable[str] = (),
+        stale: bool = False,
+    ) -> None:
+        self.__expires = 0.0
+        self.__generation = 0
+        self.__query = query
+        self.__running = None
+        self.__stale = stale
+        self.__ttl = ttl
+        self.__value = None
+
+        for table in tables:
+            InvalidationBus.instance.subscribe(table, self.invalidate)
+
+    def invalidate(self, *_: Any) -> None:
+        """Discard the cached result. Accepts and ignores any notification arguments."""
+        self.__expires = 0.0
+        self.__generation += 1
+        self.__running = None
+        self.__value = None
+
+    async def __refresh(self) -> T:
+        generation = self.__generation
+        value = await self.__query()
+        if generation == self.__generation:
+            self.__value = value
+            self.__expires = time.monotonic() + self.__ttl
+
+        return value
+
+    def __done(self, task: asyncio.Task[T]) -> None:
+        if self.__running is task:
+            self.__running = None
+
+        # A background refresh may have no caller to receive its exception
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Cached query {self.__query!r} failed", exc_info=task.exception())
+
+    def __start(self) -> asyncio.Task[T]:
+        task = self.__running
+        if task is None:
+            self.__running = task = asyncio.create_task(self.__refresh())
+            task.add_done_callback(self.__done)
+
+        return task
+
+    async def get(self) -> T:
+        """This function is a coroutine.
+
+        Return the cached result, querying it first if it is missing or expired.
+        """
+        value = self.__value
+        if value is not None:
+            if time.monotonic() < self.__expires:
+                return value
+
+            if self.__stale:
+                self.__start()
+                return value
+
+        task = self.__start()
+
+        # Shield the shared query so that a cancelled caller does not cancel it for the others
+        return await asyncio.shield(task)
+
+
+class SingleFlight(Generic[T]):
+    """Coalesces concurrent calls of a coroutine function with the same arguments into a single call.
+
+    Calls are keyed on their normalized arguments: defaults are applied and containers are compared
+    by value. Datetimes are compared exactly: routes defaulting to the current time use `query_time()`
+    so that their requests share a call. The first call of a key starts a task that later calls of
+    the same key join until it completes. With `ttl > 0`, its result is also returned to the calls of the same
+    key for `ttl` seconds, unless one of `tables` is changed by any worker (see `InvalidationBus`).
+
+    Callers share the same result object, which must therefore be treated as read-only. A shared
+    call is shielded from the cancellation of its callers: a client disconnecting does not fail the
+    others. Calls whose arguments cannot be hashed are not coalesced.
+    """
+
+    MAX_RESULTS: ClassVar[int] = 256
+
+    instances: ClassVar[List[SingleFlight[Any]]] = []
+    __slots__ = (
+        "__function",
+        "__generation",
+        "__name",
+        "__results",
+        "__running",
+        "__signature",
+        "__statistics",
+        "__ttl",
+    )
+    if TYPE_CHECKING:
+        __function: Callable[..., Awaitable[T]]
+        __generation: int
+        __name: str
+        __results: OrderedDictType[Hashable, Tuple[float, T]]
+        __running: Dict[Hashable, asyncio.Task[T]]
+        __signature: inspect.Signature
+        __statistics: Dict[str, int]
+        __ttl: float
+
+    def __init__(self, function: Callable[..., Awaitable[T]], *, ttl: float = 0.0, tables: Iterable[str] = ()) -> None:
+        self.__function = function
+        self.__generation = 0
+        self.__name = function.__qualname__
+        self.__results = OrderedDict()
+        self.__running = {}
+        self.__signature = inspect.signature(function)
+        self.__statistics = {"calls": 0, "executed": 0, "coalesced": 0, "cached": 0}
+        self.__ttl = ttl
+
+        for table in tables:
+            InvalidationBus.instance.subscribe(table, self.invalidate)
+
+        self.instances.append(self)
+
+    @property
+    def name(self) -> str:
+        return self.__name
+
+    @property
+    def statistics(self) -> Dict[str, int]:
+        """Call counters. `coalesced + cached` is the number of calls that did not query the database."""
+        return dict(self.__statistics)
+
+    def invalidate(self, *_: Any) -> None:
+        """Discard the cached results and detach the running calls from new callers."""
+        self.__generation += 1
+        self.__results.clear()
+        self.__running.clear()
+
+    def __key(self, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Optional[Hashable]:
+        try:
+            bound = self.__signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            return tuple((name, _freeze(value)) for name, value in bound.arguments.items())
+        except TypeError:
+            return None
+
+    async def __execute(self, key: Hashable, generation: int, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> T:
+        self.__statistics["executed"] += 1
+        value = await self.__function(*args, **kwargs)
+        if self.__ttl > 0 and generation == self.__generation:
+            self.__results[key] = (time.monotonic() + self.__ttl, value)
+            self.__results.move_to_end(key)
+            while len(self.__results) > self.MAX_RESULTS:
+                self.__results.popitem(last=False)
+
+        return value
+
+    def __done(self, key: Hashable, task: asyncio.Task[T]) -> None:
+        if self.__running.get(key) is task:
+            del self.__running[key]
+
+        # Retrieve the exception of a call whose callers were all cancelled
+        if not task.cancelled():
+            task.exception()
+
+    async def __call__(self, *args: Any, **kwargs: Any) -> T:
+        self.__statistics["calls"] += 1
+        key = self.__key(args, kwargs)
+        if key is None:
+            self.__statistics["executed"] += 1
+            return await self.__function(*args, **kwargs)
+
+        cached = self.__results.get(key)
+        if cached is not None:
+            if time.monotonic() < cached[0]:
+                self.__statistics["cached"] += 1
+                return cached[1]
+
+            del self.__results[key]
+
+        task = self.__running.get(key)
+        if task is None:
+            self.__running[key] = task = asyncio.create_task(self.__execute(key, self.__generation, args, kwargs))
+            task.add_done_callback(functools.partial(self.__done, key))
+        else:
+            self.__statistics["coalesced"] += 1
+
+        # Shield the shared call so that a cancelled caller does not cancel it for the others
+        return await asyncio.shield(task)
+
+    @classmethod
+    def all_statistics(cls) -> Dict[str, Dict[str, int]]:
+        """The counters of every coalesced function of this worker, by qualified name."""
+        return {instance.name: instance.statistics for instance in cls.instances}
+
+
+def single_flight(
+    *,
+    ttl: float = 0.0,
+    tables: Iterable[str] = (),
+) -> Callable[[Callable[P, Awaitable[T]]], Callable[P, Awaitable[T]]]:
+    """Decorator coalescing concurrent calls of a coroutine function, see `SingleFlight`.
+
+    Apply it below `@classmethod` or `@staticmethod`.
+    """
+    def decorator(function: Callable[P, Awaitable[T]]) -> Callable[P, Awaitable[T]]:
+        flight = SingleFlight(function, ttl=ttl, tables=tables)
+
+        @functools.wraps(function)
+        async def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
+            return await flight(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class ResponseCache:
+    """A per-process singleton caching serialized JSON responses of read-mostly endpoints.
+
+    A response is keyed by the route and its normalized parameters, and stored as the bytes of its
+    JSON body, so that a hit skips the database, the construction of the models and their encoding.
+    It is kept until one of its tables is changed by any worker (see `InvalidationBus`), or at most
+    `RESPONSE_CACHE_TTL` seconds. The least recently used responses are evicted to keep the size of
+    the bodies under `RESPONSE_CACHE_MAX_BYTES`.
+
+    Only successful responses should be cached: callers check permissions before calling `.get()`.
+    """
+
+    instance: ClassVar[ResponseCache]
+    __slots__ = (
+        "__entries",
+        "__generations",
+        "__size",
+        "__statistics",
+    )
+    if TYPE_CHECKING:
+        __entries: OrderedDictType[Hashable, Tuple[float, FrozenSet[str], bytes]]
+        __generations: Dict[str, int]
+        __size: int
+        __statistics: Dict[str, int]
+
+    def __init__(self) -> None:
+        self.__entries = OrderedDict()
+        self.__generations = {}
+        self.__size = 0
+        self.__statistics = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    @property
+    def statistics(self) -> Dict[str, int]:
+        return {"entries": len(self.__entries), "bytes": self.__size, **self.__statistics}
+
+    def __discard(self, key: Hashable) -> None:
+        _, _, body = self.__entries.pop(key)
+        self.__size -= len(body)
+
+    def invalidate(self, table: str) -> None:
+        """Discard the responses depending on `table`."""
+        self.__generations[table] += 1
+        for key in [key for key, (_, tables, _) in self.__entries.items() if table in tables]:
+            self.__discard(key)
+            self.__statistics["invalidations"] += 1
+
+    async def get(
+        self,
+        route: str,
+        params: Dict[str, Any],
+        *,
+        tables: Iterable[str],
+        build: Callable[[], Awaitable[pydantic.BaseModel]],
+    ) -> Response:
+        """This function is a coroutine.
+
+        Return the cached response of `route` for `params`, or build, cache and return it.
+
+        Parameters
+        -----
+        route: `str`
+            The name of the route.
+        params: `Dict[str, Any]`
+            The parameters determining the response.
+        tables: `Iterable[str]`
+            The tables read to build the response.
+        build: `Callable[[], Awaitable[pydantic.BaseModel]]`
+            Build the response model on a miss.
+        """
+        dependencies = frozenset(tables)
+        for table in dependencies:
+            if table not in self.__generations:
+                self.__generations[table] = 0
+                InvalidationBus.instance.subscribe(table, self.invalidate)
+
+        key = (route, _freeze(params))
+        entry = self.__entries.get(key)
+        if entry is not None:
+            if time.monotonic() < entry[0]:
+                self.__entries.move_to_end(key)
+                self.__statistics["hits"] += 1
+                return Response(entry[2], media_type="application/json", headers={"X-Cache": "HIT"})
+
+            self.__discard(key)
+
+        self.__statistics["misses"] += 1
+        generations = [self.__generations[table] for table in dependencies]
+        body = (await build()).model_dump_json().encode("utf-8")
+
+        # Do not cache a response built concurrently with a change of its tables
+        if generations == [self.__generations[table] for table in dependencies] and len(body) <= RESPONSE_CACHE_MAX_BYTES:
+            if key in self.__entries:
+                self.__discard(key)
+
+            self.__entries[key] = (time.monotonic() + RESPONSE_CACHE_TTL, dependencies, body)
+            self.__size += len(body)
+            while self.__size > RESPONSE_CACHE_MAX_BYTES:
+                self.__discard(next(iter(self.__entries)))
+                self.__statistics["evictions"] += 1
+
+        return Response(body, media_type="application/json", headers={"X-Cache": "MISS"})
+
+
+ResponseCache.instance = ResponseCache()
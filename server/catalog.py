@@ -0,0 +1,317 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import struct
+import tempfile
+import zlib
+from abc import ABC, abstractmethod
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, ClassVar, Generic, IO, List, Optional, Sequence, Tuple, TypeVar, TYPE_CHECKING
+
+from pyodbc import Row  # type: ignore
+
+from .bus import InvalidationBus
+from .config import ROOT
+from .database import Database
+
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows, catalogs are disabled
+    fcntl = None  # type: ignore
+
+
+__all__ = ("CatalogUnavailable", "SharedCatalog")
+logger = logging.getLogger("uvicorn")
+T = TypeVar("T")
+
+# Shared memory segments and lock files are scoped to this deployment on this node
+_PREFIX = f"rm{zlib.crc32(str(ROOT).encode('utf-8')):08x}"
+
+
+class CatalogUnavailable(RuntimeError):
+    """Raised when a shared catalog cannot be read, callers should query the database instead."""
+    pass
+
+
+def _attach(name: str) -> Optional[shared_memory.SharedMemory]:
+    try:
+        segment = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return None
+
+    # Segments outlive the processes attaching to them: stop the resource tracker from
+    # unlinking them when this process exits
+    resource_tracker.unregister(segment._name, "shared_memory")  # type: ignore
+    return segment
+
+
+def _create(name: str, size: int) -> shared_memory.SharedMemory:
+    segment = shared_memory.SharedMemory(name=name, create=True, size=size)
+    resource_tracker.unregister(segment._name, "shared_memory")  # type: ignore
+    return segment
+
+
+class SharedCatalog(ABC, Generic[T]):
+    """A table snapshot shared by all workers of a node through `multiprocessing.shared_memory`.
+
+    The snapshot is an array of fixed-width `record`s sorted by their first field, stored in a data
+    segment. A small control segment holds a generation counter, the ID of the current data segment
+    and the number of records. Lookups binary-search the shared records in place, so the memory of
+    each worker does not grow with the catalog.
+
+    One worker per node holds an exclusive file lock and is the only writer: it reloads the snapshot
+    with a single query whenever `InvalidationBus` reports a change to one of `tables`. It makes the
+    generation odd before modifying the segments and even again afterwards, so readers never take a
+    lock: they retry when the generation is odd or changed during their lookup (a sequence lock).
+    When the snapshot outgrows its data segment, the writer switches to a new, larger one.
+
+    Catalogs suit rarely changing tables looked up by key into fixed-width records. Paged, filtered
+    or sorted listings, and tables changed on most requests, are better served by SQL Server.
+
+    Subclasses implement `.encode()` and `.decode()`.
+    """
+
+    # generation, data segment ID, record count
+    CONTROL: ClassVar[struct.Struct] = struct.Struct("<QII")
+    ELECTION_INTERVAL: ClassVar[float] = 5.0
+    REFRESH_DELAY: ClassVar[float] = 0.1
+    READ_ATTEMPTS: ClassVar[int] = 100
+
+    __slots__ = (
+        "__control",
+        "__data",
+        "__data_id",
+        "__lock",
+        "__name",
+        "__query",
+        "__record",
+        "__refreshing",
+        "__tables",
+        "__task",
+    )
+    if TYPE_CHECKING:
+        __control: Optional[shared_memory.SharedMemory]
+        __data: Optional[shared_memory.SharedMemory]
+        __data_id: int
+        __lock: Optional[IO[Any]]
+        __name: str
+        __query: str
+        __record: struct.Struct
+        __refreshing: Optional[asyncio.Task[None]]
+        __tables: Tuple[str, ...]
+        __task: Optional[asyncio.Task[None]]
+
+    def __init__(self, name: str, *, record: struct.Struct, query: str, tables: Sequence[str]) -> None:
+        self.__control = None
+        self.__data = None
+        self.__data_id = 0
+        self.__lock = None
+        self.__name = f"{_PREFIX}-{name}"
+        self.__query = query
+        self.__record = record
+        self.__refreshing = None
+        self.__tables = tuple(tables)
+        self.__task = None
+
+    @abstractmethod
+    def encode(self, row: Row) -> Tuple[Any, ...]:
+        """Convert a row returned by the catalog query to the fields of a record."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def decode(self, fields: Tuple[Any, ...]) -> T:
+        """Convert the fields of a record to the object returned by `.get()`."""
+        raise NotImplementedError
+
+    @property
+    def writer(self) -> bool:
+        """Whether this worker is the writer of the catalog on this node."""
+        return self.__lock is not None
+
+    async def start(self) -> None:
+        """This function is a coroutine.
+
+        Attach to the catalog, or become its writer if there is none yet on this node.
+        """
+        if fcntl is None or self.__task is not None:
+            return
+
+        for table in self.__tables:
+            InvalidationBus.instance.subscribe(table, self.__on_change)
+
+        await self.__elect()
+        self.__task = asyncio.create_task(self.__run())
+
+    def stop(self) -> None:
+        """Stop maintaining the catalog and detach from it. The shared segments are kept for other workers."""
+        for table in self.__tables:
+            InvalidationBus.instance.unsubscribe(table, self.__on_change)
+
+        for task in (self.__task, self.__refreshing):
+            if task is not None:
+                task.cancel()
+
+        self.__task = self.__refreshing = None
+        self.__detach()
+        if self.__lock is not None:
+            self.__lock.close()  # Also releases the lock
+            self.__lock = None
+
+    def __detach(self) -> None:
+        for segment in (self.__control, self.__data):
+            if segment is not None:
+                segment.close()
+
+        self.__control = self.__data = None
+        self.__data_id = 0
+
+    async def __elect(self) -> None:
+        if self.__lock is not None or fcntl is None:
+            return
+
+        lock = open(os.path.join(tempfile.gettempdir(), f"{self.__name}.lock"), "a")
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock.close()
+            return
+
+        logger.info(f"[{os.getpid()}] Writing shared catalog {self.__name!r}")
+        self.__lock = lock
+        await self.__refresh()
+
+    async def __run(self) -> None:
+        while True:
+            await asyncio.sleep(self.ELECTION_INTERVAL)
+            try:
+                await self.__elect()
+            except Exception:
+                logger.exception(f"Unable to elect the writer of {self.__name!r}")
+
+    def __on_change(self, _: str) -> None:
+        if self.__lock is not None and self.__refreshing is None:
+            self.__refreshing = asyncio.create_task(self.__delayed_refresh())
+
+    async def __delayed_refresh(self) -> None:
+        # Coalesce bursts of changes into a single query
+        await asyncio.sleep(self.REFRESH_DELAY)
+        self.__refreshing = None
+        try:
+            await self.__refresh()
+        except Exception:
+            logger.exception(f"Unable to refresh {self.__name!r}")
+
+    async def __refresh(self) -> None:
+        async with Database.instance.pool.acquire() as connection:
+            async with connection.cursor() as cursor:
+                await cursor.execute(self.__query)
+                rows = await cursor.fetchall()
+
+        records = sorted(self.encode(row) for row in rows)
+        self.__write(records)
+
+    def __write(self, records: List[Tuple[Any, ...]]) -> None:
+        # Encode first so that readers only wait for a memory copy
+        payload = b"".join(self.__record.pack(*fields) for fields in records)
+
+        control = self.__control
+        if control is None:
+            control = self.__control = _attach(self.__name) or _create(self.__name, self.CONTROL.size)
+
+        generation, data_id, _ = self.CONTROL.unpack_from(control.buf)
+        generation += generation % 2  # A previous writer may have died while writing
+
+        data = self.__data if self.__data_id == data_id else None
+        if data is None and data_id > 0:
+            data = _attach(f"{self.__name}-{data_id}")
+
+        previous: Optional[shared_memory.SharedMemory] = None
+        if data is None or data.size < len(payload):
+            previous = data
+            data_id += 1
+            data = _create(f"{self.__name}-{data_id}", max(2 * len(payload), 4096))
+
+            # Fill the new segment before publishing it
+            data.buf[:len(payload)] = payload
+            self.CONTROL.pack_into(control.buf, 0, generation + 1, data_id, len(records))
+            self.CONTROL.pack_into(control.buf, 0, generation + 2, data_id, len(records))
+
+        else:
+            self.CONTROL.pack_into(control.buf, 0, generation + 1, data_id, len(records))
+            data.buf[:len(payload)] = payload
+            self.CONTROL.pack_into(control.buf, 0, generation + 2, data_id, len(records))
+
+        if self.__data is not None and self.__data is not data:
+            self.__data.close()
+
+        self.__data = data
+        self.__data_id = data_id
+        if previous is not None:
+            # Readers still attached keep their mapping until they switch to the new segment
+            previous.close()
+            resource_tracker.register(previous._name, "shared_memory")  # type: ignore
+            previous.unlink()
+
+    def __search(self, data: shared_memory.SharedMemory, count: int, key: Any) -> Optional[Tuple[Any, ...]]:
+        record = self.__record
+        buf = data.buf
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            fields = record.unpack_from(buf, middle * record.size)
+            if fields[0] < key:
+                low = middle + 1
+            elif fields[0] > key:
+                high = middle
+            else:
+                return fields
+
+        return None
+
+    def get(self, key: Any) -> Optional[T]:
+        """Return the record whose first field equals `key`, or `None` if there is none.
+
+        Raises
+        -----
+        `CatalogUnavailable`
+            The catalog is not available in this process, or is being rewritten too often.
+        """
+        control = self.__control
+        if control is None:
+            if fcntl is None or self.__task is None:
+                raise CatalogUnavailable(self.__name)
+
+            control = self.__control = _attach(self.__name)
+            if control is None:
+                raise CatalogUnavailable(self.__name)
+
+        for _ in range(self.READ_ATTEMPTS):
+            generation, data_id, count = self.CONTROL.unpack_from(control.buf)
+            if generation % 2 == 1 or data_id == 0:
+                os.sched_yield()
+                continue
+
+            if data_id != self.__data_id:
+                data = _attach(f"{self.__name}-{data_id}")
+                if data is None:
+                    continue
+
+                if self.__data is not None:
+                    self.__data.close()
+
+                self.__data = data
+                self.__data_id = data_id
+
+            assert self.__data is not None
+            try:
+                fields = self.__search(self.__data, count, key)
+            except struct.error:
+                continue  # Torn read of a segment being replaced
+
+            if self.CONTROL.unpack_from(control.buf)[0] == generation:
+                return None if fields is None else self.decode(fields)
+
+        raise CatalogUnavailable(self.__name)
@@ -1,8 +1,9 @@
 from __future__ import annotations
 
 import os
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
+from typing import Dict, Tuple
 
 from yarl import URL
 
@@ -12,11 +13,25 @@ __all__ = (
     "ODBC_CONNECTION_STRING",
     "VNPAY_TMN_CODE",
     "VNPAY_SECRET_KEY",
+    "VNPAY_BASE_URL",
     "EPOCH",
     "SALT_LENGTH",
     "DEFAULT_ADMIN_USERNAME",
     "DEFAULT_ADMIN_PASSWORD",
     "DB_PAGINATION_QUERY",
+    "SINGLE_FLIGHT_TTL",
+    "RESPONSE_CACHE_MAX_BYTES",
+    "RESPONSE_CACHE_TTL",
+    "ARCHIVE_KEEP_YEARS",
+    "REGISTRATION_REQUEST_EXPIRY",
+    "PUSH_EVENT_RETENTION",
+    "RATE_LIMITING",
+    "RATE_LIMITS",
+    "ADMISSION_LIMITS",
+    "ADMISSION_QUEUE_TIMEOUT",
+    "ADMISSION_EXEMPT",
+    "WORKER_MAX_REQUESTS",
+    "WORKER_MAX_MEMORY",
     "ROOT",
     "SERVER_BASE_URL",
 )
@@ -27,6 +42,9 @@ ODBC_CONNECTION_STRING = os.environ["ODBC_CONNECTION_STRING"]
 VNPAY_TMN_CODE = os.environ["VNPAY_TMN_CODE"]
 VNPAY_SECRET_KEY = os.environ["VNPAY_SECRET_KEY"]
 
+# Overridden to run against a local mock gateway, see scripts/mock_vnpay.py
+VNPAY_BASE_URL = URL(os.environ.get("VNPAY_BASE_URL", "https://sandbox.vnpayment.vn/paymentv2/vpcpay.html"))
+
 EPOCH = datetime(2024, 1, 1, 0, 0, 0, 0, timezone.utc)
 
 SALT_LENGTH = 8
@@ -35,6 +53,55 @@ DEFAULT_ADMIN_PASSWORD = "NgaiLongGey"
 
 DB_PAGINATION_QUERY = 50
 
+# Seconds for which a coalesced list or count query keeps serving its result, see server/cache.py
+SINGLE_FLIGHT_TTL = 1.0
+
+# Total size of the cached JSON bodies per worker, and their maximum age in seconds in case a change
+# is missed. See ResponseCache in server/cache.py
+RESPONSE_CACHE_MAX_BYTES = 16 * 1024 * 1024
+RESPONSE_CACHE_TTL = 300.0
+
+# Number of closed years whose fees and payments stay in the hot tables, see the archive_fees job
+ARCHIVE_KEEP_YEARS = 1
+
+# Pending registration requests older than this are deleted, see the purge_registration_requests job
+REGISTRATION_REQUEST_EXPIRY = timedelta(days=int(os.environ.get("REGISTRATION_REQUEST_EXPIRY_DAYS", 30)))
+
+# Pushed events older than this can no longer be replayed to reconnecting clients, see the purge_push_events job
+PUSH_EVENT_RETENTION = timedelta(days=1)
+
+# Token buckets (requests per second, burst) per client IP and per username, see server/ratelimit.py.
+# RATE_LIMITING=0 disables them, e.g. for load tests sending every request from a single IP
+RATE_LIMITING = bool(int(os.environ.get("RATE_LIMITING", 1)))
+RATE_LIMITS: Dict[str, Tuple[float, int]] = {
+    "admin_login": (0.2, 5),
+    "login": (1.0, 10),
+    "pay": (1.0, 20),
+    "register": (0.1, 5),
+}
+
+# Concurrent requests per worker and queued requests waiting for a slot, per path prefix ("" is the
+# global limit), and the maximum wait in a queue in seconds. See server/admission.py
+ADMISSION_LIMITS: Dict[str, Tuple[int, int]] = {
+    "": (200, 200),
+    "/api/v1/admin/bills/import": (2, 2),
+    "/api/v1/admin/fees/payments/create": (4, 4),
+    "/api/v1/residents/pay": (50, 50),
+}
+ADMISSION_QUEUE_TIMEOUT = 1.0
+
+# Paths of long-lived event streams, which would hold an admission slot for their whole lifetime. Their
+# number is bounded by PushHub.MAX_CLIENTS instead, see server/push.py
+ADMISSION_EXEMPT: Tuple[str, ...] = (
+    "/api/v1/admin/events",
+    "/api/v1/residents/events",
+)
+
+# A worker started by the supervisor (see server/supervisor.py) is replaced after this many requests,
+# or when its private memory exceeds this many bytes. 0 disables the limit
+WORKER_MAX_REQUESTS = int(os.environ.get("WORKER_MAX_REQUESTS", 100000))
+WORKER_MAX_MEMORY = int(os.environ.get("WORKER_MAX_MEMORY_MB", 512)) * 1024 * 1024
+
 
 ROOT = Path(__file__).parent.parent.resolve()
-SERVER_BASE_URL = URL("https://resident-manager-1.azurewebsites.net/")
+SERVER_BASE_URL = URL(os.environ.get("SERVER_BASE_URL", "https://resident-manager-1.azurewebsites.net/"))
@@ -1,13 +1,17 @@
 from __future__ import annotations
 
-import atexit
+import asyncio
+import hashlib
 import logging
-import os
+import random
 import secrets
+import time
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Any, ClassVar, Optional, TYPE_CHECKING
+from typing import Any, AsyncIterator, ClassVar, Dict, List, Optional, TYPE_CHECKING
 
 import aioodbc  # type: ignore
+import pyodbc  # type: ignore
 
 from .config import (
     DEFAULT_ADMIN_PASSWORD,
@@ -19,89 +23,318 @@ from .config import (
 from .utils import hash_password
 
 
-__all__ = ("Database",)
+__all__ = ("CircuitBreaker", "CircuitOpen", "Database")
 logger = logging.getLogger("uvicorn")
 
 
+class CircuitOpen(RuntimeError):
+    """Raised instead of acquiring a database connection while the circuit breaker is open."""
+
+    def __init__(self, retry_after: float) -> None:
+        super().__init__(f"Database circuit breaker is open, retry after {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """A circuit breaker failing database accesses fast while the database is unavailable.
+
+    The breaker opens after `THRESHOLD` consecutive failures: connection errors, query timeouts or
+    connections not acquired within `ACQUIRE_TIMEOUT`. While open, acquiring a connection raises
+    `CircuitOpen` immediately instead of queueing on a pool that cannot serve. After `OPEN_DURATION`
+    seconds, a single trial access is let through (half-open): the breaker closes if it succeeds and
+    opens again otherwise.
+
+    Errors caused by the statement itself (constraint violations, deadlocks, ...) are not failures.
+    """
+
+    ACQUIRE_TIMEOUT: ClassVar[float] = 5.0
+    OPEN_DURATION: ClassVar[float] = 10.0
+    THRESHOLD: ClassVar[int] = 5
+
+    __slots__ = (
+        "__failures",
+        "__opened",
+        "__probing",
+        "__statistics",
+    )
+    if TYPE_CHECKING:
+        __failures: int
+        __opened: Optional[float]
+        __probing: bool
+        __statistics: Dict[str, int]
+
+    def __init__(self) -> None:
+        self.__failures = 0
+        self.__opened = None
+        self.__probing = False
+        self.__statistics = {"failures": 0, "opened": 0, "rejected": 0}
+
+    @staticmethod
+    def is_failure(error: BaseException) -> bool:
+        """Whether `error` indicates that the database is unavailable."""
+        return isinstance(error, (asyncio.TimeoutError, ConnectionError, pyodbc.InterfaceError, pyodbc.OperationalError))
+
+    @property
+    def state(self) -> str:
+        if self.__opened is None:
+            return "closed"
+
+        return "half-open" if time.monotonic() >= self.__opened + self.OPEN_DURATION else "open"
+
+    @property
+    def statistics(self) -> Dict[str, Any]:
+        return {"state": self.state, **self.__statistics}
+
+    def before(self) -> bool:
+        """Check that an access may proceed, return whether it is the trial access of a half-open breaker.
+
+        Raises
+        -----
+        `CircuitOpen`
+            The breaker is open.
+        """
+        if self.__opened is None:
+            return False
+
+        remaining = self.__opened + self.OPEN_DURATION - time.monotonic()
+        if remaining > 0 or self.__probing:
+            self.__statistics["rejected"] += 1
+            raise CircuitOpen(max(remaining, 1.0))
+
+        self.__probing = True
+        return True
+
+    def after(self, error: Optional[BaseException], *, probe: bool) -> None:
+        """Record the outcome of an access allowed by `.before()`."""
+        if probe:
+            self.__probing = False
+
+        if error is None or not self.is_failure(error):
+            # Only a response of the database proves that it is available, not e.g. a cancellation
+            if error is None or isinstance(error, pyodbc.Error):
+                if self.__opened is not None and probe:
+                    logger.info("Database circuit breaker closed")
+                    self.__opened = None
+
+                self.__failures = 0
+
+            return
+
+        self.__statistics["failures"] += 1
+        self.__failures += 1
+        if probe or (self.__opened is None and self.__failures >= self.THRESHOLD):
+            if self.__opened is None:
+                logger.warning(f"Database circuit breaker opened after {self.__failures} failures: {error!r}")
+                self.__statistics["opened"] += 1
+
+            self.__opened = time.monotonic()
+
+
+class _GuardedPool:
+    """Wraps the connection pool so that every access goes through the circuit breaker."""
+
+    __slots__ = ("__breaker", "__pool")
+    if TYPE_CHECKING:
+        __breaker: CircuitBreaker
+        __pool: aioodbc.Pool
+
+    def __init__(self, pool: aioodbc.Pool, breaker: CircuitBreaker) -> None:
+        self.__breaker = breaker
+        self.__pool = pool
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[aioodbc.Connection]:
+        breaker = self.__breaker
+        probe = breaker.before()
+        error: Optional[BaseException] = None
+        try:
+            async with asyncio.timeout(breaker.ACQUIRE_TIMEOUT):
+                connection = await self.__pool.acquire()
+
+            try:
+                yield connection
+            finally:
+                await self.__pool.release(connection)
+
+        except BaseException as e:
+            error = e
+            raise
+
+        finally:
+            breaker.after(error, probe=probe)
+
+
 class Database:
     """A database singleton that manages the connection pool."""
 
+    # Transient errors are retried with exponential backoff and full jitter, see `.execute()`
+    RETRY_ATTEMPTS: ClassVar[int] = 4
+    RETRY_DELAY: ClassVar[float] = 0.05
+    # Application lock (sp_getapplock) serializing the preparation of the schema
+    SCHEMA_LOCK: ClassVar[str] = "resident-manager-schema"
+
     instance: ClassVar[Database]
     __slots__ = (
+        "__breaker",
+        "__guarded",
         "__pool",
         "__prepared",
     )
     if TYPE_CHECKING:
+        __breaker: CircuitBreaker
+        __guarded: Optional[_GuardedPool]
         __pool: Optional[aioodbc.Pool]
         __prepared: bool
 
     def __init__(self) -> None:
+        self.__breaker = CircuitBreaker()
+        self.__guarded = None
         self.__pool = None
         self.__prepared = False
 
     @property
-    def pool(self) -> aioodbc.Pool:
-        """The underlying connection pool.
+    def breaker(self) -> CircuitBreaker:
+        """The circuit breaker of the connection pool."""
+        return self.__breaker
+
+    @property
+    def pool(self) -> _GuardedPool:
+        """The underlying connection pool, guarded by `.breaker`.
 
         In order to use this property, `.prepare()` must be called first.
         """
-        if self.__pool is None:
+        if self.__guarded is None:
             raise RuntimeError("Database is not connected. Did you call `.prepare()`?")
 
-        return self.__pool
+        return self.__guarded
+
+    @staticmethod
+    def is_transient(error: BaseException) -> bool:
+        """Whether `error` was raised by a statement that can be executed again as is."""
+        if not isinstance(error, pyodbc.Error) or len(error.args) < 2:
+            return False
+
+        # 1205: chosen as deadlock victim, whose transaction is rolled back. Not 1222 (lock request
+        # time out), which only aborts the statement and leaves the transaction open
+        return error.args[0] == "40001" or "(1205)" in str(error.args[1])
+
+    async def execute(self, cursor: aioodbc.Cursor, sql: str, *params: Any) -> None:
+        """This function is a coroutine.
+
+        Execute a statement, and execute it again after a short random delay when it fails with a
+        transient error, e.g. when SQL Server chooses it as a deadlock victim. Deadlock victims are
+        rolled back, so only use this for statements that run in a single transaction.
+        """
+        for attempt in range(self.RETRY_ATTEMPTS):
+            try:
+                await cursor.execute(sql, *params)
+                return
+
+            except pyodbc.Error as error:
+                if attempt + 1 == self.RETRY_ATTEMPTS or not self.is_transient(error):
+                    raise
+
+                logger.warning(f"Retrying statement after transient error: {error}")
+
+            # Full jitter: concurrent victims of the same deadlock do not collide again
+            await asyncio.sleep(random.uniform(0, self.RETRY_DELAY * 2 ** attempt))
 
     async def prepare(self) -> None:
         """This function is a coroutine.
 
         Prepare the underlying connection pool. If the pool is already created, this function does nothing.
+
+        The schema scripts (`.schema_files()`) are executed unless the database already records their
+        `.schema_key()`. Concurrent callers wait until the schema is prepared.
         """
         if self.__prepared:
             return
 
         self.__prepared = True
 
-        self.__pool = pool = await aioodbc.create_pool(
+        self.__pool = await aioodbc.create_pool(
             dsn=ODBC_CONNECTION_STRING,
             minsize=10,
             maxsize=100,
             autocommit=True,
         )
+        self.__guarded = _GuardedPool(self.__pool, self.__breaker)
 
-        lock_file = ROOT / "database.lock"
-        try:
-            fd = os.open(str(lock_file), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
-            os.close(fd)
-        except FileExistsError:
-            return
-        else:
-            atexit.register(lock_file.unlink, missing_ok=True)
+        await self.__prepare_schema()
+
+    @staticmethod
+    def schema_files() -> List[Path]:
+        """The scripts creating the schema, in execution order."""
+        scripts_dir = ROOT / "scripts"
+        # Migrations must be idempotent and are applied in lexicographical order
+        migrations = sorted(file for file in (scripts_dir / "migrations").iterdir() if file.suffix == ".sql")
+        procedures = sorted(file for file in (scripts_dir / "procedures").iterdir() if file.suffix == ".sql")
+        return [scripts_dir / "database.sql", *migrations, *procedures]
 
-        async with pool.acquire() as connection:
+    @classmethod
+    def schema_key(cls) -> int:
+        """A digest of the contents of `.schema_files()`, as a BIGINT."""
+        digest = hashlib.sha256()
+        for file in cls.schema_files():
+            digest.update(f"{file.relative_to(ROOT)}\0".encode("utf-8"))
+            digest.update(file.read_bytes())
+            digest.update(b"\0")
+
+        return int.from_bytes(digest.digest()[:8], "little", signed=True)
+
+    async def __prepare_schema(self) -> None:
+        assert self.__pool is not None
+        key = self.schema_key()
+
+        async with self.__pool.acquire() as connection:
             async with connection.cursor() as cursor:
+                # Workers (of any node) starting together wait for the first one to prepare the schema,
+                # then find its key and skip the scripts
+                await cursor.execute(f"EXECUTE sp_getapplock @Resource = '{self.SCHEMA_LOCK}', @LockMode = 'Exclusive', @LockOwner = 'Session', @LockTimeout = -1")
+                try:
+                    await cursor.execute("""
+                        SET NOCOUNT ON
+                        DECLARE @Key BIGINT
+                        IF OBJECT_ID('config_bigint', 'U') IS NOT NULL
+                            SELECT @Key = value FROM config_bigint WHERE name = 'schema_key'
+                        SELECT @Key
+                    """)
+                    if await cursor.fetchval() == key:
+                        return
+
+                    async def execute(file: Path, *args: Any) -> None:
+                        try:
+                            logger.info(f"Executing {file}")
+                            with file.open("r", encoding="utf-8") as sql:
+                                await cursor.execute(sql.read(), *args)
 
-                async def execute(file: Path, *args: Any) -> None:
-                    try:
-                        logger.info(f"Executing {file}")
-                        with file.open("r", encoding="utf-8") as sql:
-                            await cursor.execute(sql.read(), *args)
-
-                    except Exception as e:
-                        raise RuntimeError(f"Failed to execute {file}") from e
-
-                scripts_dir = ROOT / "scripts"
-                await execute(
-                    scripts_dir / "database.sql",
-                    DEFAULT_ADMIN_USERNAME,
-                    hash_password(DEFAULT_ADMIN_PASSWORD),
-                    secrets.token_hex(32),
-                    EPOCH,
-                )
-
-                procedures = scripts_dir / "procedures"
-                for file in procedures.iterdir():
-                    if file.suffix == ".sql":
+                        except Exception as e:
+                            raise RuntimeError(f"Failed to execute {file}") from e
+
+                    database, *files = self.schema_files()
+                    await execute(
+                        database,
+                        DEFAULT_ADMIN_USERNAME,
+                        hash_password(DEFAULT_ADMIN_PASSWORD),
+                        secrets.token_hex(32),
+                        EPOCH,
+                    )
+                    for file in files:
                         await execute(file)
 
+                    await cursor.execute(
+                        """
+                            UPDATE config_bigint SET value = ? WHERE name = 'schema_key'
+                            IF @@ROWCOUNT = 0
+                                INSERT INTO config_bigint (name, value) VALUES ('schema_key', ?)
+                        """,
+                        key,
+                        key,
+                    )
+
+                finally:
+                    await cursor.execute(f"EXECUTE sp_releaseapplock @Resource = '{self.SCHEMA_LOCK}', @LockOwner = 'Session'")
+
     async def close(self) -> None:
         if self.__pool is not None:
             logger.info("Closing database connection pool")
@@ -109,7 +342,7 @@ class Database:
             await self.__pool.wait_closed()
 
         self.__prepared = False
-        self.__pool = None
+        self.__guarded = self.__pool = None
 
 
 Database.instance = Database()
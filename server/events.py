@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import logging
+from typing import Any, Callable, ClassVar, Dict, List, TYPE_CHECKING
+
+
+__all__ = ("EventDispatcher",)
+logger = logging.getLogger("uvicorn")
+
+
+class EventDispatcher:
+    """A per-process singleton that delivers model-layer write events to registered listeners.
+
+    Listeners are plain (non-async) callables and are invoked synchronously in registration order,
+    so they must not block. An exception raised by a listener is logged and does not propagate
+    to the writer or to other listeners.
+    """
+
+    instance: ClassVar[EventDispatcher]
+    __slots__ = ("__listeners",)
+    if TYPE_CHECKING:
+        __listeners: Dict[str, List[Callable[..., Any]]]
+
+    def __init__(self) -> None:
+        self.__listeners = {}
+
+    def add_listener(self, event: str, callback: Callable[..., Any]) -> None:
+        """Register `callback` to be called whenever `event` is dispatched."""
+        self.__listeners.setdefault(event, []).append(callback)
+
+    def remove_listener(self, event: str, callback: Callable[..., Any]) -> None:
+        """Unregister a listener previously added with `.add_listener()`. Unknown listeners are ignored."""
+        try:
+            self.__listeners[event].remove(callback)
+        except (KeyError, ValueError):
+            pass
+
+    def dispatch(self, event: str, *args: Any) -> None:
+        """Call all listeners of `event` with the given arguments."""
+        for callback in tuple(self.__listeners.get(event, ())):
+            try:
+                callback(*args)
+            except Exception:
+                logger.exception(f"Exception in listener {callback!r} of event {event!r}")
+
+
+EventDispatcher.instance = EventDispatcher()
@@ -1,21 +1,24 @@
 from __future__ import annotations
 
-import hashlib
-import hmac
 import asyncio
 import logging
 import os
-import urllib.parse
 from collections import OrderedDict
 from contextlib import AsyncExitStack, asynccontextmanager
-from typing import AsyncGenerator, Dict, Optional
+from typing import Any, AsyncGenerator, Dict, Optional
 
 from fastapi import FastAPI, Request
 from pydantic import BaseModel
 from fastapi.responses import PlainTextResponse, RedirectResponse
 
-from .config import VNPAY_SECRET_KEY, VNPAY_TMN_CODE
-from .database import Database
+from .admission import AdmissionControl
+from .bus import InvalidationBus
+from .cache import ResponseCache, SingleFlight
+from .database import CircuitOpen, Database
+from .push import PushHub
+from .ratelimit import RateLimiter
+from .scheduler import Scheduler
+from .vnpay import InvalidSignature, VNPayGateway
 
 
 try:
@@ -31,7 +34,7 @@ else:
     asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
 
 from .config import CI
-from .v1 import api_v1
+from .v1 import IPNStore, api_v1
 
 
 __all__ = ("global_app",)
@@ -55,13 +58,24 @@ async def __lifespan(app: FastAPI) -> AsyncGenerator[None]:
 
     logger.info(f"[{os.getpid()}] Starting {app} from {__file__}")
     await Database.instance.prepare()
+    await InvalidationBus.instance.start()
+    await PushHub.instance.start()
+    RateLimiter.instance.start()
     async with AsyncExitStack() as stack:
         for subapp in subapps.values():
             await stack.enter_async_context(subapp.router.lifespan_context(subapp))
 
+        # Periodic jobs (see server/jobs.py) run on a single elected worker
+        Scheduler.instance.start()
+
         yield
 
+        await Scheduler.instance.stop()
+
     logger.info(f"[{os.getpid()}] Stopping {app} from {__file__}")
+    await PushHub.instance.stop()
+    await InvalidationBus.instance.stop()
+    RateLimiter.instance.stop()
     await Database.instance.close()
     if cov is not None:
         cov.stop()
@@ -78,6 +92,9 @@ global_app = FastAPI(
 for route, subapp in subapps.items():
     global_app.mount(route, subapp)
 
+global_app.add_middleware(AdmissionControl.instance.middleware)
+global_app.add_exception_handler(CircuitOpen, AdmissionControl.circuit_open)
+
 
 @global_app.get("/", include_in_schema=False)
 async def root() -> RedirectResponse:
@@ -109,6 +126,36 @@ async def headers(request: Request) -> Dict[str, str]:
     return dict(request.headers)
 
 
+@global_app.get("/ratelimit", include_in_schema=False)
+async def ratelimit() -> Dict[str, Dict[str, int]]:
+    """Return the number of allowed and rejected requests of each rate limited route on this node"""
+    return RateLimiter.instance.statistics
+
+
+@global_app.get("/admission", include_in_schema=False)
+async def admission() -> Dict[str, Any]:
+    """Return the state of the admission limits and of the database circuit breaker of this worker"""
+    return AdmissionControl.instance.statistics
+
+
+@global_app.get("/push", include_in_schema=False)
+async def push() -> Dict[str, int]:
+    """Return the number of connected clients and of published, broadcast, replayed and dropped events of this worker"""
+    return PushHub.instance.statistics
+
+
+@global_app.get("/single-flight", include_in_schema=False)
+async def single_flight() -> Dict[str, Dict[str, int]]:
+    """Return the number of calls, database queries, coalesced calls and cached results of each coalesced query of this worker"""
+    return SingleFlight.all_statistics()
+
+
+@global_app.get("/response-cache", include_in_schema=False)
+async def response_cache() -> Dict[str, int]:
+    """Return the size, hits, misses, evictions and invalidations of the response cache of this worker"""
+    return ResponseCache.instance.statistics
+
+
 @global_app.get("/docs", include_in_schema=False)
 async def docs() -> RedirectResponse:
     """Redirect to API documentation of latest version"""
@@ -128,22 +175,12 @@ class _VNPayResponse(BaseModel):
 
 @global_app.get("/ipn", include_in_schema=False)
 async def ipn(request: Request) -> _VNPayResponse:
-    params = dict(sorted(request.query_params.items()))
-
     # Validate request parameters
     try:
-        vnp_securehash = params.pop("vnp_SecureHash")
-        vnp_tmncode = params["vnp_TmnCode"]
+        params = VNPayGateway.instance.verify(request.query_params)
     except KeyError:
         return _VNPayResponse(RspCode="99", Message="Missing required fields")
-
-    data = "&".join(f"{k}={urllib.parse.quote_plus(str(v))}" for k, v in params.items())
-    expected_checksum = hmac.new(
-        VNPAY_SECRET_KEY.encode("utf-8"),
-        data.encode("utf-8"),
-        digestmod=hashlib.sha512,
-    ).hexdigest()
-    if VNPAY_TMN_CODE != vnp_tmncode or vnp_securehash != expected_checksum:
+    except InvalidSignature:
         return _VNPayResponse(RspCode="97", Message="Invalid signature")
 
     try:
@@ -162,19 +199,10 @@ async def ipn(request: Request) -> _VNPayResponse:
     if vnp_amount != normalized_amount:
         return _VNPayResponse(RspCode="04", Message="Invalid amount")
 
-    # Update database
+    # Update database, at most once per transaction (VNPay retries until it receives a response)
     if vnp_responsecode in {"00", "07"}:
-        async with Database.instance.pool.acquire() as connection:
-            async with connection.cursor() as cursor:
-                await cursor.execute(
-                    "EXECUTE CreatePayment @Room = ?, @Amount = ?, @FeeId = ?",
-                    room,
-                    normalized_amount,
-                    fee_id,
-                )
-
-                row = await cursor.fetchone()
-                if row is not None:
-                    return _VNPayResponse(RspCode=row.code, Message=row.message)
+        outcome = await IPNStore.instance.process(vnp_txnref, room=room, amount=normalized_amount / 100, fee_id=fee_id)
+        if outcome is not None:
+            return _VNPayResponse(RspCode=outcome[0], Message=outcome[1])
 
     return _VNPayResponse(RspCode="00", Message="Unknown state, payment may not be updated")
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+from .config import ARCHIVE_KEEP_YEARS, PUSH_EVENT_RETENTION, REGISTRATION_REQUEST_EXPIRY
+from .database import Database
+from .events import EventDispatcher
+from .scheduler import Scheduler
+
+
+__all__ = ()
+
+
+@Scheduler.instance.cron("0 19 * * *", name="update_statistics")  # 02:00 in Vietnam
+async def update_statistics() -> None:
+    # The hot procedures are compiled with OPTION (RECOMPILE) and rely on fresh statistics
+    async with Database.instance.pool.acquire() as connection:
+        async with connection.cursor() as cursor:
+            for table in ("accounts", "fees", "payments", "rooms"):
+                await cursor.execute(f"UPDATE STATISTICS {table}")
+
+
+@Scheduler.instance.cron("30 19 * * *", name="purge_ipn_outcomes")
+async def purge_ipn_outcomes() -> None:
+    # VNPay stops retrying a notification long before this, the outcomes are only kept for auditing
+    async with Database.instance.pool.acquire() as connection:
+        async with connection.cursor() as cursor:
+            while True:
+                await cursor.execute("""
+                    DELETE TOP (4096) FROM ipn_outcomes
+                    WHERE processed < DATEADD(DAY, -30, SYSUTCDATETIME())
+                """)
+                if cursor.rowcount < 4096:
+                    break
+
+
+@Scheduler.instance.cron("0 20 * * *", name="archive_fees")
+async def archive_fees() -> None:
+    # Fees of closed years are read-only, their rows are moved to the history tables in small batches
+    # so that the hot tables and their indexes stay bounded (see migration 0013)
+    before = datetime(datetime.now(timezone.utc).year - ARCHIVE_KEEP_YEARS, 1, 1, tzinfo=timezone.utc)
+    async with Database.instance.pool.acquire() as connection:
+        async with connection.cursor() as cursor:
+            while True:
+                await cursor.execute("EXECUTE ArchiveFees @Before = ?, @BatchSize = 4096", before)
+                if await cursor.fetchval() == 0:
+                    break
+
+
+@Scheduler.instance.cron("15 * * * *", name="purge_registration_requests")
+async def purge_registration_requests() -> None:
+    before = datetime.now(timezone.utc) - REGISTRATION_REQUEST_EXPIRY
+    purged = 0
+    async with Database.instance.pool.acquire() as connection:
+        async with connection.cursor() as cursor:
+            while True:
+                await cursor.execute("EXECUTE PurgeRegistrationRequests @Before = ?, @BatchSize = 4096", before)
+                deleted = await cursor.fetchval()
+                purged += deleted
+                if deleted < 4096:
+                    break
+
+    if purged > 0:
+        EventDispatcher.instance.dispatch("reg_requests_purge", purged)
+
+
+@Scheduler.instance.cron("45 * * * *", name="purge_push_events")
+async def purge_push_events() -> None:
+    # Older events are only useful to clients reconnecting after a long time, which reload their data anyway
+    before = datetime.now(timezone.utc) - PUSH_EVENT_RETENTION
+    async with Database.instance.pool.acquire() as connection:
+        async with connection.cursor() as cursor:
+            while True:
+                await cursor.execute("DELETE TOP (4096) FROM push_events WHERE created < ?", before)
+                if cursor.rowcount < 4096:
+                    break
+
+
+@Scheduler.instance.cron("50 * * * *", name="purge_account_changes")
+async def purge_account_changes() -> None:
+    # Workers read the changes of the others within a second, see ResidentIndex
+    before = datetime.now(timezone.utc) - timedelta(days=1)
+    async with Database.instance.pool.acquire() as connection:
+        async with connection.cursor() as cursor:
+            while True:
+                await cursor.execute("DELETE TOP (4096) FROM account_changes WHERE created < ?", before)
+                if cursor.rowcount < 4096:
+                    break
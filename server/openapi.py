@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Callable, ClassVar, Dict, TYPE_CHECKING
+
+import fastapi
+import pydantic
+from fastapi import FastAPI
+
+from .config import ROOT
+
+
+__all__ = ("OpenAPICache",)
+logger = logging.getLogger("uvicorn")
+
+
+class OpenAPICache:
+    """The OpenAPI schema of an application, built on first use and cached on disk.
+
+    Install an instance as `app.openapi`. The description (e.g. the README) is only read when the
+    schema is built. The schema is saved in `DIRECTORY`, keyed by the sources of the server and the
+    versions of FastAPI and pydantic, so that the other workers, and later processes running the
+    same code, load it instead of building it again.
+    """
+
+    DIRECTORY: ClassVar[Path] = ROOT / ".openapi"
+
+    __slots__ = (
+        "__app",
+        "__description",
+        "__name",
+    )
+    if TYPE_CHECKING:
+        __app: FastAPI
+        __description: Callable[[], str]
+        __name: str
+
+    def __init__(self, app: FastAPI, *, name: str, description: Callable[[], str]) -> None:
+        self.__app = app
+        self.__description = description
+        self.__name = name
+
+    @staticmethod
+    def key() -> str:
+        """A digest of the sources and the libraries the schema depends on."""
+        digest = hashlib.sha256(f"{fastapi.__version__}\0{pydantic.VERSION}".encode("utf-8"))
+        paths = sorted((ROOT / "server").rglob("*.py"))
+        paths.append(ROOT / "README.md")
+        for path in paths:
+            stat = path.stat()
+            digest.update(f"\0{path.relative_to(ROOT)}\0{stat.st_mtime_ns}\0{stat.st_size}".encode("utf-8"))
+
+        return digest.hexdigest()[:16]
+
+    def __load(self, path: Path) -> Dict[str, Any]:
+        try:
+            with path.open("r", encoding="utf-8") as f:
+                return json.load(f)
+
+        except (OSError, ValueError):
+            pass
+
+        self.__app.description = self.__description()
+        schema = FastAPI.openapi(self.__app)
+
+        try:
+            self.DIRECTORY.mkdir(parents=True, exist_ok=True)
+            for stale in self.DIRECTORY.glob(f"{self.__name}-*.json"):
+                stale.unlink(missing_ok=True)
+
+            # Concurrent workers may build the schema together, the last one replaces the others
+            temporary = path.with_suffix(f".{os.getpid()}.tmp")
+            with temporary.open("w", encoding="utf-8") as f:
+                json.dump(schema, f, ensure_ascii=False)
+
+            os.replace(temporary, path)
+
+        except OSError:
+            logger.exception(f"Unable to cache the OpenAPI schema at {path}")
+
+        return schema
+
+    def __call__(self) -> Dict[str, Any]:
+        if self.__app.openapi_schema is None:
+            self.__app.openapi_schema = self.__load(self.DIRECTORY / f"{self.__name}-{self.key()}.json")
+
+        return self.__app.openapi_schema
@@ -0,0 +1,277 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, ClassVar, Dict, IO, List, Optional, Tuple, TYPE_CHECKING
+
+from .config import ROOT
+
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows, outboxes are disabled
+    fcntl = None  # type: ignore
+
+
+__all__ = ("DurableOutbox",)
+logger = logging.getLogger("uvicorn")
+
+
+class DurableOutbox:
+    """A per-worker durable queue of JSON-serializable items, applied in batches in the background.
+
+    `.append()` writes an item to the current segment file of this worker and returns once the file
+    is synced to disk. Appends arriving together share a single write and `fsync` (group commit).
+    Every `FLUSH_INTERVAL` seconds, or as soon as `BATCH_SIZE` items are pending, a background writer
+    seals the current segment, passes its items to `apply` and deletes it once `apply` returns. When
+    `apply` raises, the sealed segments are kept and retried with an exponential backoff.
+
+    Every segment is held under an exclusive file lock by its worker. Segments left behind by a dead
+    worker are no longer locked, and are adopted by the next worker scanning the directory (every
+    `SCAN_INTERVAL` seconds), so an item may be applied more than once: `apply` must be idempotent.
+    """
+
+    DIRECTORY: ClassVar[Path] = ROOT / ".outbox"
+    FLUSH_INTERVAL: ClassVar[float] = 0.1
+    BATCH_SIZE: ClassVar[int] = 2000
+    SCAN_INTERVAL: ClassVar[float] = 30.0
+    RETRY_DELAY: ClassVar[float] = 1.0
+    MAX_RETRY_DELAY: ClassVar[float] = 30.0
+
+    __slots__ = (
+        "__apply",
+        "__buffer",
+        "__flusher",
+        "__lock",
+        "__name",
+        "__pending",
+        "__sealed",
+        "__segment",
+        "__sequence",
+        "__statistics",
+        "__wakeup",
+        "__writer",
+    )
+    if TYPE_CHECKING:
+        __apply: Callable[[List[Any]], Awaitable[None]]
+        __buffer: List[Tuple[bytes, Any, asyncio.Future[None]]]
+        __flusher: Optional[asyncio.Task[None]]
+        __lock: asyncio.Lock
+        __name: str
+        __pending: List[Any]
+        __sealed: List[Tuple[Path, IO[bytes], List[Any]]]
+        __segment: Optional[Tuple[Path, IO[bytes]]]
+        __sequence: int
+        __statistics: Dict[str, int]
+        __wakeup: asyncio.Event
+        __writer: Optional[asyncio.Task[None]]
+
+    def __init__(self, name: str, apply: Callable[[List[Any]], Awaitable[None]]) -> None:
+        self.__apply = apply
+        self.__buffer = []
+        self.__flusher = None
+        self.__lock = asyncio.Lock()
+        self.__name = name
+        self.__pending = []
+        self.__sealed = []
+        self.__segment = None
+        self.__sequence = 0
+        self.__statistics = {"appended": 0, "applied": 0, "adopted": 0, "failures": 0}
+        self.__wakeup = asyncio.Event()
+        self.__writer = None
+
+    @property
+    def started(self) -> bool:
+        """Whether `.append()` is available in this worker."""
+        return self.__writer is not None
+
+    @property
+    def statistics(self) -> Dict[str, int]:
+        """Item counters of this worker: appended, applied (including adopted ones), adopted and failed `apply` calls."""
+        return dict(self.__statistics)
+
+    def __open(self) -> None:
+        assert fcntl is not None
+        self.__sequence += 1
+        path = self.DIRECTORY / f"{self.__name}-{os.getpid()}-{self.__sequence}.ndjson"
+        file = open(path, "ab")
+        fcntl.flock(file, fcntl.LOCK_EX)
+        self.__segment = path, file
+
+    def __seal(self) -> None:
+        if self.__segment is not None and len(self.__pending) > 0:
+            path, file = self.__segment
+            self.__sealed.append((path, file, self.__pending))
+            self.__pending = []
+            self.__open()
+
+    def __adopt(self) -> None:
+        assert fcntl is not None
+        for path in sorted(self.DIRECTORY.glob(f"{self.__name}-*.ndjson")):
+            try:
+                file = open(path, "rb")
+            except FileNotFoundError:
+                continue
+
+            # Fails for segments of live workers, including this one
+            try:
+                fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                file.close()
+                continue
+
+            items = []
+            for line in file:
+                try:
+                    items.append(json.loads(line))
+                except ValueError:
+                    pass  # Torn write of a crashed worker, which was never acknowledged
+
+            logger.info(f"[{os.getpid()}] Adopted {len(items)} item(s) from {path.name}")
+            self.__statistics["adopted"] += len(items)
+            self.__sealed.append((path, file, items))
+
+    async def append(self, item: Any) -> None:
+        """This function is a coroutine.
+
+        Append an item to the outbox, and return once it is durably written.
+
+        Raises
+        -----
+        `RuntimeError`
+            The outbox is not started in this worker.
+        `OSError`
+            The item could not be written.
+        """
+        if self.__writer is None:
+            raise RuntimeError(f"Outbox {self.__name!r} is not started")
+
+        future = asyncio.get_running_loop().create_future()
+        self.__buffer.append((json.dumps(item).encode("utf-8") + b"\n", item, future))
+        if self.__flusher is None:
+            self.__flusher = asyncio.create_task(self.__flush())
+
+        # A cancelled caller must not cancel the write shared with other callers
+        await asyncio.shield(future)
+
+    async def __flush(self) -> None:
+        try:
+            async with self.__lock:
+                while len(self.__buffer) > 0:
+                    buffer, self.__buffer = self.__buffer, []
+                    assert self.__segment is not None
+                    _, file = self.__segment
+                    try:
+                        file.write(b"".join(line for line, _, _ in buffer))
+                        file.flush()
+                        await asyncio.to_thread(os.fsync, file.fileno())
+                    except Exception as error:
+                        for _, _, future in buffer:
+                            future.set_exception(error)
+
+                        continue
+
+                    self.__pending.extend(item for _, item, _ in buffer)
+                    self.__statistics["appended"] += len(buffer)
+                    for _, _, future in buffer:
+                        future.set_result(None)
+
+                    if len(self.__pending) >= self.BATCH_SIZE:
+                        self.__wakeup.set()
+
+        finally:
+            self.__flusher = None
+
+    async def __drain(self) -> None:
+        while len(self.__sealed) > 0:
+            path, file, items = self.__sealed[0]
+            if len(items) > 0:
+                await self.__apply(items)
+
+            self.__sealed.pop(0)
+            self.__statistics["applied"] += len(items)
+
+            # Unlink while still holding the lock, so that no other worker adopts the segment again
+            path.unlink(missing_ok=True)
+            file.close()
+
+    async def __run(self) -> None:
+        backoff: Optional[float] = None
+        scan = time.monotonic() + self.SCAN_INTERVAL
+        while True:
+            try:
+                await asyncio.wait_for(self.__wakeup.wait(), backoff or self.FLUSH_INTERVAL)
+            except TimeoutError:
+                pass
+
+            self.__wakeup.clear()
+            async with self.__lock:
+                self.__seal()
+
+            if time.monotonic() >= scan:
+                scan = time.monotonic() + self.SCAN_INTERVAL
+                self.__adopt()
+
+            try:
+                await self.__drain()
+            except Exception:
+                backoff = min(2 * backoff, self.MAX_RETRY_DELAY) if backoff is not None else self.RETRY_DELAY
+                self.__statistics["failures"] += 1
+                logger.exception(f"Unable to apply outbox {self.__name!r}, retrying in {backoff}s")
+            else:
+                backoff = None
+
+    async def start(self) -> None:
+        """This function is a coroutine.
+
+        Open a segment for this worker and adopt the segments left behind by dead workers.
+        If file locks are not supported, the outbox is not started.
+        """
+        if fcntl is None or self.__writer is not None:
+            return
+
+        self.DIRECTORY.mkdir(parents=True, exist_ok=True)
+        self.__open()
+        self.__adopt()
+        self.__writer = asyncio.create_task(self.__run())
+
+    async def stop(self) -> None:
+        """This function is a coroutine.
+
+        Stop accepting items and try to apply the pending ones. Segments that could not be applied
+        are kept on disk, for this worker or another one to adopt them at their next start.
+        """
+        writer, self.__writer = self.__writer, None
+        if writer is None:
+            return
+
+        writer.cancel()
+        try:
+            await writer
+        except asyncio.CancelledError:
+            pass
+
+        if self.__flusher is not None:
+            await self.__flusher
+
+        self.__seal()
+        try:
+            await self.__drain()
+        except Exception:
+            logger.exception(f"Unable to apply outbox {self.__name!r}, {len(self.__sealed)} segment(s) left on disk")
+
+        for _, file, _ in self.__sealed:
+            file.close()
+
+        self.__sealed.clear()
+        if self.__segment is not None:
+            path, file = self.__segment
+            path.unlink(missing_ok=True)  # Empty after sealing
+            file.close()
+            self.__segment = None
+
+        logger.info(f"Outbox {self.__name!r}: {self.statistics}")
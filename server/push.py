@@ -0,0 +1,309 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from typing import Any, AsyncIterator, Callable, ClassVar, Dict, List, Optional, Set, Tuple, TYPE_CHECKING
+
+from .bus import InvalidationBus
+from .database import Database
+from .events import EventDispatcher
+
+
+__all__ = ("PushHub",)
+logger = logging.getLogger("uvicorn")
+
+
+class _Client:
+
+    __slots__ = ("queue", "room")
+    if TYPE_CHECKING:
+        queue: asyncio.Queue[Optional[Tuple[int, bytes]]]
+        room: Optional[int]
+
+    def __init__(self, room: Optional[int], size: int) -> None:
+        self.queue = asyncio.Queue(size)
+        self.room = room
+
+
+class PushHub:
+    """A per-process singleton pushing model-layer events to connected clients as Server-Sent Events.
+
+    The write events of `EVENTS` dispatched through `EventDispatcher` are inserted in the
+    `push_events` table, in batches, by the worker that dispatched them. The insert is announced to
+    the other workers through `InvalidationBus`. Every worker then reads the new rows in id order and
+    broadcasts each of them, serialized once, to its connected clients. Clients reconnecting with the
+    `Last-Event-ID` header receive the events they missed, from any worker.
+
+    Admin clients receive every event. Resident clients only receive the events of their room.
+    A client whose queue is full (i.e. not reading its stream) is disconnected, and resumes from its
+    last event when it reconnects. A `reset` event tells a client that some events could not be
+    replayed and that it must reload its data.
+    """
+
+    # Dispatched event, pushed event, room and data of the pushed event
+    EVENTS: ClassVar[Dict[str, Tuple[str, Callable[..., Tuple[Optional[int], Dict[str, Any]]]]]] = {
+        "payment_create": (
+            "payment",
+            lambda room, fee_id, amount: (room, {"room": room, "fee_id": fee_id, "amount": amount}),
+        ),
+        "reg_request_create": (
+            "registration_request",
+            lambda request: (None, {"id": request.id, "room": request.room}),
+        ),
+        "reg_requests_reject": (
+            "registration_rejection",
+            lambda ids: (None, {"ids": list(ids)}),
+        ),
+        "residents_approve": (
+            "registration_approval",
+            lambda residents: (None, {"ids": [resident.id for resident in residents]}),
+        ),
+    }
+    # A comment is sent after this many idle seconds, so that proxies keep the connection open
+    HEARTBEAT: ClassVar[float] = 15.0
+    # Delay before a disconnected client reconnects, sent as the `retry` field of the stream
+    RECONNECT_DELAY: ClassVar[float] = 1.0
+    # Maximum number of connected clients per worker
+    MAX_CLIENTS: ClassVar[int] = 2000
+    # Maximum number of events waiting to be sent to a client
+    QUEUE_SIZE: ClassVar[int] = 256
+    # Maximum number of missed events replayed to a reconnecting client
+    REPLAY_LIMIT: ClassVar[int] = 1000
+    # Rows per INSERT (3 parameters each) and per SELECT
+    BATCH_SIZE: ClassVar[int] = 500
+
+    instance: ClassVar[PushHub]
+    __slots__ = (
+        "__clients",
+        "__fetcher",
+        "__last",
+        "__pending",
+        "__refetch",
+        "__started",
+        "__statistics",
+        "__writer",
+    )
+    if TYPE_CHECKING:
+        __clients: Set[_Client]
+        __fetcher: Optional[asyncio.Task[None]]
+        __last: int
+        __pending: List[Tuple[str, Optional[int], str]]
+        __refetch: bool
+        __started: bool
+        __statistics: Dict[str, int]
+        __writer: Optional[asyncio.Task[None]]
+
+    def __init__(self) -> None:
+        self.__clients = set()
+        self.__fetcher = None
+        self.__last = 0
+        self.__pending = []
+        self.__refetch = False
+        self.__started = False
+        self.__statistics = {"published": 0, "broadcast": 0, "replayed": 0, "dropped": 0, "rejected": 0}
+        self.__writer = None
+
+        for event, (name, payload) in self.EVENTS.items():
+            EventDispatcher.instance.add_listener(event, self.__event_listener(name, payload))
+
+    def __event_listener(self, name: str, payload: Callable[..., Tuple[Optional[int], Dict[str, Any]]]) -> Callable[..., None]:
+        def listener(*args: Any) -> None:
+            if self.__started:
+                room, data = payload(*args)
+                self.__pending.append((name, room, json.dumps(data, ensure_ascii=False, separators=(",", ":"))))
+                if self.__writer is None:
+                    self.__writer = asyncio.create_task(self.__write())
+
+        return listener
+
+    @property
+    def statistics(self) -> Dict[str, int]:
+        return {"clients": len(self.__clients), "last": self.__last, **self.__statistics}
+
+    @staticmethod
+    def frame(id: int, event: str, data: str) -> bytes:
+        """Serialize an event in the `text/event-stream` format. `data` must not contain line breaks."""
+        return f"id: {id}\nevent: {event}\ndata: {data}\n\n".encode("utf-8")
+
+    async def __write(self) -> None:
+        try:
+            while len(self.__pending) > 0:
+                batch = self.__pending[:self.BATCH_SIZE]
+                del self.__pending[:self.BATCH_SIZE]
+
+                values = ", ".join("(?, ?, ?, SYSUTCDATETIME())" for _ in batch)
+                async with Database.instance.pool.acquire() as connection:
+                    async with connection.cursor() as cursor:
+                        # The exclusive lock commits ids in order, see migration 0015
+                        await cursor.execute(
+                            f"INSERT INTO push_events WITH (TABLOCKX) (event, room, data, created) VALUES {values}",
+                            *[param for row in batch for param in row],
+                        )
+
+                self.__statistics["published"] += len(batch)
+                InvalidationBus.instance.publish("push_events")
+                self.__fetch()
+
+        except Exception:
+            logger.exception("Unable to publish pushed events")
+
+        finally:
+            self.__writer = None
+
+    def __fetch(self, *_: Any) -> None:
+        if self.__fetcher is None:
+            self.__fetcher = asyncio.create_task(self.__read())
+        else:
+            self.__refetch = True
+
+    async def __read(self) -> None:
+        try:
+            self.__refetch = True
+            while self.__refetch:
+                self.__refetch = False
+                while True:
+                    rows = await self.__query(self.__last, self.BATCH_SIZE)
+                    for id, event, room, data in rows:
+                        self.__last = id
+                        self.__broadcast(room, id, self.frame(id, event, data))
+
+                    if len(rows) < self.BATCH_SIZE:
+                        break
+
+        except Exception:
+            logger.exception("Unable to read pushed events")
+
+        finally:
+            self.__fetcher = None
+
+    @staticmethod
+    async def __query(after: int, limit: int, *, room: Optional[int] = None) -> List[Tuple[int, str, Optional[int], str]]:
+        async with Database.instance.pool.acquire() as connection:
+            async with connection.cursor() as cursor:
+                await cursor.execute(
+                    """
+                        SELECT TOP (?) id, event, room, data
+                        FROM push_events
+                        WHERE id > ? AND (? IS NULL OR room = ?)
+                        ORDER BY id
+                    """,
+                    limit,
+                    after,
+                    room,
+                    room,
+                )
+                return [(row.id, row.event, row.room, row.data) for row in await cursor.fetchall()]
+
+    def __broadcast(self, room: Optional[int], id: int, frame: bytes) -> None:
+        self.__statistics["broadcast"] += 1
+        for client in tuple(self.__clients):
+            if client.room is None or client.room == room:
+                try:
+                    client.queue.put_nowait((id, frame))
+                except asyncio.QueueFull:
+                    self.__statistics["dropped"] += 1
+                    self.__close(client)
+
+    def __close(self, client: _Client) -> None:
+        self.__clients.discard(client)
+
+        # Make room for the end of stream marker
+        while not client.queue.empty():
+            client.queue.get_nowait()
+
+        client.queue.put_nowait(None)
+
+    def accepts(self) -> bool:
+        """Whether this worker can serve another client, see `MAX_CLIENTS`."""
+        if len(self.__clients) < self.MAX_CLIENTS:
+            return True
+
+        self.__statistics["rejected"] += 1
+        return False
+
+    async def stream(self, *, room: Optional[int], last_event_id: Optional[int]) -> AsyncIterator[bytes]:
+        """Generate the `text/event-stream` body of a client.
+
+        Parameters
+        -----
+        room: `Optional[int]`
+            The room of a resident client, or `None` for an admin client receiving every event.
+        last_event_id: `Optional[int]`
+            The `Last-Event-ID` header of a reconnecting client.
+        """
+        client = _Client(room, self.QUEUE_SIZE)
+        self.__clients.add(client)
+        try:
+            yield f"retry: {int(self.RECONNECT_DELAY * 1000)}\n\n".encode("utf-8")
+
+            # Events received from now on are queued, replay the previous ones first
+            replayed = self.__last
+            if last_event_id is not None:
+                replayed = last_event_id
+                rows = await self.__query(last_event_id, self.REPLAY_LIMIT, room=room)
+                for id, event, _, data in rows:
+                    replayed = id
+                    self.__statistics["replayed"] += 1
+                    yield self.frame(id, event, data)
+
+                # Some events were not replayed, the client must reload its data
+                if len(rows) == self.REPLAY_LIMIT:
+                    replayed = max(replayed, self.__last)
+                    yield self.frame(replayed, "reset", "{}")
+
+            while True:
+                try:
+                    item = await asyncio.wait_for(client.queue.get(), self.HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield b": keep-alive\n\n"
+                    continue
+
+                if item is None:
+                    return
+
+                id, frame = item
+                if id > replayed:
+                    yield frame
+
+        finally:
+            self.__clients.discard(client)
+
+    async def start(self) -> None:
+        """This function is a coroutine.
+
+        Start publishing the events of this worker and receiving the events of the other workers.
+        """
+        if self.__started:
+            return
+
+        async with Database.instance.pool.acquire() as connection:
+            async with connection.cursor() as cursor:
+                await cursor.execute("SELECT ISNULL(MAX(id), 0) FROM push_events")
+                self.__last = await cursor.fetchval()
+
+        InvalidationBus.instance.subscribe("push_events", self.__fetch, local=False)
+        self.__started = True
+
+    async def stop(self) -> None:
+        """This function is a coroutine.
+
+        Publish the pending events and end the streams of the connected clients.
+
+        The server only runs the lifespan shutdown, hence this function, once its open connections
+        are closed: it must be started with `timeout_graceful_shutdown`, so that it cancels the
+        streams after that many seconds instead of waiting for clients to disconnect.
+        """
+        if not self.__started:
+            return
+
+        self.__started = False
+        InvalidationBus.instance.unsubscribe("push_events", self.__fetch)
+        if self.__writer is not None:
+            await self.__writer
+
+        for client in tuple(self.__clients):
+            self.__close(client)
+
+
+PushHub.instance = PushHub()
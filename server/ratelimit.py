@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import hashlib
+import math
+import os
+import struct
+import tempfile
+import time
+import zlib
+from multiprocessing import shared_memory
+from typing import Any, Awaitable, Callable, ClassVar, Dict, IO, Optional, TYPE_CHECKING
+
+from fastapi import HTTPException, Request, status
+
+from .catalog import _PREFIX, _attach, _create
+from .config import RATE_LIMITING, RATE_LIMITS
+
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows, rate limiting is disabled
+    fcntl = None  # type: ignore
+
+
+__all__ = ("RateLimiter",)
+
+
+class RateLimiter:
+    """A per-process singleton limiting the request rate of each client, shared by all workers of a node.
+
+    Each route in `RATE_LIMITS` has a `(rate, burst)` token bucket per client IP (the `x-client-ip`
+    header set by Azure) and per username: a bucket holds up to `burst` tokens, refilled at `rate`
+    tokens per second, and every request takes one token. Requests finding an empty bucket are
+    rejected with `429 Too Many Requests` and a `Retry-After` header.
+
+    The buckets live in a `multiprocessing.shared_memory` segment organized as a set-associative
+    table: a key is hashed to a group of `WAYS` slots, and a new key replaces the least recently
+    updated slot of its group, i.e. the bucket most likely to be full again. A group is updated under
+    a POSIX byte-range lock on one of `STRIPES` bytes of a lock file, so that workers only contend
+    when updating the same stripe, for a few microseconds.
+
+    Each stripe also holds the number of allowed and rejected requests per route, summed by
+    `.statistics`. When `RATE_LIMITING` is disabled, the limiter is never started and allows every
+    request.
+    """
+
+    # key hash, tokens, last update (time.monotonic(), shared by the processes of a node)
+    SLOT: ClassVar[struct.Struct] = struct.Struct("<Qdd")
+    COUNTER: ClassVar[struct.Struct] = struct.Struct("<Q")
+    GROUPS: ClassVar[int] = 16384
+    WAYS: ClassVar[int] = 8
+    STRIPES: ClassVar[int] = 64
+
+    instance: ClassVar[RateLimiter]
+    __slots__ = (
+        "__lock",
+        "__name",
+        "__routes",
+        "__segment",
+    )
+    if TYPE_CHECKING:
+        __lock: Optional[IO[Any]]
+        __name: str
+        __routes: Dict[str, int]
+        __segment: Optional[shared_memory.SharedMemory]
+
+    def __init__(self) -> None:
+        self.__lock = None
+        # The layout of the segment depends on these, a new configuration uses a new segment
+        routes = ",".join(sorted(RATE_LIMITS))
+        self.__name = f"{_PREFIX}-ratelimit-{self.GROUPS}x{self.WAYS}-{zlib.crc32(routes.encode('utf-8')):08x}"
+        self.__routes = {route: index for index, route in enumerate(sorted(RATE_LIMITS))}
+        self.__segment = None
+
+    @staticmethod
+    def client_ip(request: Request) -> str:
+        # Azure headers containing client IP address
+        ip = request.headers.get("x-client-ip")
+        if ip is None and request.client is not None:
+            ip = request.client.host
+
+        return ip or "0.0.0.0"
+
+    @staticmethod
+    async def form_username(request: Request) -> Optional[str]:
+        """The username of an OAuth2 password form. Starlette caches the parsed form for the endpoint."""
+        username = (await request.form()).get("username")
+        return username if isinstance(username, str) else None
+
+    @staticmethod
+    async def header_username(request: Request) -> Optional[str]:
+        """The username of the `username` header, see `/register`."""
+        return request.headers.get("username")
+
+    @property
+    def __counters_offset(self) -> int:
+        return self.GROUPS * self.WAYS * self.SLOT.size
+
+    def __counter_offset(self, stripe: int, route: int, rejected: bool) -> int:
+        return self.__counters_offset + ((stripe * len(self.__routes) + route) * 2 + rejected) * self.COUNTER.size
+
+    def start(self) -> None:
+        """Attach to the buckets of this node, creating them if this is the first worker."""
+        if fcntl is None or not RATE_LIMITING or self.__segment is not None:
+            return
+
+        lock = open(os.path.join(tempfile.gettempdir(), f"{self.__name}.lock"), "a+")
+        size = self.__counters_offset + self.STRIPES * len(self.__routes) * 2 * self.COUNTER.size
+
+        # Serialize the creation of the segment with the whole-file lock
+        fcntl.lockf(lock, fcntl.LOCK_EX)
+        try:
+            self.__segment = _attach(self.__name) or _create(self.__name, size)
+        finally:
+            fcntl.lockf(lock, fcntl.LOCK_UN)
+
+        self.__lock = lock
+
+    def stop(self) -> None:
+        """Detach from the buckets. The shared segment is kept for other workers."""
+        if self.__segment is not None:
+            self.__segment.close()
+            self.__segment = None
+
+        if self.__lock is not None:
+            self.__lock.close()
+            self.__lock = None
+
+    def acquire(self, route: str, key: str) -> float:
+        """Take a token from the bucket of `key` for `route`.
+
+        Returns
+        -----
+        `float`
+            0 if the request is allowed, otherwise the number of seconds until a token is available.
+        """
+        segment = self.__segment
+        lock = self.__lock
+        if segment is None or lock is None or fcntl is None:
+            return 0.0
+
+        rate, burst = RATE_LIMITS[route]
+        digest = hashlib.blake2b(f"{route}\0{key}".encode("utf-8"), digest_size=8).digest()
+        hashed = int.from_bytes(digest, "little") | 1  # 0 marks an empty slot
+        group = hashed % self.GROUPS
+        stripe = group % self.STRIPES
+
+        buf = segment.buf
+        base = group * self.WAYS * self.SLOT.size
+        now = time.monotonic()
+
+        fcntl.lockf(lock, fcntl.LOCK_EX, 1, stripe)
+        try:
+            offset = victim = base
+            victim_updated = math.inf
+            tokens = float(burst)
+            for way in range(self.WAYS):
+                offset = base + way * self.SLOT.size
+                slot_hash, slot_tokens, slot_updated = self.SLOT.unpack_from(buf, offset)
+                if slot_hash == hashed:
+                    tokens = min(float(burst), slot_tokens + (now - slot_updated) * rate)
+                    victim = offset
+                    break
+
+                if slot_updated < victim_updated:
+                    victim, victim_updated = offset, slot_updated
+
+            wait = 0.0 if tokens >= 1.0 else (1.0 - tokens) / rate
+            if wait == 0.0:
+                tokens -= 1.0
+
+            self.SLOT.pack_into(buf, victim, hashed, tokens, now)
+
+            counter = self.__counter_offset(stripe, self.__routes[route], wait > 0.0)
+            self.COUNTER.pack_into(buf, counter, self.COUNTER.unpack_from(buf, counter)[0] + 1)
+
+        finally:
+            fcntl.lockf(lock, fcntl.LOCK_UN, 1, stripe)
+
+        return wait
+
+    def limit(
+        self,
+        route: str,
+        *,
+        username: Optional[Callable[[Request], Awaitable[Optional[str]]]] = None,
+    ) -> Callable[[Request], Awaitable[None]]:
+        """Create a dependency rejecting the requests of clients exceeding the limit of `route`.
+
+        Use it in the `dependencies` of the route decorator: FastAPI solves them before the parameters
+        of the endpoint, hence before any database access.
+        """
+        if route not in RATE_LIMITS:
+            raise ValueError(f"No rate limit configured for {route!r}")
+
+        async def dependency(request: Request) -> None:
+            wait = self.acquire(route, f"ip:{self.client_ip(request)}")
+            if wait == 0.0 and username is not None:
+                name = await username(request)
+                if name is not None:
+                    wait = self.acquire(route, f"username:{name}")
+
+            if wait > 0.0:
+                raise HTTPException(
+                    status.HTTP_429_TOO_MANY_REQUESTS,
+                    headers={"Retry-After": str(math.ceil(wait))},
+                )
+
+        return dependency
+
+    @property
+    def statistics(self) -> Dict[str, Dict[str, int]]:
+        """The number of allowed and rejected requests per route, across all workers of this node."""
+        result = {route: {"allowed": 0, "rejected": 0} for route in self.__routes}
+        segment = self.__segment
+        if segment is None:
+            return result
+
+        for route, index in self.__routes.items():
+            for stripe in range(self.STRIPES):
+                for rejected, field in ((False, "allowed"), (True, "rejected")):
+                    counter = self.__counter_offset(stripe, index, rejected)
+                    result[route][field] += self.COUNTER.unpack_from(segment.buf, counter)[0]
+
+        return result
+
+
+RateLimiter.instance = RateLimiter()
@@ -0,0 +1,456 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import socket
+import time
+import traceback
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, ClassVar, Dict, FrozenSet, List, Optional, Set, TYPE_CHECKING
+
+import aioodbc  # type: ignore
+
+from .config import ODBC_CONNECTION_STRING
+from .database import Database
+
+
+__all__ = ("CronSchedule", "Job", "Scheduler")
+logger = logging.getLogger("uvicorn")
+
+
+class CronSchedule:
+    """A cron-style schedule in UTC with the 5 standard fields: minute, hour, day of month, month
+    and day of week (0 or 7 is Sunday).
+
+    Each field accepts `*`, numbers, ranges `a-b`, steps `*/n` or `a-b/n`, and comma-separated lists
+    of these. As in cron, when both the day of month and the day of week are restricted, a day
+    matching either of them is accepted.
+    """
+
+    __slots__ = (
+        "__days",
+        "__expression",
+        "__hours",
+        "__minutes",
+        "__months",
+        "__weekdays",
+        "__any_day",
+        "__any_weekday",
+    )
+    if TYPE_CHECKING:
+        __days: FrozenSet[int]
+        __expression: str
+        __hours: List[int]
+        __minutes: List[int]
+        __months: FrozenSet[int]
+        __weekdays: FrozenSet[int]
+        __any_day: bool
+        __any_weekday: bool
+
+    def __init__(self, expression: str) -> None:
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Expected 5 fields in cron expression {expression!r}")
+
+        self.__expression = expression
+        self.__minutes = sorted(self.__parse(fields[0], 0, 59))
+        self.__hours = sorted(self.__parse(fields[1], 0, 23))
+        self.__days = frozenset(self.__parse(fields[2], 1, 31))
+        self.__months = frozenset(self.__parse(fields[3], 1, 12))
+        self.__weekdays = frozenset(d % 7 for d in self.__parse(fields[4], 0, 7))
+        self.__any_day = fields[2] == "*"
+        self.__any_weekday = fields[4] == "*"
+
+    def __repr__(self) -> str:
+        return f"<CronSchedule {self.__expression!r}>"
+
+    @staticmethod
+    def __parse(field: str, lower: int, upper: int) -> FrozenSet[int]:
+        values: Set[int] = set()
+        for part in field.split(","):
+            spec, _, step_text = part.partition("/")
+            step = int(step_text) if step_text else 1
+            if spec == "*":
+                start, stop = lower, upper
+            elif "-" in spec:
+                start, stop = map(int, spec.split("-", 1))
+            else:
+                start = stop = int(spec)
+                if step_text:
+                    stop = upper
+
+            if step < 1 or start < lower or stop > upper or start > stop:
+                raise ValueError(f"Invalid cron field {field!r}")
+
+            values.update(range(start, stop + 1, step))
+
+        return frozenset(values)
+
+    def __day_matches(self, day: datetime) -> bool:
+        if day.month not in self.__months:
+            return False
+
+        in_days = day.day in self.__days
+        in_weekdays = day.isoweekday() % 7 in self.__weekdays
+        if self.__any_day or self.__any_weekday:
+            return in_days and in_weekdays
+
+        return in_days or in_weekdays
+
+    def next(self, after: datetime) -> datetime:
+        """Return the first time matching this schedule strictly after `after` (an aware datetime)."""
+        start = after.astimezone(timezone.utc).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        day = start.replace(hour=0, minute=0)
+
+        # Every valid expression fires at least once in 8 years (e.g. February 29th)
+        for _ in range(8 * 366):
+            if self.__day_matches(day):
+                for hour in self.__hours:
+                    for minute in self.__minutes:
+                        candidate = day.replace(hour=hour, minute=minute)
+                        if candidate >= start:
+                            return candidate
+
+            day += timedelta(days=1)
+
+        raise ValueError(f"{self!r} never fires")
+
+
+class Job:
+    """A periodic job run by the scheduler leader, together with its run statistics.
+
+    Interval jobs run every `interval` seconds, starting one interval after the worker becomes
+    the leader. Cron jobs run at the times matched by `cron`. A job never runs concurrently with
+    itself: a scheduled time reached while the previous run is still in progress is skipped and
+    counted as an overrun.
+    """
+
+    __slots__ = (
+        "callback",
+        "cron",
+        "failures",
+        "interval",
+        "last_duration",
+        "last_error",
+        "last_started",
+        "last_success",
+        "name",
+        "next_run",
+        "overruns",
+        "reported_overruns",
+        "runs",
+        "task",
+    )
+    if TYPE_CHECKING:
+        callback: Callable[[], Awaitable[Any]]
+        cron: Optional[CronSchedule]
+        failures: int
+        interval: Optional[timedelta]
+        last_duration: Optional[float]
+        last_error: Optional[str]
+        last_started: Optional[datetime]
+        last_success: Optional[datetime]
+        name: str
+        next_run: Optional[datetime]
+        overruns: int
+        reported_overruns: int
+        runs: int
+        task: Optional[asyncio.Task[None]]
+
+    def __init__(
+        self,
+        name: str,
+        callback: Callable[[], Awaitable[Any]],
+        *,
+        interval: Optional[float] = None,
+        cron: Optional[str] = None,
+    ) -> None:
+        if (interval is None) == (cron is None):
+            raise ValueError("Exactly one of interval and cron must be specified")
+
+        self.callback = callback
+        self.cron = None if cron is None else CronSchedule(cron)
+        self.interval = None if interval is None else timedelta(seconds=interval)
+        self.name = name
+
+        self.failures = 0
+        self.last_duration = None
+        self.last_error = None
+        self.last_started = None
+        self.last_success = None
+        self.next_run = None
+        self.overruns = 0
+        self.reported_overruns = 0
+        self.runs = 0
+        self.task = None
+
+    def __repr__(self) -> str:
+        return f"<Job name={self.name!r}>"
+
+    @property
+    def running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    def schedule(self, now: datetime) -> None:
+        """Compute the next scheduled time after `now`."""
+        if self.cron is not None:
+            self.next_run = self.cron.next(now)
+
+        elif self.interval is not None:
+            if self.next_run is None:
+                self.next_run = now + self.interval
+
+            # Keep a fixed rate, skipping the slots that were missed
+            while self.next_run <= now:
+                self.next_run += self.interval
+
+
+class Scheduler:
+    """A per-process singleton running periodic jobs on exactly one worker at a time.
+
+    Every worker runs the scheduler loop, but only the one holding the session-owned application
+    lock `LOCK_RESOURCE` (see `sp_getapplock`) executes jobs. The lock is held on a dedicated
+    connection, so it is released by SQL Server when the leader process dies or loses its
+    connection, and another worker (possibly on another node) takes over at its next election
+    attempt.
+
+    After each run, the leader adds the outcome of the job to the `scheduler_jobs` table, which
+    accumulates the statistics across leaders.
+    """
+
+    LOCK_RESOURCE: ClassVar[str] = "scheduler"
+    # Followers attempt to become the leader this often, the leader checks that it still holds the lock as often
+    ELECTION_INTERVAL: ClassVar[float] = 15.0
+
+    instance: ClassVar[Scheduler]
+    __slots__ = (
+        "__connection",
+        "__jobs",
+        "__leader_checked",
+        "__task",
+    )
+    if TYPE_CHECKING:
+        __connection: Optional[aioodbc.Connection]
+        __jobs: Dict[str, Job]
+        __leader_checked: float
+        __task: Optional[asyncio.Task[None]]
+
+    def __init__(self) -> None:
+        self.__connection = None
+        self.__jobs = {}
+        self.__leader_checked = 0.0
+        self.__task = None
+
+    @property
+    def jobs(self) -> List[Job]:
+        """The registered jobs."""
+        return list(self.__jobs.values())
+
+    @property
+    def identity(self) -> str:
+        """The host and process of this worker. Workers forked by the supervisor share this instance."""
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    @property
+    def leader(self) -> bool:
+        """Whether this worker currently holds the scheduler lock."""
+        return self.__connection is not None
+
+    def add_job(self, job: Job) -> None:
+        """Register a job. Jobs must have unique names."""
+        if job.name in self.__jobs:
+            raise ValueError(f"Job {job.name!r} is already registered")
+
+        self.__jobs[job.name] = job
+
+    def interval(self, seconds: float, *, name: Optional[str] = None) -> Callable[[Callable[[], Awaitable[Any]]], Callable[[], Awaitable[Any]]]:
+        """A decorator registering a coroutine function as a job running every `seconds` seconds."""
+        def decorator(callback: Callable[[], Awaitable[Any]]) -> Callable[[], Awaitable[Any]]:
+            self.add_job(Job(name or callback.__qualname__, callback, interval=seconds))
+            return callback
+
+        return decorator
+
+    def cron(self, expression: str, *, name: Optional[str] = None) -> Callable[[Callable[[], Awaitable[Any]]], Callable[[], Awaitable[Any]]]:
+        """A decorator registering a coroutine function as a job running on a `CronSchedule` (in UTC)."""
+        def decorator(callback: Callable[[], Awaitable[Any]]) -> Callable[[], Awaitable[Any]]:
+            self.add_job(Job(name or callback.__qualname__, callback, cron=expression))
+            return callback
+
+        return decorator
+
+    def start(self) -> None:
+        """Start the scheduler loop. If it is already running, this function does nothing."""
+        if self.__task is None:
+            self.__task = asyncio.create_task(self.__run())
+
+    async def stop(self) -> None:
+        """This function is a coroutine.
+
+        Stop the scheduler loop, cancel running jobs and release the lock if held.
+        """
+        task, self.__task = self.__task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+        await self.__step_down()
+
+    async def __elect(self) -> None:
+        try:
+            connection = await aioodbc.connect(dsn=ODBC_CONNECTION_STRING, autocommit=True)
+        except Exception:
+            logger.exception("Unable to connect for scheduler election")
+            return
+
+        try:
+            async with connection.cursor() as cursor:
+                await cursor.execute(
+                    """
+                        SET NOCOUNT ON
+                        DECLARE @Result INT
+                        EXECUTE @Result = sp_getapplock @Resource = ?, @LockMode = 'Exclusive', @LockOwner = 'Session', @LockTimeout = 0
+                        SELECT @Result
+                    """,
+                    self.LOCK_RESOURCE,
+                )
+                result = await cursor.fetchval()
+
+        except Exception:
+            logger.exception("Scheduler election failed")
+            result = -999
+
+        if result < 0:
+            await connection.close()
+            return
+
+        logger.info(f"[{self.identity}] Elected as scheduler leader")
+        self.__connection = connection
+        self.__leader_checked = time.monotonic()
+
+        now = datetime.now(timezone.utc)
+        for job in self.__jobs.values():
+            job.next_run = None
+            job.schedule(now)
+
+    async def __still_leader(self) -> bool:
+        connection = self.__connection
+        if connection is None:
+            return False
+
+        try:
+            async with connection.cursor() as cursor:
+                await cursor.execute("SELECT APPLOCK_MODE('public', ?, 'Session')", self.LOCK_RESOURCE)
+                mode = await cursor.fetchval()
+
+        except Exception:
+            logger.exception("Unable to verify the scheduler lock")
+            return False
+
+        return mode == "Exclusive"
+
+    async def __step_down(self) -> None:
+        for job in self.__jobs.values():
+            if job.task is not None:
+                job.task.cancel()
+
+        connection, self.__connection = self.__connection, None
+        if connection is not None:
+            logger.info(f"[{self.identity}] Stepping down as scheduler leader")
+            try:
+                # Closing the connection releases the session lock as well
+                await connection.close()
+            except Exception:
+                logger.exception("Unable to close the scheduler connection")
+
+    async def __run(self) -> None:
+        try:
+            while True:
+                if self.__connection is None:
+                    await self.__elect()
+
+                elif time.monotonic() - self.__leader_checked >= self.ELECTION_INTERVAL:
+                    self.__leader_checked = time.monotonic()
+                    if not await self.__still_leader():
+                        await self.__step_down()
+
+                delay = self.ELECTION_INTERVAL
+                if self.__connection is not None:
+                    now = datetime.now(timezone.utc)
+                    for job in self.__jobs.values():
+                        if job.next_run is not None and job.next_run <= now:
+                            if job.running:
+                                job.overruns += 1
+                                logger.warning(f"{job!r} is still running at its next scheduled time, skipping")
+                            else:
+                                job.task = asyncio.create_task(self.__execute(job))
+
+                            job.schedule(now)
+
+                        if job.next_run is not None:
+                            delay = min(delay, (job.next_run - now).total_seconds())
+
+                await asyncio.sleep(max(delay, 0.0))
+
+        finally:
+            await self.__step_down()
+
+    async def __execute(self, job: Job) -> None:
+        job.last_started = datetime.now(timezone.utc)
+        start = time.perf_counter()
+        try:
+            await job.callback()
+
+        except asyncio.CancelledError:
+            raise
+
+        except Exception as e:
+            job.failures += 1
+            job.last_error = "".join(traceback.format_exception(e))
+            logger.exception(f"Exception in scheduled {job!r}")
+
+        else:
+            job.last_success = datetime.now(timezone.utc)
+            job.last_error = None
+
+        job.runs += 1
+        job.last_duration = time.perf_counter() - start
+        await self.__record(job)
+
+    async def __record(self, job: Job) -> None:
+        overruns = job.overruns - job.reported_overruns
+        try:
+            async with Database.instance.pool.acquire() as connection:
+                async with connection.cursor() as cursor:
+                    await cursor.execute(
+                        """
+                            EXECUTE RecordSchedulerJob
+                                @Name = ?,
+                                @Leader = ?,
+                                @Succeeded = ?,
+                                @Overruns = ?,
+                                @Started = ?,
+                                @Duration = ?,
+                                @Error = ?
+                        """,
+                        job.name,
+                        self.identity,
+                        job.last_error is None,
+                        overruns,
+                        job.last_started,
+                        job.last_duration,
+                        job.last_error,
+                    )
+
+        except Exception:
+            logger.exception(f"Unable to record the statistics of {job!r}")
+
+        else:
+            job.reported_overruns += overruns
+
+
+Scheduler.instance = Scheduler()
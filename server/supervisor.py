@@ -0,0 +1,380 @@
+from __future__ import annotations
+
+import gc
+import logging
+import os
+import random
+import selectors
+import signal
+import socket
+import time
+from collections import deque
+from typing import Any, ClassVar, Deque, Dict, List, Optional, TYPE_CHECKING
+
+import uvicorn
+from fastapi import FastAPI
+from starlette.routing import Mount
+
+from .config import WORKER_MAX_MEMORY, WORKER_MAX_REQUESTS
+
+
+__all__ = ("Supervisor",)
+logger = logging.getLogger("uvicorn")
+
+
+def _private_memory() -> int:
+    """The memory of this process that is not shared with other processes, in bytes (0 if unknown)."""
+    try:
+        with open("/proc/self/smaps_rollup", "r", encoding="utf-8") as f:
+            total = 0
+            for line in f:
+                if line.startswith(("Private_Clean:", "Private_Dirty:")):
+                    total += int(line.split()[1]) * 1024
+
+            return total
+
+    except OSError:
+        return 0
+
+
+class _WorkerServer(uvicorn.Server):
+    """A uvicorn server reporting to the supervisor through a pipe.
+
+    It writes `READY` once the application has started, and `RETIRE` once it has served its
+    requests or exceeded its memory limit. A retiring worker keeps serving until the supervisor
+    has started its replacement and terminates it.
+    """
+
+    READY: ClassVar[bytes] = b"R"
+    RETIRE: ClassVar[bytes] = b"X"
+    # Ticks are 0.1 seconds apart
+    MEMORY_CHECK_TICKS: ClassVar[int] = 100
+
+    def __init__(self, config: uvicorn.Config, pipe: int) -> None:
+        super().__init__(config)
+        self.pipe = pipe
+        self.retiring = False
+        # Spread the recycling of workers started together
+        self.max_requests = WORKER_MAX_REQUESTS + random.randrange(WORKER_MAX_REQUESTS // 10 + 1)
+
+    async def startup(self, sockets: Optional[List[socket.socket]] = None) -> None:
+        await super().startup(sockets)
+        if self.started:
+            os.write(self.pipe, self.READY)
+
+    async def on_tick(self, counter: int) -> bool:
+        if await super().on_tick(counter):
+            return True
+
+        if not self.retiring:
+            reason: Optional[str] = None
+            if self.max_requests > 0 and self.server_state.total_requests >= self.max_requests:
+                reason = f"served {self.server_state.total_requests} requests"
+
+            elif WORKER_MAX_MEMORY > 0 and counter % self.MEMORY_CHECK_TICKS == 0:
+                memory = _private_memory()
+                if memory > WORKER_MAX_MEMORY:
+                    reason = f"uses {memory >> 20} MiB of private memory"
+
+            if reason is not None:
+                logger.info(f"[{os.getpid()}] Worker {reason}, requesting a replacement")
+                self.retiring = True
+                os.write(self.pipe, self.RETIRE)
+
+        return False
+
+
+class _Worker:
+
+    __slots__ = (
+        "pid",
+        "pipe",
+        "ready",
+        "replaces",
+        "spawned",
+        "stopping",
+    )
+    if TYPE_CHECKING:
+        pid: int
+        pipe: int
+        ready: bool
+        replaces: Optional[int]
+        spawned: float
+        stopping: Optional[float]
+
+    def __init__(self, pid: int, pipe: int, *, replaces: Optional[int]) -> None:
+        self.pid = pid
+        self.pipe = pipe
+        self.ready = False
+        self.replaces = replaces
+        self.spawned = time.monotonic()
+        # When the worker was asked to stop
+        self.stopping = None
+
+
+class Supervisor:
+    """Serve a preloaded application with forked uvicorn workers.
+
+    The application is imported and warmed up (OpenAPI schemas, middleware stacks) once in the
+    supervisor process, then the garbage collector is frozen before forking the workers, so that
+    they share these objects copy-on-write instead of building them again. Each worker runs the
+    application lifespan, hence opens its own database pool.
+
+    A worker is replaced after `WORKER_MAX_REQUESTS` requests (plus up to 10% jitter), or when its
+    private memory exceeds `WORKER_MAX_MEMORY` bytes. Replacements are rolling: the new worker is
+    started and must be ready before the old one is gracefully shut down, one worker at a time.
+    `SIGHUP` replaces every worker in this way. `SIGTERM` and `SIGINT` shut down all workers.
+
+    Workers share the preloaded code: deploying new code requires restarting the supervisor.
+    """
+
+    # A worker not ready after this many seconds is killed and replaced
+    READY_TIMEOUT: ClassVar[float] = 120.0
+    # Delay before replacing a worker that died before being ready
+    RESPAWN_DELAY: ClassVar[float] = 1.0
+    # A stopping worker cancels the requests still running after this many seconds, e.g. event streams
+    # (clients reconnect to another worker and resume from their last event)
+    GRACEFUL_TIMEOUT: ClassVar[int] = 10
+    # A worker still running this many seconds after being asked to stop is killed
+    STOP_TIMEOUT: ClassVar[float] = 60.0
+
+    __slots__ = (
+        "__app",
+        "__config",
+        "__pending",
+        "__selector",
+        "__shutdown",
+        "__signals",
+        "__socket",
+        "__wakeup",
+        "__workers",
+        "__workers_count",
+    )
+    if TYPE_CHECKING:
+        __app: FastAPI
+        __config: uvicorn.Config
+        __pending: Deque[int]
+        __selector: selectors.DefaultSelector
+        __shutdown: bool
+        __signals: List[int]
+        __socket: socket.socket
+        __wakeup: socket.socket
+        __workers: Dict[int, _Worker]
+        __workers_count: int
+
+    def __init__(self, app: FastAPI, *, workers: int, **config: Any) -> None:
+        self.__app = app
+        config.setdefault("timeout_graceful_shutdown", self.GRACEFUL_TIMEOUT)
+        self.__config = uvicorn.Config(app, **config)
+        self.__pending = deque()
+        self.__shutdown = False
+        self.__signals = []
+        self.__workers = {}
+        self.__workers_count = workers
+
+    def __preload(self) -> None:
+        started = time.perf_counter()
+        self.__config.load()
+
+        apps = [self.__app]
+        while len(apps) > 0:
+            app = apps.pop()
+            app.openapi()
+            app.middleware_stack = app.build_middleware_stack()
+            apps.extend(route.app for route in app.routes if isinstance(route, Mount) and isinstance(route.app, FastAPI))
+
+        # Objects created so far are never collected: the workers do not touch their pages
+        gc.collect()
+        gc.freeze()
+        logger.info(f"[{os.getpid()}] Preloaded {self.__app} in {time.perf_counter() - started:.2f}s, froze {gc.get_freeze_count()} objects")
+
+    def __serve(self, pipe: int) -> bool:
+        # In the forked worker
+        gc.enable()
+        signal.set_wakeup_fd(-1)
+        for signum in (signal.SIGCHLD, signal.SIGHUP, signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, signal.SIG_DFL)
+
+        self.__selector.close()
+        self.__wakeup.close()
+        for worker in self.__workers.values():
+            os.close(worker.pipe)
+
+        server = _WorkerServer(self.__config, pipe)
+        server.run(sockets=[self.__socket])
+        return server.started
+
+    def __spawn(self, *, replaces: Optional[int] = None) -> None:
+        read, write = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            code = 3
+            try:
+                os.close(read)
+                if self.__serve(write):
+                    code = 0
+            except BaseException:
+                logger.exception(f"[{os.getpid()}] Worker failed")
+            finally:
+                os._exit(code)
+
+        os.close(write)
+        os.set_blocking(read, False)
+        self.__workers[pid] = _Worker(pid, read, replaces=replaces)
+        self.__selector.register(read, selectors.EVENT_READ, pid)
+
+    def __stop(self, worker: _Worker, signum: int = signal.SIGTERM) -> None:
+        if worker.stopping is None:
+            worker.stopping = time.monotonic()
+
+        try:
+            os.kill(worker.pid, signum)
+        except ProcessLookupError:
+            pass
+
+    def __on_signal(self, signum: int, _: Any) -> None:
+        self.__signals.append(signum)
+
+    def __handle_signals(self) -> None:
+        while len(self.__signals) > 0:
+            signum = self.__signals.pop(0)
+            if signum == signal.SIGHUP:
+                logger.info(f"[{os.getpid()}] Rolling restart of {len(self.__workers)} workers")
+                self.__pending.extend(pid for pid, worker in self.__workers.items() if worker.ready and worker.stopping is None)
+
+            elif signum in (signal.SIGINT, signal.SIGTERM) and not self.__shutdown:
+                logger.info(f"[{os.getpid()}] Shutting down {len(self.__workers)} workers")
+                self.__shutdown = True
+                for worker in self.__workers.values():
+                    self.__stop(worker)
+
+    def __read(self, pid: int) -> None:
+        worker = self.__workers.get(pid)
+        if worker is None:
+            return
+
+        try:
+            data = os.read(worker.pipe, 64)
+        except BlockingIOError:
+            return
+
+        if _WorkerServer.READY in data and not worker.ready:
+            worker.ready = True
+            logger.info(f"[{pid}] Worker ready in {time.monotonic() - worker.spawned:.2f}s")
+            replaced = self.__workers.get(worker.replaces) if worker.replaces is not None else None
+            if replaced is not None:
+                self.__stop(replaced)
+
+        if _WorkerServer.RETIRE in data and worker.stopping is None and pid not in self.__pending:
+            self.__pending.append(pid)
+
+        if len(data) == 0:  # The worker has closed its end of the pipe, i.e. exited
+            self.__selector.unregister(worker.pipe)
+
+    def __reap(self) -> None:
+        while len(self.__workers) > 0:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+
+            if pid == 0:
+                return
+
+            worker = self.__workers.pop(pid, None)
+            if worker is None:
+                continue
+
+            try:
+                self.__selector.unregister(worker.pipe)
+            except KeyError:
+                pass
+
+            os.close(worker.pipe)
+            if worker.stopping is not None or self.__shutdown:
+                continue
+
+            logger.warning(f"[{pid}] Worker exited unexpectedly with status {os.waitstatus_to_exitcode(status)}")
+
+            # A replacement of this worker that is already starting takes its place
+            replacement = next((other for other in self.__workers.values() if other.replaces == pid), None)
+            if replacement is not None:
+                replacement.replaces = None
+                continue
+
+            if not worker.ready:
+                time.sleep(self.RESPAWN_DELAY)
+
+            # Keep the worker it was replacing, if any, until another replacement is ready
+            self.__spawn(replaces=worker.replaces)
+
+    def __kill_stragglers(self) -> None:
+        now = time.monotonic()
+        for worker in self.__workers.values():
+            if worker.stopping is not None and now - worker.stopping > self.STOP_TIMEOUT:
+                logger.warning(f"[{worker.pid}] Worker still running {self.STOP_TIMEOUT}s after being stopped, killing it")
+                worker.stopping = now
+                os.kill(worker.pid, signal.SIGKILL)
+
+    def __roll(self) -> None:
+        now = time.monotonic()
+        for worker in list(self.__workers.values()):
+            if not worker.ready and worker.stopping is None and now - worker.spawned > self.READY_TIMEOUT:
+                logger.warning(f"[{worker.pid}] Worker not ready after {self.READY_TIMEOUT}s, killing it")
+                self.__stop(worker, signal.SIGKILL)
+                self.__spawn(replaces=worker.replaces)
+
+        # Replace one worker at a time
+        if any(worker.replaces is not None and not worker.ready and worker.stopping is None for worker in self.__workers.values()):
+            return
+
+        while len(self.__pending) > 0:
+            pid = self.__pending.popleft()
+            retiring = self.__workers.get(pid)
+            if retiring is not None and retiring.stopping is None:
+                self.__spawn(replaces=pid)
+                return
+
+    def run(self) -> None:
+        """Preload the application, start the workers and supervise them until shutdown."""
+        self.__preload()
+        self.__socket = self.__config.bind_socket()
+        self.__selector = selectors.DefaultSelector()
+
+        self.__wakeup, wakeup = socket.socketpair()
+        self.__wakeup.setblocking(False)
+        wakeup.setblocking(False)
+        self.__selector.register(self.__wakeup, selectors.EVENT_READ, None)
+        signal.set_wakeup_fd(wakeup.fileno(), warn_on_full_buffer=False)
+        for signum in (signal.SIGCHLD, signal.SIGHUP, signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, self.__on_signal)
+
+        # Collecting in the supervisor would not help the workers, see `gc.freeze()`
+        gc.disable()
+        for _ in range(self.__workers_count):
+            self.__spawn()
+
+        try:
+            while not self.__shutdown or len(self.__workers) > 0:
+                for key, _ in self.__selector.select(timeout=1.0):
+                    if key.data is None:
+                        try:
+                            self.__wakeup.recv(4096)
+                        except BlockingIOError:
+                            pass
+                    else:
+                        self.__read(key.data)
+
+                self.__handle_signals()
+                self.__reap()
+                self.__kill_stragglers()
+                if not self.__shutdown:
+                    self.__roll()
+
+        finally:
+            signal.set_wakeup_fd(-1)
+            self.__selector.close()
+            self.__wakeup.close()
+            wakeup.close()
+            self.__socket.close()
+            logger.info(f"[{os.getpid()}] Supervisor stopped")
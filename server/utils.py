@@ -3,6 +3,7 @@ from __future__ import annotations
 import re
 import secrets
 import string
+import unicodedata
 from datetime import date, datetime, timedelta, timezone
 from hashlib import sha256
 from typing import Optional
@@ -14,9 +15,11 @@ __all__ = (
     "hash_password",
     "check_password",
     "secure_hex_string",
+    "fold_accents",
     "since_epoch",
     "from_epoch",
     "snowflake_time",
+    "query_time",
     "validate_name",
     "validate_room",
     "validate_phone",
@@ -45,6 +48,12 @@ def secure_hex_string(length: int) -> str:
     return "".join(secrets.choice(string.hexdigits) for _ in range(length))
 
 
+def fold_accents(text: str) -> str:
+    """Strip diacritics and case from a string, e.g. `"Nguyễn Đức"` becomes `"nguyen duc"`."""
+    decomposed = unicodedata.normalize("NFKD", text.replace("đ", "d").replace("Đ", "D"))
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
 def since_epoch(dt: Optional[datetime] = None) -> timedelta:
     """Get the timedelta since the epoch.
 
@@ -74,6 +83,14 @@ def snowflake_time(id: int) -> datetime:
     return from_epoch(timedelta(milliseconds=id >> 16))
 
 
+def query_time() -> datetime:
+    """The default upper bound of a query: the start of the next second.
+
+    Requests made within the same second get the same bound, so that their queries can be coalesced.
+    """
+    return datetime.now(timezone.utc).replace(microsecond=0) + timedelta(seconds=1)
+
+
 def validate_name(name: str) -> bool:
     return len(name) > 0 and len(name) < 256
 
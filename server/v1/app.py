@@ -9,6 +9,11 @@ from fastapi import FastAPI
 from fastapi.responses import RedirectResponse
 from fastapi.staticfiles import StaticFiles
 
+from .models import IPNOutcomeCatalog, IPNStore, ResidentIndex, RoomCatalog
+from ..admission import AdmissionControl
+from ..database import CircuitOpen
+from ..openapi import OpenAPICache
+
 
 __all__ = (
     "api_v1",
@@ -19,23 +24,38 @@ logger = logging.getLogger("uvicorn")
 @asynccontextmanager
 async def __lifespan(app: FastAPI) -> AsyncGenerator[None]:
     logger.info(f"Starting {app} from {__file__}")
+    await ResidentIndex.instance.prepare()
+    logger.info(f"Indexed {len(ResidentIndex.instance)} residents for suggestions")
+    await RoomCatalog.instance.start()
+    await IPNOutcomeCatalog.instance.start()
+    await IPNStore.instance.outbox.start()
+
     yield
+
     logger.info(f"Stopping {app} from {__file__}")
+    await IPNStore.instance.outbox.stop()
+    IPNOutcomeCatalog.instance.stop()
+    RoomCatalog.instance.stop()
+    await ResidentIndex.instance.close()
 
 
 current_dir = Path(__file__).parent
 readme = current_dir.parent.parent / "README.md"
-with readme.open("r", encoding="utf-8") as f:
-    description = f.read()
 
 
 api_v1 = FastAPI(
     title="Resident manager API v1",
-    description=description,
     version="1.0.0",
     lifespan=__lifespan,
 )
+# The README is only read to build the schema, which is cached on disk
+api_v1.openapi = OpenAPICache(  # type: ignore
+    api_v1,
+    name="api_v1",
+    description=lambda: readme.read_text(encoding="utf-8"),
+)
 api_v1.mount("/static", StaticFiles(directory=current_dir / "static"))
+api_v1.add_exception_handler(CircuitOpen, AdmissionControl.circuit_open)
 
 
 @api_v1.get("/", include_in_schema=False)
@@ -1,10 +1,15 @@
 from .accounts import *
 from .auth import *
+from .bills import *
+from .dashboard import *
 from .fee import *
+from .floors import *
 from .info import *
+from .ipn import *
 from .payment_status import *
 from .payment import *
 from .reg_request import *
+from .resident_index import *
 from .residents import *
 from .results import *
 from .rooms import *
@@ -4,13 +4,14 @@ import asyncio
 import traceback
 import sys
 from datetime import datetime, timedelta, timezone
-from typing import Annotated, ClassVar, Final, Literal, Optional
+from typing import Annotated, Any, ClassVar, Final, Literal, Optional
 
 import jwt
 import pydantic
 from fastapi import Depends
 from fastapi.security import OAuth2PasswordBearer
 
+from ...bus import InvalidationBus
 from ...database import Database
 from ...utils import check_password
 
@@ -27,28 +28,45 @@ TOKEN_EXPIRE_MINUTES: Final[int] = 30
 
 class __SecretKeyQuery:
     running: ClassVar[Optional[asyncio.Task[str]]] = None
+    # The session secret key is cached until the config table is changed, e.g. when it is rotated
+    value: ClassVar[Optional[str]] = None
 
-    @staticmethod
-    async def __query() -> str:
+    @classmethod
+    async def __query(cls) -> str:
         async with Database.instance.pool.acquire() as connection:
             async with connection.cursor() as cursor:
                 await cursor.execute("SELECT value FROM config WHERE name = 'session_secret_key'")
-                return await cursor.fetchval()
+                value = await cursor.fetchval()
+
+        # Do not cache a value read before an invalidation that occurred during the query
+        if cls.running is asyncio.current_task():
+            cls.value = value
+
+        return value
 
     @classmethod
-    def __reload(cls) -> None:
-        cls.running = None
+    def __reload(cls, task: asyncio.Task[str]) -> None:
+        if cls.running is task:
+            cls.running = None
+
+    @classmethod
+    def invalidate(cls, *_: Any) -> None:
+        cls.running = cls.value = None
 
     @classmethod
     async def query(cls) -> str:
+        if cls.value is not None:
+            return cls.value
+
         if cls.running is None:
             cls.running = task = asyncio.create_task(cls.__query())
-            task.add_done_callback(lambda _: cls.__reload())
+            task.add_done_callback(cls.__reload)
 
         return await cls.running
 
 
 secret_key = __SecretKeyQuery.query
+InvalidationBus.instance.subscribe("config", __SecretKeyQuery.invalidate)
 
 
 class HashedAuthorization(pydantic.BaseModel):
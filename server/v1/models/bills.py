@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import codecs
+import csv
+import json
+import math
+from datetime import date
+from typing import Annotated, Any, AsyncIterable, ClassVar, Dict, List, Literal, Optional, Tuple
+
+import pydantic
+from pyodbc import Row  # type: ignore
+
+from ...config import DB_PAGINATION_QUERY
+from ...database import Database
+from ...events import EventDispatcher
+from ...utils import validate_room
+
+
+__all__ = ("Bill", "BillImport")
+
+
+def _month(value: Any) -> date:
+    # "YYYY-MM" or "YYYY-MM-DD", normalized to the first day of the month
+    year, month, *_ = str(value).split("-")
+    return date(int(year), int(month), 1)
+
+
+def _parse(fields: Dict[str, Any]) -> Tuple[int, date, int, int]:
+    # JSON numbers may be fractional, which int() would truncate
+    if isinstance(fields["room"], float) and not fields["room"].is_integer():
+        raise ValueError(f"Invalid room {fields['room']!r}")
+
+    room = int(fields["room"])
+    if not validate_room(room):
+        raise ValueError(f"Invalid room {room}")
+
+    bill_type = Bill.TYPES.get(str(fields["type"]).strip().lower())
+    if bill_type is None:
+        raise ValueError(f"Invalid type {fields['type']!r}")
+
+    amount = float(fields["amount"])
+    if not (math.isfinite(amount) and 0 <= amount <= Bill.MAX_AMOUNT):
+        raise ValueError(f"Invalid amount {fields['amount']!r}")
+
+    return room, _month(fields["month"]), bill_type, round(100 * amount)
+
+
+class BillImport(pydantic.BaseModel):
+    """Data model for the outcome of a meter reading import"""
+    readings: Annotated[int, pydantic.Field(description="The number of valid readings")]
+    inserted: Annotated[int, pydantic.Field(description="The number of created bills")]
+    updated: Annotated[int, pydantic.Field(description="The number of bills whose amount was changed")]
+    unknown_rooms: Annotated[int, pydantic.Field(description="The number of valid readings skipped because their room does not exist")]
+    rejected: Annotated[int, pydantic.Field(description="The number of invalid lines")]
+    errors: Annotated[List[str], pydantic.Field(description="The first errors of the invalid lines")]
+
+
+class Bill(pydantic.BaseModel):
+    """Data model for objects holding the utility bill of a room for a month.
+
+    Each object of this class corresponds to a database row.
+    """
+
+    WATER: ClassVar[int] = 0
+    ELECTRICITY: ClassVar[int] = 1
+    TYPES: ClassVar[Dict[str, int]] = {"0": 0, "1": 1, "water": 0, "electricity": 1}
+
+    # Staged rows are sent to the database in chunks of this size
+    IMPORT_CHUNK: ClassVar[int] = 10000
+    IMPORT_ERRORS: ClassVar[int] = 100
+    # Larger readings are rejected: 100 times this amount is stored exactly in a float and a BIGINT
+    MAX_AMOUNT: ClassVar[float] = 1e12
+
+    room: Annotated[int, pydantic.Field(description="The room of the bill")]
+    month: Annotated[date, pydantic.Field(description="The first day of the month of the bill")]
+    type: Annotated[int, pydantic.Field(description="The type of the bill (0: water, 1: electricity)")]
+    amount: Annotated[float, pydantic.Field(description="The consumed amount, in cubic meters of water or kilowatt-hours")]
+
+    @classmethod
+    def from_row(cls, row: Row) -> Bill:
+        return cls(
+            room=row.room,
+            month=row.month,
+            type=row.type,
+            amount=row.amount / 100,
+        )
+
+    @classmethod
+    async def query(
+        cls,
+        *,
+        room: Optional[int] = None,
+        month_from: date,
+        month_to: date,
+        offset: int = 0,
+    ) -> List[Bill]:
+        """This function is a coroutine.
+
+        Query the bills of a room, or of every room, between two months (inclusive), the most recent first.
+        """
+        async with Database.instance.pool.acquire() as connection:
+            async with connection.cursor() as cursor:
+                await cursor.execute(
+                    """
+                        EXECUTE QueryBills
+                            @Room = ?,
+                            @From = ?,
+                            @To = ?,
+                            @Offset = ?,
+                            @FetchNext = ?
+                    """,
+                    room,
+                    _month(month_from),
+                    _month(month_to),
+                    offset,
+                    DB_PAGINATION_QUERY,
+                )
+
+                rows = await cursor.fetchall()
+                return [cls.from_row(row) for row in rows]
+
+    @staticmethod
+    async def count(*, room: Optional[int] = None, month_from: date, month_to: date) -> int:
+        async with Database.instance.pool.acquire() as connection:
+            async with connection.cursor() as cursor:
+                await cursor.execute(
+                    "EXECUTE CountBills @Room = ?, @From = ?, @To = ?",
+                    room,
+                    _month(month_from),
+                    _month(month_to),
+                )
+
+                return await cursor.fetchval()
+
+    @staticmethod
+    async def import_readings(stream: AsyncIterable[bytes], *, format: Literal["csv", "ndjson"]) -> BillImport:
+        """This function is a coroutine.
+
+        Import meter readings from a stream of CSV or NDJSON lines, creating or updating the bill of
+        each room, month and type.
+
+        CSV input starts with a header naming the `room`, `month`, `type` and `amount` columns, in any
+        order. NDJSON input holds one object with these keys per line. `month` is formatted as
+        `YYYY-MM` or `YYYY-MM-DD`, and `type` is `water`, `electricity`, `0` or `1`.
+
+        Readings are staged in chunks while the stream is read, then merged in a single transaction:
+        the import is applied entirely or not at all. Invalid lines are skipped and reported.
+        """
+        readings = rejected = 0
+        errors: List[str] = []
+        chunk: List[Tuple[int, int, date, int, int]] = []
+        header: Optional[List[str]] = None
+
+        async with Database.instance.pool.acquire() as connection:
+            async with connection.cursor() as cursor:
+                # https://github.com/aio-libs/aioodbc/issues/423
+                cursor._impl.fast_executemany = True
+
+                async def flush() -> None:
+                    if len(chunk) > 0:
+                        await cursor.executemany("INSERT INTO #bills (line, room, month, type, amount) VALUES (?, ?, ?, ?, ?)", chunk)
+                        chunk.clear()
+
+                await cursor.execute(
+                    """
+                        DROP TABLE IF EXISTS #bills
+                        CREATE TABLE #bills (
+                            line INT NOT NULL,
+                            room SMALLINT NOT NULL,
+                            month DATE NOT NULL,
+                            type TINYINT NOT NULL,
+                            amount BIGINT NOT NULL
+                        )
+                    """
+                )
+
+                def handle(line_number: int, line: str) -> None:
+                    nonlocal header, readings, rejected
+                    line = line.strip()
+                    if len(line) == 0:
+                        return
+
+                    try:
+                        if format == "csv":
+                            values = next(csv.reader([line]))
+                            if header is None:
+                                header = [value.strip().lower() for value in values]
+                                return
+
+                            fields: Dict[str, Any] = dict(zip(header, values))
+                        else:
+                            fields = json.loads(line)
+
+                        chunk.append((line_number, *_parse(fields)))
+                        readings += 1
+                    except (KeyError, OverflowError, TypeError, ValueError) as error:
+                        rejected += 1
+                        if len(errors) < Bill.IMPORT_ERRORS:
+                            message = f"Missing field {error}" if isinstance(error, KeyError) else str(error)
+                            errors.append(f"Line {line_number}: {message}")
+
+                try:
+                    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+                    buffer = ""
+                    line_number = 0
+                    async for data in stream:
+                        *lines, buffer = (buffer + decoder.decode(data)).split("\n")
+                        for line in lines:
+                            line_number += 1
+                            handle(line_number, line)
+
+                        if len(chunk) >= Bill.IMPORT_CHUNK:
+                            await flush()
+
+                    handle(line_number + 1, buffer + decoder.decode(b"", final=True))
+                    await flush()
+
+                    await cursor.execute("EXECUTE ImportBills")
+                    row = await cursor.fetchone()
+
+                finally:
+                    await cursor.execute("DROP TABLE IF EXISTS #bills")
+
+        result = BillImport(
+            readings=readings,
+            inserted=row.inserted,
+            updated=row.updated,
+            unknown_rooms=row.unknown_rooms,
+            rejected=rejected,
+            errors=errors,
+        )
+        if result.inserted + result.updated > 0:
+            EventDispatcher.instance.dispatch("bills_import", result)
+
+        return result
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+from datetime import date
+from typing import Annotated, ClassVar, List
+
+import pydantic
+from pyodbc import Row  # type: ignore
+
+from ...cache import CachedQuery
+from ...config import DB_PAGINATION_QUERY
+from ...database import Database
+
+
+__all__ = ("Dashboard", "FeeCollection")
+
+
+class FeeCollection(pydantic.BaseModel):
+    """Data model for objects holding the collection status of a fee across all rooms.
+
+    Each object of this class does not correspond to a database row, but instead corresponds to
+    a record obtained from a GROUP BY query.
+    """
+
+    fee_id: Annotated[int, pydantic.Field(description="The ID of the fee")]
+    fee_name: Annotated[str, pydantic.Field(description="The name of the fee")]
+    fee_deadline: Annotated[date, pydantic.Field(description="The deadline of the fee")]
+    collected: Annotated[float, pydantic.Field(description="The total amount paid for this fee, in VND")]
+    paid: Annotated[int, pydantic.Field(description="The number of rooms that have paid this fee")]
+    unpaid: Annotated[int, pydantic.Field(description="The number of rooms that have not paid this fee")]
+
+    @classmethod
+    def from_row(cls, row: Row) -> FeeCollection:
+        return cls(
+            fee_id=row.fee_id,
+            fee_name=row.fee_name,
+            fee_deadline=row.fee_deadline,
+            collected=row.collected / 100,
+            paid=row.paid,
+            unpaid=row.unpaid,
+        )
+
+
+class Dashboard(pydantic.BaseModel):
+    """Data model for the summary displayed on the admin home screen."""
+
+    residents: Annotated[int, pydantic.Field(description="The number of approved residents")]
+    pending: Annotated[int, pydantic.Field(description="The number of pending registration requests")]
+    rooms: Annotated[int, pydantic.Field(description="The number of rooms with information")]
+    occupied: Annotated[int, pydantic.Field(description="The number of rooms with information and at least one resident")]
+    fees: Annotated[List[FeeCollection], pydantic.Field(description=f"The collection status of the {DB_PAGINATION_QUERY} most recent fees")]
+
+    # Served stale while a single background query refreshes it
+    CACHE_TTL: ClassVar[float] = 10.0
+
+    @classmethod
+    async def query(cls) -> Dashboard:
+        """This function is a coroutine.
+
+        Query the admin dashboard. The result is cached per worker for a few seconds and refreshed in
+        the background, so concurrent callers trigger at most one query.
+
+        Returns
+        -----
+        `Dashboard`
+            The dashboard summary.
+        """
+        return await _cache.get()
+
+
+async def _query() -> Dashboard:
+    async with Database.instance.pool.acquire() as connection:
+        async with connection.cursor() as cursor:
+            await cursor.execute("EXECUTE QueryDashboard @FetchFees = ?", DB_PAGINATION_QUERY)
+            summary = await cursor.fetchone()
+
+            await cursor.nextset()
+            rows = await cursor.fetchall()
+
+    return Dashboard(
+        residents=summary.residents,
+        pending=summary.pending,
+        rooms=summary.rooms,
+        occupied=summary.occupied,
+        fees=[FeeCollection.from_row(row) for row in rows],
+    )
+
+
+_cache = CachedQuery(_query, ttl=Dashboard.CACHE_TTL, stale=True)
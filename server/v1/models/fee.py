@@ -8,8 +8,10 @@ from pyodbc import Row  # type: ignore
 
 from .results import Result
 from .snowflake import Snowflake
-from ...config import DB_PAGINATION_QUERY, EPOCH
+from ...cache import single_flight
+from ...config import DB_PAGINATION_QUERY, EPOCH, SINGLE_FLIGHT_TTL
 from ...database import Database
+from ...events import EventDispatcher
 from ...utils import (
     validate_fee_bounds,
     validate_fee_name,
@@ -104,7 +106,8 @@ class Fee(Snowflake):
 
         async with Database.instance.pool.acquire() as connection:
             async with connection.cursor() as cursor:
-                await cursor.execute(
+                await Database.instance.execute(
+                    cursor,
                     """
                         EXECUTE CreateFee
                             @Name = ?,
@@ -128,9 +131,12 @@ class Fee(Snowflake):
                     flags,
                 )
                 row = await cursor.fetchone()
-                return Result(code=0, data=cls.from_row(row))
+                fee = cls.from_row(row)
+                EventDispatcher.instance.dispatch("fee_create", fee)
+                return Result(code=0, data=fee)
 
     @staticmethod
+    @single_flight(ttl=SINGLE_FLIGHT_TTL, tables=("fees",))
     async def count(
         *,
         created_after: datetime,
@@ -157,6 +163,7 @@ class Fee(Snowflake):
                 return await cursor.fetchval()
 
     @classmethod
+    @single_flight(ttl=SINGLE_FLIGHT_TTL, tables=("fees",))
     async def query(
         cls,
         *,
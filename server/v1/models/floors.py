@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+from typing import Annotated, ClassVar, List
+
+import pydantic
+from pyodbc import Row  # type: ignore
+
+from ...cache import CachedQuery
+from ...database import Database
+
+
+__all__ = ("Floor",)
+
+
+class Floor(pydantic.BaseModel):
+    """Data model for objects holding aggregated information about a floor.
+
+    Each object of this class does not correspond to a database row, but instead corresponds to
+    a record obtained from a GROUP BY query.
+    """
+
+    floor: Annotated[int, pydantic.Field(description="The floor number")]
+    rooms: Annotated[int, pydantic.Field(description="The number of rooms with information on this floor")]
+    area: Annotated[float, pydantic.Field(description="The total area of these rooms in square meters")]
+    motorbike: Annotated[int, pydantic.Field(description="The total number of motorbikes of these rooms")]
+    car: Annotated[int, pydantic.Field(description="The total number of cars of these rooms")]
+    residents: Annotated[int, pydantic.Field(description="The number of residents living on this floor")]
+    unpaid: Annotated[int, pydantic.Field(description="The number of (room, fee) pairs on this floor that have not been paid")]
+
+    # Safety net in case table changes cannot be propagated between workers
+    CACHE_TTL: ClassVar[float] = 60.0
+
+    @classmethod
+    def from_row(cls, row: Row) -> Floor:
+        return cls(
+            floor=row.floor,
+            rooms=row.rooms,
+            area=row.area / 100,
+            motorbike=row.motorbike,
+            car=row.car,
+            residents=row.residents,
+            unpaid=row.unpaid,
+        )
+
+    @classmethod
+    async def query(cls) -> List[Floor]:
+        """This function is a coroutine.
+
+        Query the summary of all floors. The result is cached per worker and invalidated by
+        changes to rooms, residents, fees and payments in any worker.
+
+        Returns
+        -----
+        `List[Floor]`
+            The summary of each floor, ordered by floor number.
+        """
+        return await _cache.get()
+
+
+async def _query() -> List[Floor]:
+    async with Database.instance.pool.acquire() as connection:
+        async with connection.cursor() as cursor:
+            await cursor.execute("EXECUTE QueryFloors")
+            rows = await cursor.fetchall()
+            return [Floor.from_row(row) for row in rows]
+
+
+_cache = CachedQuery(
+    _query,
+    ttl=Floor.CACHE_TTL,
+    tables=("accounts", "fees", "payments", "rooms"),
+)
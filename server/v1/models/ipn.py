@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import struct
+from collections import OrderedDict
+from typing import Any, ClassVar, Dict, List, Optional, Set, Tuple, TYPE_CHECKING
+
+from pyodbc import Row  # type: ignore
+
+from .payment import Payment
+from .payment_status import PaymentStatus
+from ...catalog import CatalogUnavailable, SharedCatalog
+from ...events import EventDispatcher
+from ...outbox import DurableOutbox
+
+
+__all__ = ("IPNOutcomeCatalog", "IPNStore")
+logger = logging.getLogger("uvicorn")
+
+
+def _digest(txn_ref: str) -> Tuple[int, int]:
+    high, low = struct.unpack("<qq", hashlib.blake2b(txn_ref.encode("utf-8"), digest_size=16).digest())
+    return high, low
+
+
+class IPNOutcomeCatalog(SharedCatalog[Tuple[int, str, str]]):
+    """The recently recorded IPN outcomes shared by all workers of a node, see `SharedCatalog`.
+
+    Records are keyed by a 128-bit hash of the transaction reference. `.get()` takes the first half
+    of the hash and returns the second half with the response code and message.
+    """
+
+    # Older transactions are no longer retried by VNPay
+    RETENTION_DAYS: ClassVar[int] = 2
+
+    instance: ClassVar[IPNOutcomeCatalog]
+    __slots__ = ()
+
+    def __init__(self) -> None:
+        super().__init__(
+            "ipn",
+            record=struct.Struct("<qq2s64s"),  # hash, hash, code, message
+            query=f"""
+                SELECT txn_ref, code, message
+                FROM ipn_outcomes
+                WHERE processed >= DATEADD(DAY, -{self.RETENTION_DAYS}, SYSUTCDATETIME())
+            """,
+            tables=("ipn_outcomes",),
+        )
+
+    def encode(self, row: Row) -> Tuple[Any, ...]:
+        return (*_digest(row.txn_ref), row.code.encode("ascii"), row.message.encode("utf-8"))
+
+    def decode(self, fields: Tuple[Any, ...]) -> Tuple[int, str, str]:
+        _, check, code, message = fields
+        return check, code.decode("ascii"), message.rstrip(b"\0").decode("utf-8")
+
+    def lookup(self, txn_ref: str) -> Optional[Tuple[str, str]]:
+        """Return the recorded response code and message of a transaction, or `None` if unknown.
+
+        Raises
+        -----
+        `CatalogUnavailable`
+            The catalog cannot be read.
+        """
+        key, check = _digest(txn_ref)
+        entry = self.get(key)
+        if entry is None or entry[0] != check:
+            return None
+
+        return entry[1], entry[2]
+
+
+IPNOutcomeCatalog.instance = IPNOutcomeCatalog()
+
+
+class IPNStore:
+    """A per-process singleton deduplicating VNPay IPN callbacks by transaction reference.
+
+    A callback is answered, in order, from:
+    1. The outcomes recorded by this worker (bounded by `CAPACITY`).
+    2. The outcomes recorded by any worker of this node (`IPNOutcomeCatalog`), which lag behind
+       other workers by the propagation delay of `InvalidationBus`.
+    3. `.outbox`: if the room and the fee exist and the fee is not paid yet (`PaymentStatus.get()`),
+       the transaction is durably queued and acknowledged with `QUEUED`, then applied with other
+       queued transactions by `Payment.create_many()`. Their outcomes are recorded in the
+       `ipn_outcomes` table for reconciliation, and answer the retries of the transaction. The
+       recorded response code of a queued transaction is always `"00"`, like its acknowledgement.
+    4. `Payment.create()`, shared by concurrent callbacks of the same transaction in this worker,
+       for the transactions that would be rejected, and when the outbox is not available (see
+       `DurableOutbox.start()`). Their rejection is recorded before it is answered.
+    """
+
+    CAPACITY: ClassVar[int] = 4096
+    QUEUED: ClassVar[Tuple[str, str]] = ("00", "Payment was queued")
+
+    instance: ClassVar[IPNStore]
+    __slots__ = (
+        "__outbox",
+        "__outcomes",
+        "__queued",
+        "__running",
+    )
+    if TYPE_CHECKING:
+        __outbox: DurableOutbox
+        __outcomes: OrderedDict[str, Tuple[str, str]]
+        __queued: Set[str]
+        __running: Dict[str, asyncio.Task[Optional[Tuple[str, str]]]]
+
+    def __init__(self) -> None:
+        self.__outbox = DurableOutbox("ipn", self.__apply)
+        self.__outcomes = OrderedDict()
+        self.__queued = set()
+        self.__running = {}
+        EventDispatcher.instance.add_listener("ipn_process", self.__on_ipn_process)
+
+    @property
+    def outbox(self) -> DurableOutbox:
+        """The durable queue of the transactions waiting to be applied."""
+        return self.__outbox
+
+    def __remember(self, txn_ref: str, outcome: Tuple[str, str]) -> None:
+        self.__outcomes[txn_ref] = outcome
+        self.__outcomes.move_to_end(txn_ref)
+        while len(self.__outcomes) > self.CAPACITY:
+            self.__outcomes.popitem(last=False)
+
+    def lookup(self, txn_ref: str) -> Optional[Tuple[str, str]]:
+        """Return the recorded response code and message of a transaction without querying the
+        database, or `None` if it is unknown to this node.
+        """
+        outcome = self.__outcomes.get(txn_ref)
+        if outcome is not None:
+            self.__outcomes.move_to_end(txn_ref)
+            return outcome
+
+        try:
+            outcome = IPNOutcomeCatalog.instance.lookup(txn_ref)
+        except CatalogUnavailable:
+            return None
+
+        if outcome is not None:
+            self.__remember(txn_ref, outcome)
+
+        return outcome
+
+    async def process(self, txn_ref: str, *, room: int, amount: float, fee_id: int) -> Optional[Tuple[str, str]]:
+        """This function is a coroutine.
+
+        Process a successful VNPay transaction at most once, and return its response code and message.
+        The response is `QUEUED` when the transaction is queued to be applied later.
+
+        Returns
+        -----
+        `Optional[Tuple[str, str]]`
+            The response code and message, or `None` if the outcome is unknown.
+        """
+        outcome = self.lookup(txn_ref)
+        if outcome is not None:
+            return outcome
+
+        if self.__outbox.started:
+            if txn_ref in self.__queued:
+                return self.QUEUED
+
+            # Only acknowledge the transactions whose payment is expected to be recorded
+            status = await PaymentStatus.get(room, fee_id)
+            if status is not None and status.payment is None:
+                await self.__outbox.append([txn_ref, room, amount, fee_id])
+                self.__queued.add(txn_ref)
+                return self.QUEUED
+
+        task = self.__running.get(txn_ref)
+        if task is None:
+            self.__running[txn_ref] = task = asyncio.create_task(Payment.create(room=room, amount=amount, fee_id=fee_id, txn_ref=txn_ref))
+            task.add_done_callback(lambda _: self.__running.pop(txn_ref, None))
+
+        outcome = await asyncio.shield(task)
+        if outcome is not None:
+            self.__remember(txn_ref, outcome)
+
+        return outcome
+
+    async def __apply(self, items: List[Any]) -> None:
+        # Retries may have been queued more than once, possibly by different workers
+        transactions = {item[0]: (item[0], item[1], item[2], item[3]) for item in items}
+        outcomes = await Payment.create_many(list(transactions.values()), acknowledged=True)
+        self.__queued.difference_update(transactions)
+
+        # Replayed outcomes do not dispatch `ipn_process`
+        for txn_ref, outcome in outcomes.items():
+            self.__remember(txn_ref, outcome)
+
+        codes: Dict[str, int] = {}
+        for code, _ in outcomes.values():
+            codes[code] = codes.get(code, 0) + 1
+
+        logger.info(f"Applied {len(transactions)} queued IPN transaction(s): {codes}")
+
+    def __on_ipn_process(self, txn_ref: str, code: str, message: str) -> None:
+        self.__remember(txn_ref, (code, message))
+
+
+IPNStore.instance = IPNStore()
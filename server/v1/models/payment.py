@@ -1,12 +1,25 @@
 from __future__ import annotations
 
+import itertools
+from typing import Annotated, Dict, List, Optional, Sequence, Tuple
+
+import pydantic
 from pyodbc import Row  # type: ignore
 
+from .results import Result
 from .snowflake import Snowflake
 from ...database import Database
+from ...events import EventDispatcher
+
 
+__all__ = ("OfflinePayment", "Payment")
 
-__all__ = ("Payment",)
+
+class OfflinePayment(pydantic.BaseModel):
+    """Data model for a payment collected by an administrator, e.g. in cash or by bank transfer"""
+    room: Annotated[int, pydantic.Field(description="The room that paid the fee")]
+    fee_id: Annotated[int, pydantic.Field(description="The ID of the paid fee")]
+    amount: Annotated[float, pydantic.Field(description="The paid amount, in VND", ge=0)]
 
 
 class Payment(Snowflake):
@@ -29,12 +42,155 @@ class Payment(Snowflake):
         )
 
     @classmethod
-    async def create(cls, *, room: int, amount: float, fee_id: int) -> None:
+    async def create(
+        cls,
+        *,
+        room: int,
+        amount: float,
+        fee_id: int,
+        txn_ref: Optional[str] = None,
+    ) -> Optional[Tuple[str, str]]:
+        """This function is a coroutine.
+
+        Record a payment of a room for a fee.
+
+        Parameters
+        -----
+        txn_ref: `Optional[str]`
+            The VNPay transaction reference of this payment. If this transaction has already been
+            processed, its recorded outcome is returned again.
+
+        Returns
+        -----
+        `Optional[Tuple[str, str]]`
+            The VNPay response code and message describing the outcome (`"00"` on success), or `None`
+            if the procedure did not report one.
+        """
         async with Database.instance.pool.acquire() as connection:
             async with connection.cursor() as cursor:
-                await cursor.execute(
-                    "EXECUTE CreatePayment @Room = ?, @Amount = ?, @FeeId = ?",
+                await Database.instance.execute(
+                    cursor,
+                    "EXECUTE CreatePayment @Room = ?, @Amount = ?, @FeeId = ?, @TxnRef = ?",
                     room,
-                    int(100 * amount),
+                    round(100 * amount),
                     fee_id,
+                    txn_ref,
                 )  # This stored procedure returns a VNPay response
+
+                row = await cursor.fetchone()
+
+        if row is None:
+            return None
+
+        if not row.replayed:
+            if row.code == "00":
+                EventDispatcher.instance.dispatch("payment_create", room, fee_id, amount)
+
+            if txn_ref is not None:
+                EventDispatcher.instance.dispatch("ipn_process", txn_ref, row.code, row.message)
+
+        return row.code, row.message
+
+    @classmethod
+    async def create_many(
+        cls,
+        transactions: Sequence[Tuple[str, int, float, int]],
+        *,
+        acknowledged: bool = False,
+    ) -> Dict[str, Tuple[str, str]]:
+        """This function is a coroutine.
+
+        Record the payments of a batch of VNPay transactions, with one set-based transaction per
+        500 of them. Each transaction is processed at most once, as in `.create()`.
+
+        Parameters
+        -----
+        transactions: `Sequence[Tuple[str, int, float, int]]`
+            The transaction reference, room, amount and fee ID of each payment. Transaction
+            references must be unique.
+        acknowledged: `bool`
+            Whether VNPay was already answered `"00"` for these transactions. Their recorded response
+            code is then `"00"` even if the payment could not be recorded, and the message tells why.
+
+        Returns
+        -----
+        `Dict[str, Tuple[str, str]]`
+            The VNPay response code and message describing the outcome of each transaction.
+        """
+        outcomes: Dict[str, Tuple[str, str]] = {}
+
+        # 4 parameters per transaction, within the limit of 2100 parameters per request
+        for batch in itertools.batched(transactions, 500):
+            array = ", ".join(itertools.repeat("(?, ?, ?, ?)", len(batch)))
+            async with Database.instance.pool.acquire() as connection:
+                async with connection.cursor() as cursor:
+                    await Database.instance.execute(
+                        cursor,
+                        f"""
+                            SET NOCOUNT ON
+                            DECLARE @Payments PAYMENTARRAY
+                            INSERT INTO @Payments VALUES {array}
+                            EXECUTE CreatePayments @Payments = @Payments, @Acknowledged = ?
+                        """,
+                        *itertools.chain.from_iterable(
+                            (txn_ref, room, round(100 * amount), fee_id)
+                            for txn_ref, room, amount, fee_id in batch
+                        ),
+                        acknowledged,
+                    )
+
+                    rows = await cursor.fetchall()
+
+            for row in rows:
+                outcomes[row.txn_ref] = row.code, row.message
+                if not row.replayed:
+                    if row.created:
+                        EventDispatcher.instance.dispatch("payment_create", row.room, row.fee_id, row.amount / 100)
+
+                    EventDispatcher.instance.dispatch("ipn_process", row.txn_ref, row.code, row.message)
+
+        return outcomes
+
+    @classmethod
+    async def create_offline(cls, payments: Sequence[OfflinePayment]) -> List[Result[Optional[Payment]]]:
+        """This function is a coroutine.
+
+        Record payments collected by administrators, with one set-based transaction per 500 of them.
+
+        Returns
+        -----
+        `List[Result[Optional[Payment]]]`
+            The outcome of each payment, in the same order: the created payment, or one of the codes
+            701 (invalid room), 702 (invalid fee), 703 (amount out of the fee bounds) or 704 (already paid).
+        """
+        results: List[Result[Optional[Payment]]] = []
+
+        async with Database.instance.pool.acquire() as connection:
+            async with connection.cursor() as cursor:
+                # 4 parameters per payment, within the limit of 2100 parameters per request
+                for start in range(0, len(payments), 500):
+                    batch = payments[start:start + 500]
+                    array = ", ".join(itertools.repeat("(?, ?, ?, ?)", len(batch)))
+                    await Database.instance.execute(
+                        cursor,
+                        f"""
+                            SET NOCOUNT ON
+                            DECLARE @Payments OFFLINEPAYMENTARRAY
+                            INSERT INTO @Payments VALUES {array}
+                            EXECUTE CreateOfflinePayments @Payments = @Payments
+                        """,
+                        *itertools.chain.from_iterable(
+                            (start + index, p.room, round(100 * p.amount), p.fee_id)
+                            for index, p in enumerate(batch)
+                        ),
+                    )
+
+                    for row in await cursor.fetchall():
+                        if row.code == 0:
+                            payment = cls.from_row(row)
+                            EventDispatcher.instance.dispatch("payment_create", payment.room, payment.fee_id, payment.amount)
+                            results.append(Result(data=payment))
+                        else:
+                            results.append(Result(code=row.code, data=None))
+
+        return results
@@ -9,8 +9,9 @@ from pyodbc import Row  # type: ignore
 from .fee import Fee
 from .payment import Payment
 from .results import Result
-from .rooms import Room
-from ...config import DB_PAGINATION_QUERY, EPOCH
+from .rooms import RoomCatalog
+from ...cache import single_flight
+from ...config import DB_PAGINATION_QUERY, EPOCH, SINGLE_FLIGHT_TTL
 from ...database import Database
 
 
@@ -60,7 +61,21 @@ class PaymentStatus(pydantic.BaseModel):
             room=row.room,
         )
 
+    @classmethod
+    async def get(cls, room: int, fee_id: int) -> Optional[PaymentStatus]:
+        """This function is a coroutine.
+
+        Return the payment status of a room for a fee, or `None` if the room or the fee does not exist.
+        """
+        async with Database.instance.pool.acquire() as connection:
+            async with connection.cursor() as cursor:
+                await cursor.execute("EXECUTE QueryRoomFeeStatus @Room = ?, @FeeId = ?", room, fee_id)
+                row = await cursor.fetchone()
+
+        return None if row is None else cls.from_row(row)
+
     @staticmethod
+    @single_flight(ttl=SINGLE_FLIGHT_TTL, tables=("fees", "payments", "rooms"))
     async def count(
         room: Optional[int],
         *,
@@ -68,13 +83,15 @@ class PaymentStatus(pydantic.BaseModel):
         created_after: datetime,
         created_before: datetime,
     ) -> Result[Optional[int]]:
-        if room is not None:
-            matching_rooms = await Room.query(offset=0, room=room)
-            if len(matching_rooms) == 0 or not matching_rooms[0].has_data:
-                return Result(code=606, data=None)
+        if room is not None and not await RoomCatalog.instance.exists(room):
+            return Result(code=606, data=None)
+
+        created_after = max(created_after.astimezone(timezone.utc), EPOCH)
+        created_before = max(created_before.astimezone(timezone.utc), EPOCH)
 
         async with Database.instance.pool.acquire() as connection:
             async with connection.cursor() as cursor:
+                # Sums counters bucketed by day of fee creation, see CountPaymentStatus
                 await cursor.execute(
                     """
                         EXECUTE CountPaymentStatus
@@ -92,6 +109,7 @@ class PaymentStatus(pydantic.BaseModel):
                 return Result(data=await cursor.fetchval())
 
     @classmethod
+    @single_flight(ttl=SINGLE_FLIGHT_TTL, tables=("fees", "payments", "rooms"))
     async def query(
         cls,
         room: Optional[int],
@@ -101,10 +119,8 @@ class PaymentStatus(pydantic.BaseModel):
         created_after: datetime,
         created_before: datetime,
     ) -> Result[Optional[List[PaymentStatus]]]:
-        if room is not None:
-            matching_rooms = await Room.query(offset=0, room=room)
-            if len(matching_rooms) == 0 or not matching_rooms[0].has_data:
-                return Result(code=606, data=None)
+        if room is not None and not await RoomCatalog.instance.exists(room):
+            return Result(code=606, data=None)
 
         created_after = max(created_after.astimezone(timezone.utc), EPOCH)
         created_before = max(created_before.astimezone(timezone.utc), EPOCH)
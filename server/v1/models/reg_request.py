@@ -5,10 +5,13 @@ from datetime import date, datetime, timezone
 from typing import List, Literal, Optional, Sequence
 
 from .accounts import Account
+from .residents import Resident
 from .results import Result
 from .snowflake import Snowflake
-from ...config import DB_PAGINATION_QUERY, EPOCH
+from ...cache import single_flight
+from ...config import DB_PAGINATION_QUERY, EPOCH, SINGLE_FLIGHT_TTL
 from ...database import Database
+from ...events import EventDispatcher
 from ...utils import (
     hash_password,
     validate_name,
@@ -29,6 +32,7 @@ class RegisterRequest(Account):
     Each object of this class corresponds to a database row."""
 
     @staticmethod
+    @single_flight(ttl=SINGLE_FLIGHT_TTL, tables=("registration_requests",))
     async def count(
         *,
         created_after: datetime,
@@ -67,12 +71,14 @@ class RegisterRequest(Account):
         if len(objects) == 0:
             return
 
+        approved: List[Resident] = []
         for batch in itertools.batched(objects, 1000):
             array = ", ".join(itertools.repeat("(?)", len(batch)))
             async with Database.instance.pool.acquire() as connection:
                 async with connection.cursor() as cursor:
                     await cursor.execute(
                         f"""
+                            SET NOCOUNT ON
                             DECLARE @Id BIGINTARRAY
                             INSERT INTO @Id VALUES {array}
                             EXECUTE ApproveRegistrationRequests @Id = @Id
@@ -80,6 +86,11 @@ class RegisterRequest(Account):
                         *[o.id for o in batch],
                     )
 
+                    rows = await cursor.fetchall()
+                    approved.extend(Resident.from_row(row) for row in rows)
+
+        EventDispatcher.instance.dispatch("residents_approve", approved)
+
     @classmethod
     async def reject_many(cls, objects: Sequence[Snowflake]) -> None:
         if len(objects) == 0:
@@ -98,6 +109,8 @@ class RegisterRequest(Account):
                         *[o.id for o in batch],
                     )
 
+        EventDispatcher.instance.dispatch("reg_requests_reject", [o.id for o in objects])
+
     @classmethod
     async def create(
         cls,
@@ -137,7 +150,8 @@ class RegisterRequest(Account):
 
         async with Database.instance.pool.acquire() as connection:
             async with connection.cursor() as cursor:
-                await cursor.execute(
+                await Database.instance.execute(
+                    cursor,
                     """
                         EXECUTE Register
                             @Name = ?,
@@ -159,11 +173,14 @@ class RegisterRequest(Account):
 
                 row = await cursor.fetchone()
                 if row is not None:
-                    return Result(data=cls.from_row(row))
+                    request = cls.from_row(row)
+                    EventDispatcher.instance.dispatch("reg_request_create", request)
+                    return Result(data=request)
 
         return Result(code=107, data=None)
 
     @classmethod
+    @single_flight(ttl=SINGLE_FLIGHT_TTL, tables=("registration_requests",))
     async def query(
         cls,
         *,
@@ -180,12 +197,9 @@ class RegisterRequest(Account):
             return []
 
         where, params = _packed
-        where.append("approved = 0")
-
-        query = [
-            "SELECT * FROM accounts",
-            "WHERE " + " AND ".join(where),
-        ]
+        query = ["SELECT * FROM registration_requests"]
+        if len(where) > 0:
+            query.append("WHERE " + " AND ".join(where))
 
         if order_by not in {"id", "name", "room", "username"}:
             order_by = "id"
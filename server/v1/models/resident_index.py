@@ -0,0 +1,438 @@
+from __future__ import annotations
+
+import asyncio
+import bisect
+import heapq
+import itertools
+import logging
+import operator
+import re
+from typing import Any, ClassVar, Dict, Iterable, List, Optional, Sequence, Set, Tuple, TYPE_CHECKING
+
+from .info import PublicInfo
+from .residents import Resident
+from ...bus import InvalidationBus
+from ...database import Database
+from ...events import EventDispatcher
+from ...utils import fold_accents
+
+
+__all__ = ("ResidentIndex",)
+logger = logging.getLogger("uvicorn")
+_TOKEN = re.compile(r"\w+")
+_ID = operator.itemgetter(1)
+
+
+def _tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(fold_accents(text))
+
+
+def _discard(array: List[Any], value: Any) -> None:
+    # Remove `value` from a sorted list if it is present
+    index = bisect.bisect_left(array, value)
+    if index < len(array) and array[index] == value:
+        del array[index]
+
+
+class ResidentIndex:
+    """A per-worker in-memory index of approved residents for typeahead suggestions.
+
+    Each resident is indexed by the accent-folded tokens of their name, their username and their
+    room number. A query matches a resident when every query token is a prefix of at least one of
+    the resident's tokens, so `"ng an"` matches `"Nguyễn Văn An"`.
+
+    The index is loaded once with `.prepare()` and then kept up to date from the model-layer
+    write events dispatched through `EventDispatcher`. The IDs of these residents are also inserted
+    in the `account_changes` table, which is announced to the other workers through `InvalidationBus`.
+    Every worker then reads the new rows in id order and fetches only the changed accounts.
+    Local events received while a fetch is pending are applied again after it.
+    """
+
+    # A query term whose prefix matches at most this many residents is expanded eagerly
+    SELECTIVE_THRESHOLD: ClassVar[int] = 500
+    # Otherwise, up to this many postings are merged lazily in name order...
+    MERGE_LIMIT: ClassVar[int] = 64
+    # ...and walked for at most this many steps before falling back to set intersection
+    WALK_LIMIT: ClassVar[int] = 1000
+    # Rows per INSERT and per SELECT of account changes
+    BATCH_SIZE: ClassVar[int] = 1000
+
+    instance: ClassVar[ResidentIndex]
+    __slots__ = (
+        "__entries",
+        "__fetcher",
+        "__keys",
+        "__last",
+        "__order",
+        "__pending",
+        "__postings",
+        "__prepared",
+        "__recent",
+        "__refetch",
+        "__writer",
+    )
+    if TYPE_CHECKING:
+        __entries: Dict[int, Tuple[Tuple[str, int], Tuple[str, ...], PublicInfo]]
+        __fetcher: Optional[asyncio.Task[None]]
+        __keys: List[str]
+        __last: int
+        __order: List[Tuple[str, int]]
+        __pending: List[int]
+        __postings: Dict[str, List[Tuple[str, int]]]
+        __prepared: bool
+        __recent: Optional[Dict[int, Optional[PublicInfo]]]
+        __refetch: bool
+        __writer: Optional[asyncio.Task[None]]
+
+    def __init__(self) -> None:
+        self.__entries = {}  # id -> ((folded name, id), tokens, info)
+        self.__fetcher = None
+        self.__keys = []  # sorted keys of self.__postings
+        self.__last = 0  # last id of account_changes read
+        self.__order = []  # sorted (folded name, id) of all residents
+        self.__pending = []  # IDs of locally changed residents to insert in account_changes
+        self.__postings = {}  # token -> sorted (folded name, id) of residents having that token
+        self.__prepared = False
+        self.__recent = None  # id -> resident (None if removed) of the local events during a fetch
+        self.__refetch = False
+        self.__writer = None
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    async def prepare(self) -> None:
+        """This function is a coroutine.
+
+        Load all approved residents from the database and start listening to write events.
+        If the index is already prepared, this function does nothing.
+        """
+        if self.__prepared:
+            return
+
+        self.__prepared = True
+
+        dispatcher = EventDispatcher.instance
+        dispatcher.add_listener("residents_approve", self.__on_residents_approve)
+        dispatcher.add_listener("resident_update", self.__on_resident_update)
+        dispatcher.add_listener("residents_delete", self.__on_residents_delete)
+
+        self.__recent = {}
+        try:
+            async with Database.instance.pool.acquire() as connection:
+                async with connection.cursor() as cursor:
+                    # Changes committed after this id are fetched again at the next remote change
+                    await cursor.execute("SELECT ISNULL(MAX(id), 0) FROM account_changes")
+                    self.__last = await cursor.fetchval()
+
+                    await cursor.execute("SELECT * FROM accounts WHERE approved = 1")
+                    rows = await cursor.fetchall()
+
+            # Bulk load: append unordered, then sort everything once
+            self.__clear()
+            for row in rows:
+                self.__insert(Resident.from_row(row), ordered=False)
+
+            self.__keys.sort()
+            self.__order.sort()
+            for postings in self.__postings.values():
+                postings.sort()
+
+            self.__replay()
+
+        finally:
+            self.__recent = None
+
+        InvalidationBus.instance.subscribe("account_changes", self.__on_remote_change, local=False)
+
+    async def close(self) -> None:
+        """This function is a coroutine.
+
+        Publish the pending changes, stop listening to write events and clear the index.
+        """
+        dispatcher = EventDispatcher.instance
+        dispatcher.remove_listener("residents_approve", self.__on_residents_approve)
+        dispatcher.remove_listener("resident_update", self.__on_resident_update)
+        dispatcher.remove_listener("residents_delete", self.__on_residents_delete)
+        InvalidationBus.instance.unsubscribe("account_changes", self.__on_remote_change)
+
+        if self.__writer is not None:
+            await self.__writer
+
+        if self.__fetcher is not None:
+            self.__fetcher.cancel()
+            self.__fetcher = None
+
+        self.__clear()
+        self.__prepared = False
+
+    def __apply(self, id: int, resident: Optional[PublicInfo]) -> None:
+        if resident is None:
+            self.remove(id)
+        else:
+            self.add(resident)
+
+    def __replay(self) -> None:
+        # Local events received during a fetch are newer than (or as new as) the fetched rows
+        if self.__recent is not None:
+            for id, resident in self.__recent.items():
+                self.__apply(id, resident)
+
+    def __changed(self, residents: Iterable[Tuple[int, Optional[PublicInfo]]]) -> None:
+        for id, resident in residents:
+            self.__apply(id, resident)
+            if self.__recent is not None:
+                self.__recent[id] = resident
+
+            self.__pending.append(id)
+
+        if self.__writer is None and len(self.__pending) > 0:
+            self.__writer = asyncio.create_task(self.__write())
+
+    async def __write(self) -> None:
+        try:
+            while len(self.__pending) > 0:
+                batch = self.__pending[:self.BATCH_SIZE]
+                del self.__pending[:self.BATCH_SIZE]
+
+                values = ", ".join("(?, SYSUTCDATETIME())" for _ in batch)
+                async with Database.instance.pool.acquire() as connection:
+                    async with connection.cursor() as cursor:
+                        # The exclusive lock commits ids in order, see migration 0016
+                        await cursor.execute(
+                            f"INSERT INTO account_changes WITH (TABLOCKX) (account, created) VALUES {values}",
+                            *batch,
+                        )
+
+                InvalidationBus.instance.publish("account_changes")
+
+        except Exception:
+            logger.exception("Unable to publish resident changes to other workers")
+
+        finally:
+            self.__writer = None
+
+    async def __fetch(self) -> None:
+        try:
+            self.__refetch = True
+            while self.__refetch:
+                self.__refetch = False
+                while True:
+                    self.__recent = {}
+                    async with Database.instance.pool.acquire() as connection:
+                        async with connection.cursor() as cursor:
+                            await cursor.execute(
+                                "SELECT TOP (?) id, account FROM account_changes WHERE id > ? ORDER BY id",
+                                self.BATCH_SIZE,
+                                self.__last,
+                            )
+                            changes = await cursor.fetchall()
+
+                            ids = list(dict.fromkeys(row.account for row in changes))
+                            rows: List[Any] = []
+                            if len(ids) > 0:
+                                array = ", ".join(itertools.repeat("(?)", len(ids)))
+                                await cursor.execute(
+                                    f"""
+                                        SET NOCOUNT ON
+                                        DECLARE @Id BIGINTARRAY
+                                        INSERT INTO @Id VALUES {array}
+                                        SELECT * FROM accounts WHERE approved = 1 AND id IN (SELECT value FROM @Id)
+                                    """,
+                                    *ids,
+                                )
+                                rows = await cursor.fetchall()
+
+                    # Accounts not found were deleted, or are not approved
+                    found = {row.id: Resident.from_row(row) for row in rows}
+                    for id in ids:
+                        self.__apply(id, found.get(id))
+
+                    self.__replay()
+                    self.__recent = None
+                    if len(changes) > 0:
+                        self.__last = changes[-1].id
+
+                    if len(changes) < self.BATCH_SIZE:
+                        break
+
+        except Exception:
+            logger.exception("Unable to fetch resident changes of other workers")
+
+        finally:
+            self.__recent = None
+            self.__fetcher = None
+
+    def __clear(self) -> None:
+        self.__entries.clear()
+        self.__keys.clear()
+        self.__order.clear()
+        self.__postings.clear()
+
+    def __insert(self, resident: PublicInfo, *, ordered: bool) -> None:
+        tokens = [*_tokenize(resident.name), str(resident.room)]
+        if isinstance(resident, Resident):
+            tokens.append(fold_accents(resident.username))
+            tokens.extend(_tokenize(resident.username))
+
+        key = (fold_accents(resident.name), resident.id)
+        unique = tuple(dict.fromkeys(tokens))
+        self.__entries[resident.id] = (key, unique, resident.to_public_info())
+
+        insert = bisect.insort if ordered else list.append
+        insert(self.__order, key)
+        for token in unique:
+            postings = self.__postings.get(token)
+            if postings is None:
+                self.__postings[token] = postings = []
+                insert(self.__keys, token)
+
+            insert(postings, key)
+
+    def add(self, resident: PublicInfo) -> None:
+        """Add a resident to the index, replacing any existing entry with the same ID."""
+        self.remove(resident.id)
+        self.__insert(resident, ordered=True)
+
+    def remove(self, id: int) -> None:
+        """Remove a resident from the index. Unknown IDs are ignored."""
+        entry = self.__entries.pop(id, None)
+        if entry is None:
+            return
+
+        key, tokens, _ = entry
+        _discard(self.__order, key)
+        for token in tokens:
+            postings = self.__postings[token]
+            _discard(postings, key)
+            if len(postings) == 0:
+                del self.__postings[token]
+                _discard(self.__keys, token)
+
+    def get(self, id: int) -> Optional[PublicInfo]:
+        """Return the indexed information of a resident, or `None` if it is not indexed."""
+        entry = self.__entries.get(id)
+        return None if entry is None else entry[2]
+
+    def __range(self, prefix: str) -> range:
+        # Indices of self.__keys starting with `prefix`
+        keys = self.__keys
+        return range(
+            bisect.bisect_left(keys, prefix),
+            bisect.bisect_left(keys, prefix + "\U0010ffff"),
+        )
+
+    def __expand(self, keys: range) -> Optional[Set[Tuple[str, int]]]:
+        # Collect the residents within the postings of `keys`, or return `None` as soon as they
+        # may exceed the selective threshold.
+        result: Set[Tuple[str, int]] = set()
+        for index in keys:
+            postings = self.__postings[self.__keys[index]]
+            if len(result) + len(postings) > self.SELECTIVE_THRESHOLD:
+                return None
+
+            result.update(postings)
+
+        return result
+
+    def __ids(self, keys: range) -> Set[int]:
+        # Collect the IDs of all residents within the postings of `keys`
+        result: Set[int] = set()
+        for index in keys:
+            result.update(map(_ID, self.__postings[self.__keys[index]]))
+
+        return result
+
+    def __matches(self, id: int, terms: Sequence[str]) -> bool:
+        tokens = self.__entries[id][1]
+        return all(any(token.startswith(term) for token in tokens) for term in terms)
+
+    def suggest(self, query: str, *, limit: int) -> List[PublicInfo]:
+        """Return at most `limit` residents matching `query`, ordered by name.
+
+        Parameters
+        -----
+        query: `str`
+            The text typed so far. Case and diacritics are ignored.
+        limit: `int`
+            The maximum number of suggestions to return.
+
+        Returns
+        -----
+        `List[PublicInfo]`
+            The matching residents.
+        """
+        terms = list(dict.fromkeys(_tokenize(query)))
+        if len(terms) == 0 or limit <= 0:
+            return []
+
+        ranges = {term: self.__range(term) for term in terms}
+        entries = self.__entries
+
+        # 1. A selective term: expand it and filter its candidates against the other terms
+        for term in sorted(terms, key=lambda t: len(ranges[t])):
+            candidates = self.__expand(ranges[term])
+            if candidates is not None:
+                others = [t for t in terms if t != term]
+                found = [key for key in candidates if self.__matches(key[1], others)]
+                return [entries[id][2] for _, id in heapq.nsmallest(limit, found)]
+
+        # 2. Every term is broad, so matches are usually dense: walk residents in name order through
+        # the smallest postings spanning a few tokens (or through all residents), for a bounded number of steps.
+        stream: Iterable[Tuple[str, int]] = self.__order
+        others = terms
+        size = len(self.__order)
+        for term in terms:
+            keys = ranges[term]
+            if len(keys) <= self.MERGE_LIMIT:
+                postings = [self.__postings[self.__keys[index]] for index in keys]
+                total = sum(map(len, postings))
+                if total < size:
+                    stream = heapq.merge(*postings)
+                    others = [t for t in terms if t != term]
+                    size = total
+
+        result: List[PublicInfo] = []
+        last: Optional[Tuple[str, int]] = None
+        for key in itertools.islice(stream, self.WALK_LIMIT):
+            if key != last and self.__matches(key[1], others):
+                result.append(entries[key[1]][2])
+                if len(result) == limit:
+                    return result
+
+            last = key
+
+        if size <= self.WALK_LIMIT:
+            return result
+
+        # 3. Sparse intersection of broad terms: start from the term spanning the fewest tokens and
+        # narrow down, using set intersections while the candidates are still numerous.
+        terms.sort(key=lambda t: len(ranges[t]))
+        matches = self.__ids(ranges[terms[0]])
+        for index, term in enumerate(terms[1:], start=1):
+            keys = ranges[term]
+            if len(matches) < len(keys) or len(matches) <= self.SELECTIVE_THRESHOLD:
+                others = terms[index:]
+                matches = {id for id in matches if self.__matches(id, others)}
+                break
+
+            matches.intersection_update(self.__ids(keys))
+
+        return [entries[id][2] for _, id in heapq.nsmallest(limit, (entries[id][0] for id in matches))]
+
+    def __on_residents_approve(self, residents: Sequence[Resident]) -> None:
+        self.__changed((resident.id, resident) for resident in residents)
+
+    def __on_resident_update(self, resident: Resident) -> None:
+        self.__changed([(resident.id, resident)])
+
+    def __on_residents_delete(self, ids: Sequence[int]) -> None:
+        self.__changed((id, None) for id in ids)
+
+    def __on_remote_change(self, _: str) -> None:
+        if self.__fetcher is None:
+            self.__fetcher = asyncio.create_task(self.__fetch())
+        else:
+            self.__refetch = True
+
+
+ResidentIndex.instance = ResidentIndex()
@@ -15,6 +15,7 @@ from .results import Result
 from .snowflake import Snowflake
 from ...config import DB_PAGINATION_QUERY, EPOCH
 from ...database import Database
+from ...events import EventDispatcher
 from ...utils import (
     check_password,
     hash_password,
@@ -50,7 +51,9 @@ class Resident(Account):
 
                 row = await cursor.fetchone()
                 if row is not None:
-                    return Result(data=Resident.from_row(row))
+                    resident = Resident.from_row(row)
+                    EventDispatcher.instance.dispatch("resident_update", resident)
+                    return Result(data=resident)
 
         return Result(code=107, data=None)
 
@@ -109,6 +112,8 @@ class Resident(Account):
                         *[o.id for o in batch],
                     )
 
+        EventDispatcher.instance.dispatch("residents_delete", [o.id for o in objects])
+
     @staticmethod
     async def count(
         *,
@@ -198,6 +203,8 @@ class Resident(Account):
 
                 row = await cursor.fetchone()
                 if row is not None:
-                    return Result(data=cls.from_row(row))
+                    resident = cls.from_row(row)
+                    EventDispatcher.instance.dispatch("resident_update", resident)
+                    return Result(data=resident)
 
         return Result(code=301, data=None)
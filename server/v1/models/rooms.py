@@ -1,18 +1,22 @@
 from __future__ import annotations
 
 import itertools
-from typing import Annotated, List, Optional
+import struct
+from typing import Annotated, Any, ClassVar, List, Optional, Tuple
 
 import pydantic
 from pyodbc import Row  # type: ignore
 
 from .results import Result
-from ...config import DB_PAGINATION_QUERY
+from ...cache import single_flight
+from ...catalog import CatalogUnavailable, SharedCatalog
+from ...config import DB_PAGINATION_QUERY, SINGLE_FLIGHT_TTL
 from ...database import Database
+from ...events import EventDispatcher
 from ...utils import validate_room
 
 
-__all__ = ("RoomData", "Room")
+__all__ = ("RoomData", "Room", "RoomCatalog")
 
 
 class RoomData(pydantic.BaseModel):
@@ -85,12 +89,13 @@ class RoomData(pydantic.BaseModel):
                         SET area = @Area, motorbike = @Motorbike, car = @Car
                         WHERE room = @Room
                     ELSE
-                        INSERT INTO rooms
+                        INSERT INTO rooms (room, area, motorbike, car)
                         VALUES (@Room, @Area, @Motorbike, @Car)
                     """,
                     [(r.room, int(100 * r.area), r.motorbike, r.car) for r in rooms],
                 )
 
+        EventDispatcher.instance.dispatch("rooms_update", rooms)
         return None
 
     @staticmethod
@@ -120,6 +125,8 @@ class RoomData(pydantic.BaseModel):
                         *batch,
                     )
 
+        EventDispatcher.instance.dispatch("rooms_delete", rooms)
+
 
 class Room(pydantic.BaseModel):
     """Data model for objects holding room information.
@@ -149,6 +156,7 @@ class Room(pydantic.BaseModel):
         )
 
     @staticmethod
+    @single_flight(ttl=SINGLE_FLIGHT_TTL, tables=("accounts", "rooms"))
     async def count(
         *,
         room: Optional[int] = None,
@@ -160,6 +168,7 @@ class Room(pydantic.BaseModel):
                 return await cursor.fetchval()
 
     @classmethod
+    @single_flight(ttl=SINGLE_FLIGHT_TTL, tables=("accounts", "rooms"))
     async def query(
         cls,
         *,
@@ -203,3 +212,44 @@ class Room(pydantic.BaseModel):
 
                 rows = await cursor.fetchall()
                 return [cls.from_row(row) for row in rows]
+
+
+class RoomCatalog(SharedCatalog[RoomData]):
+    """The `rooms` table shared by all workers of a node, see `SharedCatalog`."""
+
+    instance: ClassVar[RoomCatalog]
+    __slots__ = ()
+
+    def __init__(self) -> None:
+        super().__init__(
+            "rooms",
+            record=struct.Struct("<hiBB"),  # room, area, motorbike, car
+            query="SELECT room, area, motorbike, car FROM rooms",
+            tables=("rooms",),
+        )
+
+    def encode(self, row: Row) -> Tuple[Any, ...]:
+        return (row.room, row.area, row.motorbike, row.car)
+
+    def decode(self, fields: Tuple[Any, ...]) -> RoomData:
+        room, area, motorbike, car = fields
+        return RoomData(room=room, area=area / 100, motorbike=motorbike, car=car)
+
+    async def exists(self, room: int) -> bool:
+        """This function is a coroutine.
+
+        Return whether `room` has information. Rooms missing from the catalog, which may lag behind
+        recent changes, are confirmed against the database.
+        """
+        try:
+            if self.get(room) is not None:
+                return True
+
+        except CatalogUnavailable:
+            pass
+
+        matching_rooms = await Room.query(offset=0, room=room)
+        return len(matching_rooms) > 0 and matching_rooms[0].has_data
+
+
+RoomCatalog.instance = RoomCatalog()
@@ -1,4 +1,8 @@
+from .bills import *
+from .dashboard import *
+from .events import *
 from .fees import *
+from .floors import *
 from .login import *
 from .password import *
 from .registration_requests import *
@@ -0,0 +1,3 @@
+from .count import *
+from .import_readings import *
+from .root import *
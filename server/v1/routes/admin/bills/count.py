@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+from datetime import date, datetime, timezone
+from typing import Annotated, Optional
+
+from fastapi import Depends, Query, Response, status
+
+from ....app import api_v1
+from ....models import AdminPermission, Bill, Result
+from .....config import EPOCH
+
+
+__all__ = ("admin_bills_count",)
+
+
+@api_v1.get(
+    "/admin/bills/count",
+    name="Bill count",
+    description="Count the number of utility bills",
+    tags=["admin"],
+    responses={
+        status.HTTP_200_OK: {
+            "description": "Number of bills",
+            "model": Result[int],
+        },
+        status.HTTP_400_BAD_REQUEST: {
+            "description": "Incorrect authorization data",
+            "model": Result[None],
+        },
+    },
+    status_code=status.HTTP_200_OK,
+)
+async def admin_bills_count(
+    admin: Annotated[AdminPermission, Depends(AdminPermission.from_token)],
+    response: Response,
+    *,
+    room: Annotated[Optional[int], Query(description="Count bills of this room only")] = None,
+    month_from: Annotated[date, Query(description="Count bills from this month")] = EPOCH.date(),
+    month_to: Annotated[
+        date,
+        Query(
+            description="Count bills until this month (inclusive)",
+            default_factory=lambda: datetime.now(timezone.utc).date(),
+        ),
+    ],
+) -> Result[Optional[int]]:
+    if admin.admin:
+        return Result(data=await Bill.count(room=room, month_from=month_from, month_to=month_to))
+
+    response.status_code = status.HTTP_400_BAD_REQUEST
+    return Result(code=401, data=None)
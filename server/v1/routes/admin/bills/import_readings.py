@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from typing import Annotated, Literal, Optional
+
+from fastapi import Depends, Query, Request, Response, status
+
+from ....app import api_v1
+from ....models import AdminPermission, Bill, BillImport, Result
+
+
+__all__ = ("admin_bills_import",)
+
+
+@api_v1.post(
+    "/admin/bills/import",
+    name="Meter readings import",
+    description="Create or update utility bills from meter readings sent as the request body, either CSV with a `room,month,type,amount` header or NDJSON objects with these keys. The body is streamed, and the readings are applied in a single transaction.",
+    tags=["admin"],
+    responses={
+        status.HTTP_200_OK: {
+            "description": "The outcome of the import",
+            "model": Result[BillImport],
+        },
+        status.HTTP_400_BAD_REQUEST: {
+            "description": "Incorrect authorization data",
+            "model": Result[None],
+        },
+    },
+    status_code=status.HTTP_200_OK,
+)
+async def admin_bills_import(
+    admin: Annotated[AdminPermission, Depends(AdminPermission.from_token)],
+    request: Request,
+    response: Response,
+    format: Annotated[Literal["csv", "ndjson"], Query(description="The format of the request body")] = "csv",
+) -> Result[Optional[BillImport]]:
+    if admin.admin:
+        return Result(data=await Bill.import_readings(request.stream(), format=format))
+
+    response.status_code = status.HTTP_400_BAD_REQUEST
+    return Result(code=401, data=None)
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+from datetime import date, datetime, timezone
+from typing import Annotated, List, Optional
+
+from fastapi import Depends, Query, Response, status
+
+from ....app import api_v1
+from ....models import AdminPermission, Bill, Result
+from .....config import EPOCH
+
+
+__all__ = ("admin_bills",)
+
+
+@api_v1.get(
+    "/admin/bills",
+    name="Bill query",
+    description="Query a list of utility bills, the most recent months first",
+    tags=["admin"],
+    responses={
+        status.HTTP_200_OK: {
+            "description": "List of bills",
+            "model": Result[List[Bill]],
+        },
+        status.HTTP_400_BAD_REQUEST: {
+            "description": "Incorrect authorization data",
+            "model": Result[None],
+        },
+    },
+    status_code=status.HTTP_200_OK,
+)
+async def admin_bills(
+    admin: Annotated[AdminPermission, Depends(AdminPermission.from_token)],
+    response: Response,
+    *,
+    offset: int = 0,
+    room: Annotated[Optional[int], Query(description="Query bills of this room only")] = None,
+    month_from: Annotated[date, Query(description="Query bills from this month")] = EPOCH.date(),
+    month_to: Annotated[
+        date,
+        Query(
+            description="Query bills until this month (inclusive)",
+            default_factory=lambda: datetime.now(timezone.utc).date(),
+        ),
+    ],
+) -> Result[Optional[List[Bill]]]:
+    if admin.admin:
+        return Result(data=await Bill.query(room=room, month_from=month_from, month_to=month_to, offset=offset))
+
+    response.status_code = status.HTTP_400_BAD_REQUEST
+    return Result(code=401, data=None)
@@ -0,0 +1 @@
+from .root import *
@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+from typing import Annotated, Optional
+
+from fastapi import Depends, Response, status
+
+from ....app import api_v1
+from ....models import AdminPermission, Dashboard, Result
+
+
+__all__ = ("admin_dashboard",)
+
+
+@api_v1.get(
+    "/admin/dashboard",
+    name="Admin dashboard",
+    description="Query the number of residents, pending registrations, room occupancy and the collection status of the most recent fees. Results may lag behind recent changes by a few seconds.",
+    tags=["admin"],
+    responses={
+        status.HTTP_200_OK: {
+            "description": "The dashboard summary",
+            "model": Result[Dashboard],
+        },
+        status.HTTP_400_BAD_REQUEST: {
+            "description": "Incorrect authorization data",
+            "model": Result[None],
+        },
+    },
+)
+async def admin_dashboard(
+    admin: Annotated[AdminPermission, Depends(AdminPermission.from_token)],
+    response: Response,
+) -> Result[Optional[Dashboard]]:
+    if admin.admin:
+        return Result(data=await Dashboard.query())
+
+    response.status_code = status.HTTP_400_BAD_REQUEST
+    return Result(code=401, data=None)
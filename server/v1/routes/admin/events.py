@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+from typing import Annotated, Optional, Union
+
+from fastapi import Depends, Header, Response, status
+from fastapi.responses import StreamingResponse
+
+from ...app import api_v1
+from ...models import AdminPermission, Result
+from ....push import PushHub
+
+
+__all__ = ("admin_events",)
+
+
+@api_v1.get(
+    "/admin/events",
+    name="Administrator event stream",
+    description=(
+        "Server-Sent Events stream of new registration requests (`registration_request`), approved and rejected "
+        "requests (`registration_approval`, `registration_rejection`) and recorded payments (`payment`), from all "
+        "workers. Reconnect with the `Last-Event-ID` header to receive the missed events. A `reset` event means "
+        "that some events could not be replayed and that the data must be reloaded."
+    ),
+    tags=["admin"],
+    response_model=None,
+    responses={
+        status.HTTP_200_OK: {
+            "description": "The event stream",
+            "content": {"text/event-stream": {}},
+        },
+        status.HTTP_400_BAD_REQUEST: {
+            "description": "Incorrect authorization data",
+            "model": Result[None],
+        },
+        status.HTTP_503_SERVICE_UNAVAILABLE: {
+            "description": "Too many connected clients, retry later",
+            "model": Result[None],
+        },
+    },
+)
+async def admin_events(
+    admin: Annotated[AdminPermission, Depends(AdminPermission.from_token)],
+    response: Response,
+    last_event_id: Annotated[Optional[int], Header(description="The id of the last received event")] = None,
+) -> Union[Result[None], StreamingResponse]:
+    if not admin.admin:
+        response.status_code = status.HTTP_400_BAD_REQUEST
+        return Result(code=401, data=None)
+
+    if not PushHub.instance.accepts():
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        response.headers["Retry-After"] = str(int(PushHub.HEARTBEAT))
+        return Result(code=801, data=None)
+
+    return StreamingResponse(
+        PushHub.instance.stream(room=None, last_event_id=last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,2 +1,3 @@
 from .count import *
+from .create import *
 from .root import *
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from typing import Annotated, List, Optional
+
+from fastapi import Body, Depends, Response, status
+
+from .....app import api_v1
+from .....models import AdminPermission, OfflinePayment, Payment, Result
+
+
+__all__ = ("admin_fees_payments_create",)
+
+
+@api_v1.post(
+    "/admin/fees/payments/create",
+    name="Offline payments recording",
+    description="Record payments collected by administrators (e.g. in cash or by bank transfer). Each payment is validated against the bounds of its fee for its room, and its outcome is returned at the same position.",
+    tags=["admin"],
+    responses={
+        status.HTTP_200_OK: {
+            "description": "The outcome of each payment",
+            "model": Result[List[Result[Optional[Payment]]]],
+        },
+        status.HTTP_400_BAD_REQUEST: {
+            "description": "Incorrect authorization data",
+            "model": Result[None],
+        },
+    },
+    status_code=status.HTTP_200_OK,
+)
+async def admin_fees_payments_create(
+    admin: Annotated[AdminPermission, Depends(AdminPermission.from_token)],
+    response: Response,
+    payments: Annotated[List[OfflinePayment], Body(max_length=10000)],
+) -> Result[Optional[List[Result[Optional[Payment]]]]]:
+    if admin.admin:
+        return Result(data=await Payment.create_offline(payments))
+
+    response.status_code = status.HTTP_400_BAD_REQUEST
+    return Result(code=401, data=None)
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from typing import Annotated, List, Literal, Optional
 
 from fastapi import Depends, Query, Response, status
@@ -8,7 +8,9 @@ from pydantic import BeforeValidator
 
 from ....app import api_v1
 from ....models import AdminPermission, Fee, Result
+from .....cache import ResponseCache
 from .....config import EPOCH
+from .....utils import query_time
 
 
 __all__ = ("admin_fees",)
@@ -44,21 +46,42 @@ async def admin_fees(
         datetime,
         Query(
             description="Query requests created before this timestamp",
-            default_factory=lambda: datetime.now(timezone.utc),
+            default_factory=query_time,
         ),
     ],
     name: Optional[str] = None,
     order_by: Annotated[Literal[1, -1, 2, -2, 3, -3, 4, -4, 5, -5, 6, -6, 7, -7, 8, -8], BeforeValidator(int)] = -1,
 ) -> Result[Optional[List[Fee]]]:
     if admin.admin:
-        return Result(
-            data=await Fee.query(
-                offset=offset,
-                created_after=created_after,
-                created_before=created_before,
-                name=name,
-                order_by=order_by,
+        async def build() -> Result[List[Fee]]:
+            return Result(
+                data=await Fee.query(
+                    offset=offset,
+                    created_after=created_after,
+                    created_before=created_before,
+                    name=name,
+                    order_by=order_by,
+                )
             )
+
+        # Fees are created now, a bound in the last second (e.g. the default) selects the same fees
+        # as any later bound until the next fee_create invalidation: share a single cache entry
+        if created_before.astimezone(timezone.utc) >= datetime.now(timezone.utc) - timedelta(seconds=1):
+            open_ended = None
+        else:
+            open_ended = created_before
+
+        return await ResponseCache.instance.get(  # type: ignore
+            "admin_fees",
+            {
+                "offset": offset,
+                "created_after": created_after,
+                "created_before": open_ended,
+                "name": name,
+                "order_by": order_by,
+            },
+            tables=("fees",),
+            build=build,
         )
 
     response.status_code = status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+from typing import Annotated, List, Optional
+
+from fastapi import Depends, Response, status
+
+from ....app import api_v1
+from ....models import AdminPermission, Floor, Result
+
+
+__all__ = ("admin_floors",)
+
+
+@api_v1.get(
+    "/admin/floors",
+    name="Floor summary query",
+    description="Query the aggregated room, resident and unpaid fee information of every floor. Results may lag behind changes made through other server processes by up to a second.",
+    tags=["admin"],
+    responses={
+        status.HTTP_200_OK: {
+            "description": "List of floor summaries",
+            "model": Result[List[Floor]],
+        },
+        status.HTTP_400_BAD_REQUEST: {
+            "description": "Incorrect authorization data",
+            "model": Result[None],
+        },
+    },
+)
+async def admin_floors(
+    admin: Annotated[AdminPermission, Depends(AdminPermission.from_token)],
+    response: Response,
+) -> Result[Optional[List[Floor]]]:
+    if admin.admin:
+        return Result(data=await Floor.query())
+
+    response.status_code = status.HTTP_400_BAD_REQUEST
+    return Result(code=401, data=None)
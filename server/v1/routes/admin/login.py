@@ -7,6 +7,7 @@ from fastapi.security import OAuth2PasswordRequestForm
 
 from ...app import api_v1
 from ...models import AdminPermission, Token, secret_key
+from ....ratelimit import RateLimiter
 
 
 __all__ = ("login",)
@@ -25,7 +26,11 @@ __all__ = ("login",)
         status.HTTP_400_BAD_REQUEST: {
             "description": "Incorrect authorization data",
         },
+        status.HTTP_429_TOO_MANY_REQUESTS: {
+            "description": "Too many login attempts from this client or for this username",
+        },
     },
+    dependencies=[Depends(RateLimiter.instance.limit("admin_login", username=RateLimiter.form_username))],
 )
 async def login(form_data: Annotated[OAuth2PasswordRequestForm, Depends()]) -> Token:
     verify = await AdminPermission.verify(username=form_data.username, password=form_data.password)
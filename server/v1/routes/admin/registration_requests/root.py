@@ -6,6 +6,7 @@ from fastapi import Depends, Response, status
 
 from ....app import api_v1
 from ....models import AdminPermission, RegisterRequest, Result
+from .....cache import ResponseCache
 from .....config import DB_PAGINATION_QUERY
 
 
@@ -40,16 +41,32 @@ async def admin_reg_request(
     ascending: bool = True,
 ) -> Result[Optional[List[RegisterRequest]]]:
     if admin.admin:
-        return Result(
-            data=await RegisterRequest.query(
-                offset=offset,
-                id=id,
-                name=name,
-                room=room,
-                username=username,
-                order_by=order_by,
-                ascending=ascending,
-            ),
+        async def build() -> Result[List[RegisterRequest]]:
+            return Result(
+                data=await RegisterRequest.query(
+                    offset=offset,
+                    id=id,
+                    name=name,
+                    room=room,
+                    username=username,
+                    order_by=order_by,
+                    ascending=ascending,
+                ),
+            )
+
+        return await ResponseCache.instance.get(  # type: ignore
+            "admin_reg_request",
+            {
+                "offset": offset,
+                "id": id,
+                "name": name,
+                "room": room,
+                "username": username,
+                "order_by": order_by,
+                "ascending": ascending,
+            },
+            tables=("registration_requests",),
+            build=build,
         )
 
     response.status_code = status.HTTP_400_BAD_REQUEST
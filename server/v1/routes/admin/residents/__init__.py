@@ -1,4 +1,5 @@
 from .count import *
 from .delete import *
 from .root import *
+from .suggest import *
 from .update import *
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from datetime import datetime, timezone
+from datetime import datetime
 from typing import Annotated, Optional
 
 from fastapi import Depends, Query, Response, status
@@ -8,6 +8,7 @@ from fastapi import Depends, Query, Response, status
 from ....app import api_v1
 from ....models import AdminPermission, Resident, Result
 from .....config import EPOCH
+from .....utils import query_time
 
 
 __all__ = ("admin_residents_count",)
@@ -41,7 +42,7 @@ async def admin_residents_count(
         datetime,
         Query(
             description="Query requests created before this timestamp",
-            default_factory=lambda: datetime.now(timezone.utc),
+            default_factory=query_time,
         ),
     ],
     name: Optional[str] = None,
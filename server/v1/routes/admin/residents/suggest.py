@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+from typing import Annotated, List, Optional
+
+from fastapi import Depends, Query, Response, status
+
+from ....app import api_v1
+from ....models import AdminPermission, PublicInfo, ResidentIndex, Result
+from .....config import DB_PAGINATION_QUERY
+
+
+__all__ = ("admin_residents_suggest",)
+
+
+@api_v1.get(
+    "/admin/residents/suggest",
+    name="Residents suggestion",
+    description=f"Suggest a maximum of {DB_PAGINATION_QUERY} residents whose name, username or room starts with the given text. "
+    "Results are served from an in-memory index and may lag behind recent changes.",
+    tags=["admin"],
+    responses={
+        status.HTTP_200_OK: {
+            "description": "List of matching residents",
+            "model": Result[List[PublicInfo]],
+        },
+        status.HTTP_400_BAD_REQUEST: {
+            "description": "Incorrect authorization data",
+            "model": Result[None],
+        },
+    },
+)
+async def admin_residents_suggest(
+    admin: Annotated[AdminPermission, Depends(AdminPermission.from_token)],
+    response: Response,
+    query: Annotated[str, Query(description="The text typed so far, case and diacritics are ignored")],
+    limit: Annotated[int, Query(description="The maximum number of suggestions")] = 10,
+) -> Result[Optional[List[PublicInfo]]]:
+    if admin.admin:
+        return Result(data=ResidentIndex.instance.suggest(query, limit=min(limit, DB_PAGINATION_QUERY)))
+
+    response.status_code = status.HTTP_400_BAD_REQUEST
+    return Result(code=401, data=None)
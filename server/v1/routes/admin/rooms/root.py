@@ -6,6 +6,7 @@ from fastapi import Depends, Response, status
 
 from ....app import api_v1
 from ....models import AdminPermission, Result, Room
+from .....cache import ResponseCache
 from .....config import DB_PAGINATION_QUERY
 
 
@@ -36,7 +37,15 @@ async def admin_rooms(
     floor: Optional[int] = None,
 ) -> Result[Optional[List[Room]]]:
     if admin.admin:
-        return Result(data=await Room.query(offset=offset, room=room, floor=floor))
+        async def build() -> Result[List[Room]]:
+            return Result(data=await Room.query(offset=offset, room=room, floor=floor))
+
+        return await ResponseCache.instance.get(  # type: ignore
+            "admin_rooms",
+            {"offset": offset, "room": room, "floor": floor},
+            tables=("accounts", "rooms"),
+            build=build,
+        )
 
     response.status_code = status.HTTP_400_BAD_REQUEST
     return Result(code=401, data=None)
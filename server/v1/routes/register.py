@@ -3,7 +3,7 @@ from __future__ import annotations
 from typing import Annotated, Optional
 
 import pydantic
-from fastapi import Header, Query, Response, status
+from fastapi import Depends, Header, Query, Response, status
 
 from ..app import api_v1
 from ..models import (
@@ -12,6 +12,7 @@ from ..models import (
     RegisterRequest,
     Result,
 )
+from ...ratelimit import RateLimiter
 
 
 __all__ = ("register",)
@@ -41,7 +42,11 @@ class _Authorization(pydantic.BaseModel):
             "description": "Failed to create a registration request",
             "model": Result[None],
         },
+        status.HTTP_429_TOO_MANY_REQUESTS: {
+            "description": "Too many registrations from this client or for this username",
+        },
     },
+    dependencies=[Depends(RateLimiter.instance.limit("register", username=RateLimiter.header_username))],
 )
 async def register(
     headers: Annotated[_Authorization, Header(description="Authorization headers")],
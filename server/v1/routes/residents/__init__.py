@@ -1,3 +1,5 @@
+from .bills import *
+from .events import *
 from .fees import *
 from .me import *
 from .pay import *
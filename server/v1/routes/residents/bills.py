@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from datetime import date, datetime, timezone
+from typing import Annotated, List, Optional
+
+from fastapi import Depends, Query, Response, status
+
+from ...app import api_v1
+from ...models import Bill, Resident, Result
+from ....config import EPOCH
+
+
+__all__ = ("residents_bills",)
+
+
+@api_v1.get(
+    "/residents/bills",
+    name="Bill query",
+    description="Query the utility bills of the current resident's room, the most recent months first",
+    tags=["resident"],
+    responses={
+        status.HTTP_200_OK: {
+            "description": "The operation completed successfully",
+            "model": Result[List[Bill]],
+        },
+        status.HTTP_400_BAD_REQUEST: {
+            "description": "Incorrect authorization data",
+            "model": Result[None],
+        },
+    },
+)
+async def residents_bills(
+    resident: Annotated[Result[Optional[Resident]], Depends(Resident.from_token)],
+    response: Response,
+    *,
+    offset: int = 0,
+    month_from: Annotated[date, Query(description="Query bills from this month")] = EPOCH.date(),
+    month_to: Annotated[
+        date,
+        Query(
+            description="Query bills until this month (inclusive)",
+            default_factory=lambda: datetime.now(timezone.utc).date(),
+        ),
+    ],
+) -> Result[Optional[List[Bill]]]:
+    if resident.data is None:
+        response.status_code = status.HTTP_400_BAD_REQUEST
+        return Result(code=402, data=None)
+
+    return Result(data=await Bill.query(room=resident.data.room, month_from=month_from, month_to=month_to, offset=offset))
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+from typing import Annotated, Optional, Union
+
+from fastapi import Depends, Header, Response, status
+from fastapi.responses import StreamingResponse
+
+from ...app import api_v1
+from ...models import Resident, Result
+from ....push import PushHub
+
+
+__all__ = ("residents_events",)
+
+
+@api_v1.get(
+    "/residents/events",
+    name="Resident event stream",
+    description=(
+        "Server-Sent Events stream of the payments recorded for the current resident's room (`payment`). "
+        "Reconnect with the `Last-Event-ID` header to receive the missed events. A `reset` event means "
+        "that some events could not be replayed and that the data must be reloaded."
+    ),
+    tags=["resident"],
+    response_model=None,
+    responses={
+        status.HTTP_200_OK: {
+            "description": "The event stream",
+            "content": {"text/event-stream": {}},
+        },
+        status.HTTP_400_BAD_REQUEST: {
+            "description": "Incorrect authorization data",
+            "model": Result[None],
+        },
+        status.HTTP_503_SERVICE_UNAVAILABLE: {
+            "description": "Too many connected clients, retry later",
+            "model": Result[None],
+        },
+    },
+)
+async def residents_events(
+    resident: Annotated[Result[Optional[Resident]], Depends(Resident.from_token)],
+    response: Response,
+    last_event_id: Annotated[Optional[int], Header(description="The id of the last received event")] = None,
+) -> Union[Result[None], StreamingResponse]:
+    if resident.data is None:
+        response.status_code = status.HTTP_400_BAD_REQUEST
+        return Result(code=402, data=None)
+
+    if not PushHub.instance.accepts():
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        response.headers["Retry-After"] = str(int(PushHub.HEARTBEAT))
+        return Result(code=801, data=None)
+
+    return StreamingResponse(
+        PushHub.instance.stream(room=resident.data.room, last_event_id=last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from datetime import datetime, timezone
+from datetime import datetime
 from typing import Annotated, List, Optional
 
 from fastapi import Depends, Query, Response, status
@@ -8,6 +8,7 @@ from fastapi import Depends, Query, Response, status
 from ....app import api_v1
 from ....models import Fee, PaymentStatus, Resident, Result
 from .....config import EPOCH
+from .....utils import query_time
 
 
 __all__ = ("residents_fees_count",)
@@ -42,7 +43,7 @@ async def residents_fees_count(
         datetime,
         Query(
             description="Count fees created before this timestamp",
-            default_factory=lambda: datetime.now(timezone.utc),
+            default_factory=query_time,
         ),
     ],
 ) -> Result[Optional[int]]:
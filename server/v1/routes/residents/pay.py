@@ -1,23 +1,20 @@
 from __future__ import annotations
 
-import hashlib
-import hmac
-import urllib.parse
 from datetime import datetime, timedelta, timezone
 from typing import Dict, Union
 
-from yarl import URL
-from fastapi import HTTPException, Request, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.responses import RedirectResponse
 
 from ...app import api_v1
-from ...models import Payment, PaymentStatus
-from ....config import SERVER_BASE_URL, VNPAY_SECRET_KEY, VNPAY_TMN_CODE
-from ....utils import since_epoch, snowflake_time
+from ...models import Payment, PaymentStatus, RoomCatalog
+from ....config import SERVER_BASE_URL
+from ....ratelimit import RateLimiter
+from ....utils import since_epoch
+from ....vnpay import VNPayGateway
 
 
 __all__ = ("residents_pay",)
-_BASE = URL("https://sandbox.vnpayment.vn/paymentv2/vpcpay.html")
 _RETURN_URL = SERVER_BASE_URL.with_path("/api/v1/residents/vnpay-return")
 
 
@@ -30,6 +27,7 @@ def _format_time(time: datetime) -> str:
     name="Fee payment",
     description="Perform a payment for a fee",
     tags=["resident"],
+    dependencies=[Depends(RateLimiter.instance.limit("pay"))],
     # include_in_schema=False,
 )
 async def residents_pay(
@@ -38,16 +36,11 @@ async def residents_pay(
     fee_id: int,
     amount: float,
 ) -> RedirectResponse:
-    date = snowflake_time(fee_id)
-    all_status = await PaymentStatus.query(room, created_after=date, created_before=date)
-    if all_status.data is None:
+    if not await RoomCatalog.instance.exists(room):
         raise HTTPException(status.HTTP_400_BAD_REQUEST)
 
-    for st in all_status.data:
-        if st.payment is None and st.fee.id == fee_id:
-            break
-
-    else:
+    st = await PaymentStatus.get(room, fee_id)
+    if st is None or st.payment is not None:
         raise HTTPException(status.HTTP_404_NOT_FOUND)
 
     if amount < st.lower_bound or amount > st.upper_bound:
@@ -66,7 +59,7 @@ async def residents_pay(
     params: Dict[str, Union[int, str]] = {
         "vnp_Version": "2.1.0",
         "vnp_Command": "pay",
-        "vnp_TmnCode": VNPAY_TMN_CODE,
+        "vnp_TmnCode": VNPayGateway.instance.tmn_code,
         "vnp_Amount": normalized_amount,
         "vnp_CreateDate": _format_time(now),
         "vnp_CurrCode": "VND",
@@ -78,14 +71,5 @@ async def residents_pay(
         "vnp_ExpireDate": _format_time(expire),
         "vnp_TxnRef": f"{room}-{fee_id}-{normalized_amount}-{unique_suffix}",
     }
-    params = dict(sorted(params.items()))
-
-    data = "&".join(f"{k}={urllib.parse.quote_plus(str(v))}" for k, v in params.items())
-    params["vnp_SecureHash"] = hmac.new(
-        VNPAY_SECRET_KEY.encode("utf-8"),
-        data.encode("utf-8"),
-        digestmod=hashlib.sha512,
-    ).hexdigest()
-
-    url = _BASE.with_query(params)
+    url = VNPayGateway.instance.payment_url(params)
     return RedirectResponse(str(url))
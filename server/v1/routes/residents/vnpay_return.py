@@ -1,14 +1,12 @@
 from __future__ import annotations
 
-import hashlib
-import hmac
-import urllib.parse
 
 from fastapi import HTTPException, Request, status
 from fastapi.responses import RedirectResponse
 
 from ...app import api_v1
-from ....config import SERVER_BASE_URL, VNPAY_SECRET_KEY, VNPAY_TMN_CODE
+from ....config import SERVER_BASE_URL
+from ....vnpay import InvalidSignature, VNPayGateway
 
 
 __all__ = ("residents_vnpay_return",)
@@ -23,22 +21,10 @@ _HTML_URL = SERVER_BASE_URL.with_path("/api/v1/static/payment_success.html")
     include_in_schema=False,
 )
 async def residents_vnpay_return(request: Request) -> RedirectResponse:
-    params = dict(sorted(request.query_params.items()))
-
     # Validate request parameters
     try:
-        vnp_securehash = params.pop("vnp_SecureHash")
-        vnp_tmncode = params["vnp_TmnCode"]
-    except KeyError:
-        raise HTTPException(status.HTTP_400_BAD_REQUEST)
-
-    data = "&".join(f"{k}={urllib.parse.quote_plus(str(v))}" for k, v in params.items())
-    expected_checksum = hmac.new(
-        VNPAY_SECRET_KEY.encode("utf-8"),
-        data.encode("utf-8"),
-        digestmod=hashlib.sha512,
-    ).hexdigest()
-    if VNPAY_TMN_CODE != vnp_tmncode or vnp_securehash != expected_checksum:
+        params = VNPayGateway.instance.verify(request.query_params)
+    except (KeyError, InvalidSignature):
         raise HTTPException(status.HTTP_400_BAD_REQUEST)
 
     try:
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import hashlib
+import hmac
+import urllib.parse
+from typing import Any, ClassVar, Dict, Mapping, TYPE_CHECKING
+
+from yarl import URL
+
+from .config import VNPAY_BASE_URL, VNPAY_SECRET_KEY, VNPAY_TMN_CODE
+
+
+__all__ = ("InvalidSignature", "VNPayGateway")
+
+
+class InvalidSignature(ValueError):
+    """Raised when the signature or the terminal code of VNPay parameters does not match."""
+    pass
+
+
+class VNPayGateway:
+    """Signs and verifies the parameters exchanged with VNPay.
+
+    The HMAC-SHA512 key schedule is computed once: signing a message only copies the keyed state
+    and hashes the message.
+    """
+
+    instance: ClassVar[VNPayGateway]
+    __slots__ = (
+        "__base_url",
+        "__hmac",
+        "__tmn_code",
+    )
+    if TYPE_CHECKING:
+        __base_url: URL
+        __hmac: hmac.HMAC
+        __tmn_code: str
+
+    def __init__(self, *, tmn_code: str, secret_key: str, base_url: URL) -> None:
+        self.__base_url = base_url
+        self.__hmac = hmac.new(secret_key.encode("utf-8"), digestmod=hashlib.sha512)
+        self.__tmn_code = tmn_code
+
+    @property
+    def tmn_code(self) -> str:
+        """The terminal code of this merchant."""
+        return self.__tmn_code
+
+    def sign(self, params: Mapping[str, Any]) -> str:
+        """Return the `vnp_SecureHash` of the given parameters, which must not include it."""
+        data = "&".join(f"{k}={urllib.parse.quote_plus(str(v))}" for k, v in sorted(params.items()))
+        signer = self.__hmac.copy()
+        signer.update(data.encode("utf-8"))
+        return signer.hexdigest()
+
+    def verify(self, params: Mapping[str, str]) -> Dict[str, str]:
+        """Verify the parameters received from VNPay, and return them without `vnp_SecureHash`.
+
+        Raises
+        -----
+        `KeyError`
+            `vnp_SecureHash` or `vnp_TmnCode` is missing.
+        `InvalidSignature`
+            The signature or the terminal code does not match.
+        """
+        params = dict(params)
+        secure_hash = params.pop("vnp_SecureHash")
+        if params["vnp_TmnCode"] != self.__tmn_code or not hmac.compare_digest(secure_hash.encode("utf-8"), self.sign(params).encode("utf-8")):
+            raise InvalidSignature
+
+        return params
+
+    def payment_url(self, params: Mapping[str, Any]) -> URL:
+        """Return the URL of the payment page for the given parameters, signing them."""
+        query = dict(sorted(params.items()))
+        query["vnp_SecureHash"] = self.sign(query)
+        return self.__base_url.with_query(query)
+
+
+VNPayGateway.instance = VNPayGateway(tmn_code=VNPAY_TMN_CODE, secret_key=VNPAY_SECRET_KEY, base_url=VNPAY_BASE_URL)